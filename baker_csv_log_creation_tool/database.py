@@ -2,6 +2,8 @@
 
 # For the room and robot data information
 import database_classes
+# For the conversion of the date strings
+import database_date_format
 # For time calculations
 from datetime import datetime, date, time, timedelta
 # For Point32
@@ -61,13 +63,13 @@ class Database():
 
 	@staticmethod
 	def datetimeToString(datetime_date):
-		return datetime_date.strftime("%Y-%m-%d_%H:%M")
+		return database_date_format.datetimeToString(datetime_date)
 
 
 
 	@staticmethod
 	def stringToDatetime(string_date):
-		return datetime.strptime(string_date, "%Y-%m-%d_%H:%M")
+		return database_date_format.stringToDatetime(string_date)
 
 
 
@@ -0,0 +1,50 @@
+#!/usr/bin/env python
+
+from datetime import datetime
+
+# ========================================================================
+# Description:
+# Conversion between datetime and the date strings of the database files
+# ("%Y-%m-%d_%H:%M", e.g. "2018-07-24_13:05").
+# Strings of exactly this layout are parsed by slicing instead of strptime,
+# other strings are passed to strptime, which raises the usual ValueError.
+# The results are memorized, as the same dates occur in many rooms and log
+# entries. Each memo is cleared when it reaches MAX_MEMO_SIZE entries.
+# ========================================================================
+
+DATE_FORMAT = "%Y-%m-%d_%H:%M"
+MAX_MEMO_SIZE = 4096
+
+parsed_dates_ = {}
+formatted_dates_ = {}
+
+
+def parseDate(string_date):
+	if len(string_date) == 16 and string_date[4] == "-" and string_date[7] == "-" and string_date[10] == "_" and string_date[13] == ":":
+		(year, month, day, hour, minute) = (string_date[0:4], string_date[5:7], string_date[8:10], string_date[11:13], string_date[14:16])
+		if (year + month + day + hour + minute).isdigit():
+			try:
+				return datetime(int(year), int(month), int(day), int(hour), int(minute))
+			except ValueError:
+				pass
+	return datetime.strptime(string_date, DATE_FORMAT)
+
+
+def stringToDatetime(string_date):
+	datetime_date = parsed_dates_.get(string_date)
+	if datetime_date is None:
+		datetime_date = parseDate(string_date)
+		if len(parsed_dates_) >= MAX_MEMO_SIZE:
+			parsed_dates_.clear()
+		parsed_dates_[string_date] = datetime_date
+	return datetime_date
+
+
+def datetimeToString(datetime_date):
+	string_date = formatted_dates_.get(datetime_date)
+	if string_date is None:
+		string_date = "%04d-%02d-%02d_%02d:%02d" % (datetime_date.year, datetime_date.month, datetime_date.day, datetime_date.hour, datetime_date.minute)
+		if len(formatted_dates_) >= MAX_MEMO_SIZE:
+			formatted_dates_.clear()
+		formatted_dates_[datetime_date] = string_date
+	return string_date
@@ -1,89 +1,243 @@
 #!/usr/bin/env python
 
-import database
-import database_classes
+import argparse
+import csv
 import json
+import os
+from datetime import date, datetime, timedelta
+from multiprocessing import Pool
+import database_date_format
+
+# ========================================================================
+# Description:
+# Export of the log files (log_<year>_<week>_<day>_run<n>.json and their
+# journals log_<...>.jsonl) of a database into CSV files, one CSV file per
+# log file with one row per log entry.
+# The entries are streamed from the log file into a csv.writer with a
+# buffered file, no LogItem list or database is built. The entries of the
+# JSON file come first (by date), then the entries of the journal (one
+# JSON object per line). A journal entry replaces a JSON entry of the same
+# date. The rows keep the layout of the former converter (see
+# createCSVRow). The CSV file is written into a temporary file and renamed.
+# Many log files (a whole logs folder, a week or a date range) are
+# converted at once on a process pool.
+# Usage: python json_log_to_csv_log_converter.py --help
+# ========================================================================
+
+CSV_DELIMITER = ";"
+LOG_JOURNAL_EXTENSION = ".jsonl"
+WRITE_BUFFER_SIZE = 1 << 16
+
+
+# Create string which can be recognized as a time
+def createTimeString(date_and_time):
+	return str(date_and_time.hour) + ":" + str(date_and_time.minute)
+
+
+# Create a readable cleaning task expression [GERMAN]
+def createCleaningTaskString(task):
+	if (task == -1):
+		return "Papierkorb"
+	elif (task == 0):
+		return "Trockenreinigung"
+	elif (task == 1):
+		return "Nassreinigung"
+	else:
+		return ""
+
+
+# Create a readable status expression [GERMAN]
+def createStatusString(status):
+	if (status == 0):
+		return "Erfolg"
+	elif (status == 1):
+		return "Fehlerhaft"
+	else:
+		return ""
+
+
+# Create a comma text of all problem IDs
+def createProblemIDString(ids):
+	return ", ".join(str(problem_id) for problem_id in ids or [])
+
+
+# Returns the CSV row of a log entry (dict of the log file).
+# The layout is the one of the former converter: all values as str() (None as "None") and a ; at the end of the row (empty last field).
+def createCSVRow(log_entry):
+	return [str(value) for value in [
+		log_entry.get("room_id"),
+		createTimeString(database_date_format.stringToDatetime(log_entry.get("date_and_time"))),
+		createCleaningTaskString(log_entry.get("cleaning_task")),
+		log_entry.get("found_trashcans"),
+		log_entry.get("cleaned_surface_area"),
+		log_entry.get("found_dirtspots"),
+		log_entry.get("battery_usage"),
+		log_entry.get("used_water_amount"),
+		log_entry.get("trolley_capacity"),
+		createStatusString(log_entry.get("status")),
+		createProblemIDString(log_entry.get("room_issues"))
+	]] + [""]
+
+
+def getJournalFileName(log_file_name):
+	return os.path.splitext(log_file_name)[0] + LOG_JOURNAL_EXTENSION
+
+
+# Yields the complete entries of a journal file, line by line
+def iterateJournalEntries(journal_file_name):
+	with open(journal_file_name, "r") as journal_file:
+		for line in journal_file:
+			# A line without line break is the incomplete tail of a crash
+			if not line.endswith("\n"):
+				print "[JSONLogToCSVLogConverter]: Ignoring incomplete last entry of " + str(journal_file_name)
+				break
+			try:
+				log_entry = json.loads(line)
+			except ValueError:
+				print "[JSONLogToCSVLogConverter]: Ignoring damaged entry of " + str(journal_file_name)
+				continue
+			yield log_entry
+
+
+# Yields the entries (dicts) of a log file: the entries of the JSON file by date, then the entries of its journal
+def iterateLogEntries(log_file_name):
+	log_dict = {}
+	if os.path.isfile(log_file_name):
+		with open(log_file_name, "r") as log_file:
+			log_dict = json.load(log_file)
+	journal_file_name = getJournalFileName(log_file_name)
+	has_journal = os.path.isfile(journal_file_name)
+	# the JSON file and the journal only overlap if the merge of the journal was interrupted
+	if has_journal and len(log_dict) > 0:
+		for log_entry in iterateJournalEntries(journal_file_name):
+			log_dict.pop(str(log_entry.get("date_and_time")), None)
+	for log_key in sorted(log_dict):
+		yield log_dict[log_key]
+	if has_journal:
+		for log_entry in iterateJournalEntries(journal_file_name):
+			yield log_entry
+
+
+# Write the CSV file of a log file. Returns the number of rows.
+def convertLogFile(log_file_name, csv_file_name):
+	row_count = 0
+	temporary_file_name = csv_file_name + ".part"
+	with open(temporary_file_name, "wb", WRITE_BUFFER_SIZE) as csv_file:
+		writer = csv.writer(csv_file, delimiter=CSV_DELIMITER, lineterminator="\n")
+		for log_entry in iterateLogEntries(log_file_name):
+			writer.writerow(createCSVRow(log_entry))
+			row_count += 1
+	os.rename(temporary_file_name, csv_file_name)
+	return row_count
+
+
+# Process pool work: (log file name, CSV file name) -> (log file name, number of rows)
+def convertLogFileTask(arguments):
+	(log_file_name, csv_file_name) = arguments
+	return (log_file_name, convertLogFile(log_file_name, csv_file_name))
+
+
+# Returns the date of a log file (log_<year>_<week>_<day>_run<n>.json, ISO week, day 0 = Monday) or None.
+# The year is the calendar year of the date, so in the first ISO week of a year the name can fit two dates
+# (e.g. log_2018_1_0 is 2018-01-01 or 2018-12-31). Then the date of the first log entry decides.
+def getLogFileDate(log_file_name):
+	parts = os.path.splitext(os.path.basename(log_file_name))[0].split("_")
+	if len(parts) != 5 or parts[0] != "log" or not "".join(parts[1:4]).isdigit():
+		return None
+	(year, week, day) = (int(parts[1]), int(parts[2]), int(parts[3]))
+	log_dates = []
+	for iso_year in [year - 1, year, year + 1]:
+		january_4th = date(iso_year, 1, 4)
+		log_date = january_4th + timedelta(days=7*(week - 1) + day - january_4th.weekday())
+		if log_date.year == year:
+			log_dates.append(log_date)
+	if len(log_dates) > 1:
+		for log_entry in iterateLogEntries(os.path.splitext(log_file_name)[0] + ".json"):
+			return database_date_format.stringToDatetime(log_entry.get("date_and_time")).date()
+	return log_dates[0] if len(log_dates) > 0 else None
+
+
+# Returns the names of the log files (JSON file or journal) of a logs folder, optionally only of the dates from first_date to last_date
+def getLogFileNames(log_path, first_date=None, last_date=None):
+	log_filenames = set()
+	for filename in os.listdir(log_path):
+		(base_name, extension) = os.path.splitext(filename)
+		if base_name.startswith("log_") and extension in [".json", LOG_JOURNAL_EXTENSION]:
+			if first_date is not None or last_date is not None:
+				log_date = getLogFileDate(os.path.join(log_path, filename))
+				if log_date is None or (first_date is not None and log_date < first_date) or (last_date is not None and log_date > last_date):
+					continue
+			log_filenames.add(base_name + ".json")
+	return sorted(log_filenames)
 
 
 class JSONLogToCSVLogConverter():
 
-	# Initialize converter; define paths of source and destination file
+	# Initialize converter; define paths of source and destination files
 	def __init__(self, json_file_path="", csv_file_path=""):
 		self.json_file_path_ = json_file_path
 		self.csv_file_path_ = csv_file_path
-		self.database_ = database.Database()
-
-	# Load JSON log file
-	def loadJSONLog(self, filename):
-
-		# Load database
-		if (os.path.isfile(str(self.json_file_path_) + str(filename)) == True):
-			file = open(str(self.json_file_path_) + str(filename), "r").read()
-			# Translate text to dict and dict to list of LogItem
-			log_item_dict = json.loads(file)
-			self.log_item_list_ = self.database_.getLogListFromLogDict(log_item_dict)
-			self.filename_ = filename
-		else:
-			print "ERROR: FILE DOES NOT EXIST"
-			exit(1)
 
-	# Create string which can be recognizes as a time
-	def createTimeString(self, date_and_time):
-		return(str(date_and_time.hour) + ":" + str(date_and_time.minute))
-
-	# Create a readable clenaing task expression [GERMAN]
-	def createCleanintTaskString(self, task):
-		if (task == -1):
-			return "Papierkorb"
-		elif (task == 0):
-			return "Trockenreinigung"
-		elif (task == 1):
-			return "Nassreinigung"
-		else:
-			return ""
-
-	# Create a readable status expression [GERMAN]
-	def createStatusString(self, status):
-		if (status == 0):
-			return "Erfolg"
-		elif (status == 1):
-			return "Fehlerhaft"
-		else:
-			return ""
-
-	# Create a comma text of all problem IDs
-	def createProblemIDString(self, ids):
-		result = ""
-		for i in len(ids) - 2:
-			result = result + str(ids(i)) + ", "
-		result = result + ids[len(ids) - 1]
-		return result
-
-	
-	# Create CSV file
-	def saveCSVLog(self):
-		file = open(str(self.json_file_path_) + str(self.filename_), "w")
-		file.write("")
-		file = open(str(self.json_file_path_) + str(self.filename_), "a")
-		for log_item in self.log_item_list_:
-			file.write(str(log_item.room_id_) + ";")
-			file.write(str(self.createTimeString(log_item.date_and_time_)) + ";")
-			file.write(str(self.createCleanintTaskString(log_item.cleaning_task_)) + ";")
-			file.write(str(log_item.found_trashcans_) + ";")
-			file.write(str(log_item.cleaned_surface_area_) + ";")
-			file.write(str(log_item.found_dirtspots_) + ";")
-			file.write(str(log_item.battery_usage_) + ";")
-			file.write(str(log_item.used_water_amount_) + ";")
-			file.write(str(log_item.trolley_capacity_) + ";")
-			file.write(str(self.createStatusString(log_item.status_)) + ";")
-			file.write(str(self.createProblemIDString(log_item.room_issues_)) + ";")
-			file.write("\n")
+	def getCSVFileName(self, filename):
+		return os.path.join(self.csv_file_path_, os.path.splitext(os.path.basename(filename))[0] + ".csv")
 
+	# Convert the log files on process_count processes (None: number of CPUs). Returns the total number of rows.
+	def convertLogFiles(self, filenames, process_count=None):
+		if not os.path.isdir(self.csv_file_path_):
+			os.makedirs(self.csv_file_path_)
+		tasks = [(os.path.join(self.json_file_path_, filename), self.getCSVFileName(filename)) for filename in filenames]
+		if len(tasks) <= 1 or process_count == 1:
+			return sum(convertLogFileTask(task)[1] for task in tasks)
+		pool = Pool(process_count)
+		try:
+			row_count = 0
+			for (log_file_name, file_row_count) in pool.imap_unordered(convertLogFileTask, tasks):
+				row_count += file_row_count
+		finally:
+			pool.close()
+			pool.join()
+		return row_count
+
+	# Convert all log files of the dates from first_date to last_date (None: no limit)
+	def convertDateRange(self, first_date=None, last_date=None, process_count=None):
+		return self.convertLogFiles(getLogFileNames(self.json_file_path_, first_date, last_date), process_count)
 
 	# Method to call from the outside
 	def runConverter(self, filename):
-		self.loadJSONLog(filename)
-		self.saveCSVLog()
+		log_file_name = os.path.join(self.json_file_path_, filename)
+		if not os.path.isfile(log_file_name) and not os.path.isfile(getJournalFileName(log_file_name)):
+			print "ERROR: FILE DOES NOT EXIST"
+			exit(1)
+		self.convertLogFiles([filename], process_count=1)
+
 
+if __name__ == '__main__':
+	parser = argparse.ArgumentParser(description='Convert JSON log files of a database into CSV files')
+	parser.add_argument('--log_path', default='resources/logs', help='Folder of the log files. Default resources/logs')
+	parser.add_argument('--csv_path', default='csv_logs', help='Folder of the CSV files. Default csv_logs')
+	selection = parser.add_mutually_exclusive_group()
+	selection.add_argument('--files', nargs='+', help='Names of the log files. Default: all log files')
+	selection.add_argument('--week', nargs=2, type=int, metavar=('YEAR', 'WEEK'), help='Convert the log files of an ISO week')
+	parser.add_argument('--from_date', help='Convert the log files from this date on (YYYY-MM-DD)')
+	parser.add_argument('--to_date', help='Convert the log files up to this date (YYYY-MM-DD)')
+	parser.add_argument('--processes', type=int, default=None, help='Number of converting processes. Default: number of CPUs')
+	args = parser.parse_args()
 
-		
\ No newline at end of file
+	converter = JSONLogToCSVLogConverter(args.log_path, args.csv_path)
+	if args.files:
+		filenames = args.files
+	else:
+		(first_date, last_date) = (None, None)
+		if args.week:
+			january_4th = date(args.week[0], 1, 4)
+			first_date = january_4th + timedelta(days=7*(args.week[1] - 1) - january_4th.weekday())
+			last_date = first_date + timedelta(days=6)
+		if args.from_date:
+			from_date = datetime.strptime(args.from_date, "%Y-%m-%d").date()
+			first_date = max(first_date, from_date) if first_date is not None else from_date
+		if args.to_date:
+			to_date = datetime.strptime(args.to_date, "%Y-%m-%d").date()
+			last_date = min(last_date, to_date) if last_date is not None else to_date
+		filenames = getLogFileNames(args.log_path, first_date, last_date)
+	row_count = converter.convertLogFiles(filenames, args.processes)
+	print "[JSONLogToCSVLogConverter]: Converted " + str(len(filenames)) + " log files with " + str(row_count) + " entries into " + str(args.csv_path)
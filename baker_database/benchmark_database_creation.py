@@ -0,0 +1,103 @@
+#!/usr/bin/env python
+
+import argparse
+import os
+import shutil
+import tempfile
+import timeit
+import numpy as np
+from ipa_building_msgs.msg import RoomInformation
+
+import database
+from database_creation_tool import DatabaseCreator
+
+# =========================================================
+# Benchmark of the room creation of database_creation_tool.py
+# on a synthetic building.
+# Usage: python benchmark_database_creation.py --help
+# =========================================================
+
+
+# Creates a synthetic segmented map (labels 1..room_count, 0 = no room) of size x size pixels split into a grid of rooms
+def createSegmentedMap(size, room_count):
+	grid = int(np.ceil(np.sqrt(room_count)))
+	cell = size // grid
+	segmented_map = np.zeros((size, size), np.int32)
+	for room_index in range(room_count):
+		(row, column) = divmod(room_index, grid)
+		segmented_map[row*cell + 1:(row + 1)*cell - 1, column*cell + 1:(column + 1)*cell - 1] = room_index + 1
+	return segmented_map
+
+
+# Former implementation of DatabaseCreator.getMapSegmentAsImage
+def getMapSegmentAsImagePixelLoop(opencv_segmented_map, current_room_index):
+	image_height, image_width = opencv_segmented_map.shape
+	tmp_map_opencv = np.zeros((image_height, image_width), np.uint8)
+	for x in range(image_width):
+		for y in range(image_height):
+			if (opencv_segmented_map[y, x] == current_room_index + 1):
+				tmp_map_opencv[y, x] = 255
+	return tmp_map_opencv
+
+
+class SegmentationResult:
+
+	def __init__(self, segmented_map, room_count):
+		self.segmented_map = segmented_map
+		self.room_information_in_pixel = [RoomInformation() for _ in range(room_count)]
+		self.room_information_in_meter = [RoomInformation() for _ in range(room_count)]
+
+
+# Returns the time of DatabaseCreator.createRoomEntries with the given number of image writing threads and the size of the written room maps in bytes
+def measureRoomCreation(segmented_map, room_count, image_writer_count):
+	maps_path = tempfile.mkdtemp()
+	try:
+		database_creator = DatabaseCreator()
+		database_creator.maps_path_ = maps_path
+		database_creator.image_writer_count_ = image_writer_count
+		database_creator.map_resolution_ = 0.05
+		database_creator.segmentation_result_ = SegmentationResult(database_creator.bridge_.cv2_to_imgmsg(segmented_map, encoding="32SC1"), room_count)
+
+		def createRoomEntries():
+			database_creator.database_ = database.Database(auto_load_database=False)
+			database_creator.createRoomEntries()
+		creation_time = timeit.timeit(createRoomEntries, number=1)
+		return (creation_time, sum(os.path.getsize(os.path.join(maps_path, file_name)) for file_name in os.listdir(maps_path)))
+	finally:
+		shutil.rmtree(maps_path)
+
+
+def benchmarkSegmentExtraction(size, room_count, repetitions):
+	segmented_map = createSegmentedMap(size, room_count)
+	database_creator = DatabaseCreator()
+	room_maps = list(database_creator.getMapSegmentsAsImages(segmented_map, room_count))
+	for room_index in [0, room_count // 2, room_count - 1]:
+		assert np.array_equal(room_maps[room_index], database_creator.getMapSegmentAsImage(segmented_map, room_index))
+	assert np.array_equal(room_maps[0], getMapSegmentAsImagePixelLoop(segmented_map, 0))
+
+	# the pixel loop takes the same time for every room
+	loop_time = timeit.timeit(lambda: getMapSegmentAsImagePixelLoop(segmented_map, 0), number=1) * room_count
+	per_room_time = timeit.timeit(lambda: [database_creator.getMapSegmentAsImage(segmented_map, i) for i in range(room_count)], number=repetitions) / repetitions
+	single_pass_time = timeit.timeit(lambda: list(database_creator.getMapSegmentsAsImages(segmented_map, room_count)), number=repetitions) / repetitions
+	print("[Extraction] {}x{} px, {} rooms: pixel loop {:.1f}s (estimated) | vectorized per room {:.3f}s | single pass {:.3f}s".format(
+		size, size, room_count, loop_time, per_room_time, single_pass_time))
+
+
+def benchmarkRoomCreation(size, room_count, image_writer_counts):
+	segmented_map = createSegmentedMap(size, room_count)
+	for image_writer_count in image_writer_counts:
+		(creation_time, maps_size) = measureRoomCreation(segmented_map, room_count, image_writer_count)
+		print("[Creation] {}x{} px, {} rooms, {} image writers: {:.3f}s, room maps {:.1f} kB".format(
+			size, size, room_count, image_writer_count, creation_time, maps_size / 1000.))
+
+
+if __name__ == '__main__':
+	parser = argparse.ArgumentParser(description='Benchmark the room creation of the database creation tool')
+	parser.add_argument('--map_size', type=int, default=2000, help='Width and height of the synthetic map in pixels. Default 2000')
+	parser.add_argument('--room_count', type=int, default=200, help='Number of rooms of the synthetic map. Default 200')
+	parser.add_argument('--repetitions', type=int, default=3, help='Number of repetitions of the vectorized extractions. Default 3')
+	parser.add_argument('--image_writer_counts', type=int, nargs='+', default=[1, 4], help='Numbers of image writing threads. Default 1 4')
+	args = parser.parse_args()
+
+	benchmarkSegmentExtraction(args.map_size, args.room_count, args.repetitions)
+	benchmarkRoomCreation(args.map_size, args.room_count, args.image_writer_counts)
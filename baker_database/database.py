@@ -12,6 +12,8 @@ import cv2
 from cv_bridge import CvBridge, CvBridgeError
 # For support of the JSON format
 import json
+# For the atomic replacement of the JSON files
+import database_file_writer
 # For copying, finding and deleting JSON files
 from shutil import copyfile
 import os
@@ -230,6 +232,8 @@ class Database:
 			current_room.room_territory_id_ = dict_settings.get(room_key).get("room_territory_id")
 			# Get the map of the room
 			current_room.room_map_filename_ = dict_settings.get(room_key).get("room_map_filename")
+			# Position of the map in the global map, maps without offset are full-size
+			current_room.room_map_offset_ = dict_settings.get(room_key).get("room_map_offset", [0, 0])
 			# Get an open cv representation of the map or None if there is no map
 			if current_room.room_map_filename_ is not None:
 				room_map_file_path = str(self.extracted_file_path) + str("/maps/") + str(current_room.room_map_filename_)
@@ -255,6 +259,10 @@ class Database:
 			current_room.room_cleaning_method_ = dict_settings.get(room_key).get("room_cleaning_method")
 			# Get the room surface area
 			current_room.room_surface_area_ = dict_settings.get(room_key).get("room_surface_area")
+			# Get the geometry of the room map, None for databases without it
+			current_room.room_perimeter_ = dict_settings.get(room_key).get("room_perimeter")
+			current_room.room_wall_length_ = dict_settings.get(room_key).get("room_wall_length")
+			current_room.room_skeleton_length_ = dict_settings.get(room_key).get("room_skeleton_length")
 			# Get the room trashcan count
 			current_room.room_trashcan_count_ = dict_settings.get(room_key).get("room_trashcan_count")
 			# Get the days where the room has to be cleaned in a specified way
@@ -337,11 +345,15 @@ class Database:
 					"room_territory_id": current_room.room_territory_id_,
 					"room_issues": issues_dict,
 					"room_map_filename": current_room.room_map_filename_,
+					"room_map_offset": list(current_room.room_map_offset_),
 					"room_information_in_pixel": room_information_in_pixel_list,
 					"room_information_in_meter": room_information_in_meter_list,
 					"room_surface_type": current_room.room_surface_type_,
 					"room_cleaning_method": current_room.room_cleaning_method_,
 					"room_surface_area": current_room.room_surface_area_,
+					"room_perimeter": current_room.room_perimeter_,
+					"room_wall_length": current_room.room_wall_length_,
+					"room_skeleton_length": current_room.room_skeleton_length_,
 					"room_trashcan_count": current_room.room_trashcan_count_,
 					"room_scheduled_days": current_room.room_scheduled_days_,
 					"room_cleaning_datestamps": datestamp_list,
@@ -465,25 +477,19 @@ class Database:
 	# Save the room data
 	def saveRoomDatabase(self, temporal=True):
 		rooms_dict = self.getRoomsDictFromRoomsList()
-		rooms_text = json.dumps(rooms_dict, indent=4, sort_keys=True)
 		if temporal:
-			datafile = open(self.tmp_rooms_filename_, "w")
+			database_file_writer.saveJsonFile(self.tmp_rooms_filename_, rooms_dict)
 		else:
-			datafile = open(self.rooms_filename_, "w")
-		datafile.write(rooms_text)
-		datafile.close()
+			database_file_writer.saveJsonFile(self.rooms_filename_, rooms_dict)
 
 
 	# Save the application data
 	def saveGlobalApplicationData(self, temporal=True):
 		application_data_dict = self.getGlobalApplicationDataDictFromGlobalApplicationData()
-		application_data_text = json.dumps(application_data_dict, indent=4, sort_keys=True)
 		if temporal:
-			datafile = open(self.tmp_application_data_filename_, "w")
+			database_file_writer.saveJsonFile(self.tmp_application_data_filename_, application_data_dict)
 		else:
-			datafile = open(self.application_data_filename_, "w")
-		datafile.write(application_data_text)
-		datafile.close()
+			database_file_writer.saveJsonFile(self.application_data_filename_, application_data_dict)
 
 
 # =========================================================================================
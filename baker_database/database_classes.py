@@ -185,7 +185,7 @@ class RoomItem():
 	# Room cleaning method [0=dry, 1=wet, 2=both]
 	# (INTEGER)
 	room_cleaning_method_ = 0
-	# Room surface area
+	# Room surface area [m2]
 	# (FLOAT)
 	room_surface_area_ = 0.0
 	# Amount of trashcans in the room
@@ -207,6 +207,15 @@ class RoomItem():
 	# Filename of the room map file
 	# (STRING)
 	room_map_filename_ = ""
+	# Position [column, row] of the room map file (the bounding box crop of the room) in the global map
+	# (ARRAY OF INTEGER)
+	room_map_offset_ = [0, 0]
+	# Geometry of the room map (see room_geometry.py in baker_database) [m], None if unknown:
+	# length of the room contours, of the contours bordering on walls and of the skeleton of the free space
+	# (FLOAT)
+	room_perimeter_ = None
+	room_wall_length_ = None
+	room_skeleton_length_ = None
 	# CV_Bridge representation of the map
 	# (CV_BRIDGE)
 	room_map_data_ = None
@@ -0,0 +1,386 @@
+#!/usr/bin/env python
+
+import argparse
+import hashlib
+import json
+import os
+from multiprocessing import Pool
+import cv2
+import numpy as np
+import rospy
+from geometry_msgs.msg import Pose
+from ipa_building_msgs.msg import RoomInformation
+
+import database
+import database_file_writer
+from room_geometry import computeRoomGeometry, getRoomWindow
+from database_creation_tool import DatabaseCreator, ROBOT_PROPERTIES, ROBOT_SETTINGS, getApplicationDataDict, getGlobalMapDataDict
+
+# ========================================================================
+# Description:
+# Staged and resumable creation of a database set.
+# The stages are run in this order:
+#	map:			receives the navigation map and the map for the segmentation
+#	segmentation:	segments the map into rooms (or re-segments one floor)
+#	rooms:			writes the room maps (bounding box crops) on a process pool
+#	database:		writes the JSON files and the global maps, the entries of
+#					an existing rooms.json are kept apart from the map data
+# Every stage keeps its results as files in <database>/creation and
+# records the hash of its input and of its output files in pipeline.json.
+# A stage is skipped if its input has not changed and its output files are
+# unchanged, so a failed creation continues with the failed stage. The
+# rooms stage also skips every room whose pixels have not changed.
+# The map is only received again with --fetch_map. With --floor, only the
+# rooms of one floor (room_floor_id of rooms.json) are segmented again, the
+# rooms of the other floors are kept.
+# Usage: python database_creation_pipeline.py --help
+# ========================================================================
+
+CREATION_FOLDER_NAME = "creation"
+STAGES = ["map", "segmentation", "rooms", "database"]
+# Increase on every change of the room map files, so all room maps are written again
+ROOM_MAP_FORMAT_VERSION = 2
+
+
+def hashFiles(file_names):
+	file_hash = hashlib.sha1()
+	for file_name in file_names:
+		file_hash.update(os.path.basename(file_name))
+		with open(file_name, "rb") as hashed_file:
+			for block in iter(lambda: hashed_file.read(1 << 20), b""):
+				file_hash.update(block)
+	return file_hash.hexdigest()
+
+
+def hashValues(*values):
+	return hashlib.sha1(json.dumps(values, sort_keys=True)).hexdigest()
+
+
+def poseToArray(pose):
+	return getGlobalMapDataDict(0., pose, "")["map_origin"]
+
+
+def arrayToPose(pose_array):
+	pose = Pose()
+	(pose.position.x, pose.position.y, pose.position.z) = pose_array[0:3]
+	(pose.orientation.w, pose.orientation.x, pose.orientation.y, pose.orientation.z) = pose_array[3:7]
+	return pose
+
+
+def roomInformationToArray(room_information):
+	return [database.Database.point32ToArray(point) for point in [room_information.room_center] + list(room_information.room_min_max.points[:2])]
+
+
+def arrayToRoomInformation(room_information_array):
+	room_information = RoomInformation()
+	room_information.room_center = database.Database.arrayToPoint32(room_information_array[0])
+	for point in room_information_array[1:]:
+		room_information.room_min_max.points.append(database.Database.arrayToPoint32(point))
+	return room_information
+
+
+# Writes the bounding box crop of a room map and computes the room geometry, runs on the process pool.
+# window: labels of the bounding box with a margin of one pixel (see room_geometry.getRoomWindow).
+# Returns the entry of the room in the rooms manifest.
+def extractRoom(arguments):
+	(room_id, window, map_offset, pixel_hash, map_resolution, map_file_name) = arguments
+	crop = (window[1:-1, 1:-1] == room_id + 1).astype(np.uint8) * 255
+	(success, png) = cv2.imencode(".png", crop)
+	if not success:
+		raise IOError("Could not encode the map of room " + str(room_id))
+	database_file_writer.writeFileAtomically(map_file_name, png.tostring(), binary=True)
+	return {
+		"room_id": room_id,
+		"pixel_hash": pixel_hash,
+		"map_filename": os.path.basename(map_file_name),
+		"map_offset": map_offset,
+		"geometry": computeRoomGeometry(window, room_id + 1, map_resolution)
+	}
+
+
+class DatabaseCreationPipeline:
+
+	def __init__(self, database_location="resources", process_count=None, force_stages=(), fetch_map=False,
+				 segmentation_algorithm=99, robot_radius=0.2875):
+		self.database_location_ = database_location
+		self.creation_path_ = os.path.join(database_location, CREATION_FOLDER_NAME)
+		self.maps_path_ = os.path.join(database_location, "maps")
+		self.json_path_ = os.path.join(database_location, "json")
+		self.process_count_ = process_count
+		self.force_stages_ = set(force_stages)
+		self.fetch_map_ = fetch_map
+		self.database_creator_ = DatabaseCreator()
+		self.database_creator_.map_segmentation_algorithm_ = segmentation_algorithm
+		self.database_creator_.robot_radius_ = robot_radius
+		self.node_initialized_ = False
+		for path in [self.creation_path_, self.maps_path_, self.json_path_]:
+			if not os.path.isdir(path):
+				os.makedirs(path)
+		self.state_ = self.loadJson(self.getCreationFileName("pipeline.json"), {})
+
+	def getCreationFileName(self, file_name):
+		return os.path.join(self.creation_path_, file_name)
+
+	@staticmethod
+	def loadJson(file_name, default=None):
+		if not os.path.isfile(file_name):
+			return default
+		with open(file_name, "r") as json_file:
+			return json.load(json_file)
+
+	def initNode(self):
+		if not self.node_initialized_:
+			rospy.init_node('database_creation')
+			self.node_initialized_ = True
+
+	# Returns the output hash of the stage if it has been run with the same input and its output files are unchanged, otherwise None
+	def getUpToDateOutputHash(self, stage, input_hash, output_files):
+		stage_state = self.state_.get(stage)
+		if stage in self.force_stages_ or stage_state is None or stage_state.get("input_hash") != input_hash:
+			return None
+		if not all(os.path.isfile(output_file) for output_file in output_files):
+			return None
+		output_hash = hashFiles(output_files)
+		return output_hash if output_hash == stage_state.get("output_hash") else None
+
+	# Record the completed stage and return its output hash
+	def finishStage(self, stage, input_hash, output_files):
+		output_hash = hashFiles(output_files)
+		self.state_[stage] = {"input_hash": input_hash, "output_hash": output_hash}
+		database_file_writer.saveJsonFile(self.getCreationFileName("pipeline.json"), self.state_)
+		print "[DatabaseCreationPipeline]: Stage " + stage + " completed"
+		return output_hash
+
+	def getMapFiles(self):
+		return [self.getCreationFileName(file_name) for file_name in ["map.png", "segmentation_input.png", "map_data.json"]]
+
+	def runMapStage(self):
+		output_files = self.getMapFiles()
+		if not self.fetch_map_:
+			output_hash = self.getUpToDateOutputHash("map", None, output_files)
+			if output_hash is not None:
+				print "[DatabaseCreationPipeline]: Stage map is up to date"
+				return output_hash
+		self.initNode()
+		creator = self.database_creator_
+		creator.receiveMaps()
+		segmentation_input = creator.getSegmentationInputMap()
+		creator.writeImage(output_files[0], creator.cvBridge2OpenCv(creator.map_data_.map))
+		creator.writeImage(output_files[1], creator.cvBridge2OpenCv(segmentation_input.map))
+		map_data = getGlobalMapDataDict(creator.map_data_.map_resolution, creator.map_data_.map_origin, creator.map_data_.map.header.frame_id)
+		map_data["segmentation_input_map_resolution"] = segmentation_input.map_resolution
+		map_data["segmentation_input_map_origin"] = poseToArray(segmentation_input.map_origin)
+		database_file_writer.saveJsonFile(output_files[2], map_data)
+		return self.finishStage("map", None, output_files)
+
+	def getSegmentationFiles(self):
+		return [self.getCreationFileName(file_name) for file_name in ["segmented_map.npy", "segmentation.json"]]
+
+	# Segment the map and return (labels of the rooms (room ID + 1), room entries of segmentation.json)
+	def segmentMap(self, input_map_opencv, map_data):
+		self.initNode()
+		creator = self.database_creator_
+		result = creator.segmentMap(creator.openCv2CvBridge(input_map_opencv), map_data["segmentation_input_map_resolution"],
+									arrayToPose(map_data["segmentation_input_map_origin"]))
+		segmented_map = creator.cvBridge2OpenCv(result.segmented_map).astype(np.int32)
+		rooms = [{
+			"room_id": room_index,
+			"room_information_in_pixel": roomInformationToArray(result.room_information_in_pixel[room_index]),
+			"room_information_in_meter": roomInformationToArray(result.room_information_in_meter[room_index])
+		} for room_index in range(len(result.room_information_in_pixel))]
+		return (segmented_map, rooms)
+
+	# floor: re-segmented floor, kept_room_ids: IDs of the rooms of the other floors whose database entries are kept
+	def saveSegmentation(self, segmented_map, rooms, floor=None, kept_room_ids=None):
+		output_files = self.getSegmentationFiles()
+		with open(output_files[0] + ".part", "wb") as segmented_map_file:
+			np.save(segmented_map_file, segmented_map)
+		os.rename(output_files[0] + ".part", output_files[0])
+		database_file_writer.saveJsonFile(output_files[1], {"rooms": rooms, "resegmented_floor": floor, "kept_room_ids": kept_room_ids})
+
+	def runSegmentationStage(self, map_hash):
+		input_hash = hashValues(map_hash, self.database_creator_.map_segmentation_algorithm_, self.database_creator_.robot_radius_)
+		output_files = self.getSegmentationFiles()
+		output_hash = self.getUpToDateOutputHash("segmentation", input_hash, output_files)
+		if output_hash is not None:
+			print "[DatabaseCreationPipeline]: Stage segmentation is up to date"
+			return output_hash
+		map_data = self.loadJson(self.getMapFiles()[2])
+		(segmented_map, rooms) = self.segmentMap(cv2.imread(self.getMapFiles()[1], 0), map_data)
+		self.saveSegmentation(segmented_map, rooms)
+		return self.finishStage("segmentation", input_hash, output_files)
+
+	# Segment the rooms of one floor again and return the output hash
+	def runFloorSegmentationStage(self, map_hash, floor):
+		rooms_dict = self.loadJson(os.path.join(self.json_path_, "rooms.json"), {})
+		floor_room_ids = sorted(room["room_id"] for room in rooms_dict.values() if room.get("room_floor_id") == floor)
+		if len(floor_room_ids) == 0:
+			raise ValueError("There are no rooms of the floor " + str(floor) + " in rooms.json")
+		segmented_map = np.load(self.getSegmentationFiles()[0])
+		segmentation = self.loadJson(self.getSegmentationFiles()[1])
+		floor_region = np.in1d(segmented_map.ravel(), np.array(floor_room_ids) + 1).reshape(segmented_map.shape)
+
+		# segment the map of the floor only, all other pixels are obstacles
+		input_map_opencv = cv2.imread(self.getMapFiles()[1], 0)
+		input_map_opencv[~floor_region] = 0
+		(floor_segmented_map, floor_rooms) = self.segmentMap(input_map_opencv, self.loadJson(self.getMapFiles()[2]))
+		floor_segmented_map[~floor_region] = 0
+		room_pixel_counts = np.bincount(floor_segmented_map.ravel(), minlength=len(floor_rooms) + 1)
+		floor_rooms = [room for room in floor_rooms if room_pixel_counts[room["room_id"] + 1] > 0]
+
+		# the new rooms take the IDs of the former rooms of the floor, further rooms get new IDs
+		other_rooms = [room for room in segmentation["rooms"] if room["room_id"] not in floor_room_ids]
+		next_room_id = max([room["room_id"] for room in segmentation["rooms"]] + [-1]) + 1
+		room_ids = floor_room_ids + range(next_room_id, next_room_id + max(0, len(floor_rooms) - len(floor_room_ids)))
+		segmented_map[floor_region] = 0
+		for (floor_room, room_id) in zip(floor_rooms, room_ids):
+			segmented_map[floor_segmented_map == floor_room["room_id"] + 1] = room_id + 1
+			floor_room["room_id"] = room_id
+		self.saveSegmentation(segmented_map, other_rooms + floor_rooms, floor, sorted(room["room_id"] for room in other_rooms))
+		print "[DatabaseCreationPipeline]: Floor " + str(floor) + " segmented into " + str(len(floor_rooms)) + " rooms"
+
+		# a following run without --floor keeps this segmentation
+		input_hash = hashValues(map_hash, self.database_creator_.map_segmentation_algorithm_, self.database_creator_.robot_radius_)
+		return self.finishStage("segmentation", input_hash, self.getSegmentationFiles())
+
+	def getRoomsManifestFileName(self):
+		return self.getCreationFileName("rooms.json")
+
+	def runRoomsStage(self, segmentation_hash):
+		input_hash = hashValues(segmentation_hash, ROOM_MAP_FORMAT_VERSION)
+		manifest = self.loadJson(self.getRoomsManifestFileName(), {"rooms": []})
+		map_files = [os.path.join(self.maps_path_, room["map_filename"]) for room in manifest["rooms"]]
+		output_hash = self.getUpToDateOutputHash("rooms", input_hash, [self.getRoomsManifestFileName()] + map_files)
+		if output_hash is not None:
+			print "[DatabaseCreationPipeline]: Stage rooms is up to date"
+			return output_hash
+
+		segmented_map = np.load(self.getSegmentationFiles()[0])
+		room_ids = [room["room_id"] for room in self.loadJson(self.getSegmentationFiles()[1])["rooms"]]
+		map_resolution = self.loadJson(self.getMapFiles()[2])["map_resolution"]
+		pixel_indices = DatabaseCreator.getMapSegmentPixelIndices(segmented_map, max(room_ids + [-1]) + 1)
+		former_rooms = dict((room["room_id"], room) for room in manifest["rooms"])
+
+		(rooms, tasks) = ({}, [])
+		for room_id in room_ids:
+			if len(pixel_indices[room_id]) == 0:
+				print "[DatabaseCreationPipeline]: Room " + str(room_id) + " has no pixels, skipping it"
+				continue
+			(rows, columns) = np.divmod(pixel_indices[room_id], segmented_map.shape[1])
+			map_offset = [int(columns.min()), int(rows.min())]
+			window = getRoomWindow(segmented_map, map_offset, (rows.max() - rows.min() + 1, columns.max() - columns.min() + 1))
+			# the room geometry depends on the room pixels and on the wall pixels around the room
+			pixel_hash = hashValues(ROOM_MAP_FORMAT_VERSION, map_resolution, map_offset,
+									hashlib.sha1(np.packbits(window == room_id + 1).tostring() + np.packbits(window == 0).tostring()).hexdigest(), window.shape)
+			former_room = former_rooms.get(room_id)
+			if former_room is not None and former_room["pixel_hash"] == pixel_hash and os.path.isfile(os.path.join(self.maps_path_, former_room["map_filename"])):
+				rooms[room_id] = former_room
+			else:
+				tasks.append((room_id, window, map_offset, pixel_hash, map_resolution, os.path.join(self.maps_path_, "map_" + str(room_id) + ".png")))
+		print "[DatabaseCreationPipeline]: Writing " + str(len(tasks)) + " room maps, " + str(len(rooms)) + " are unchanged"
+		if len(tasks) > 0:
+			pool = Pool(self.process_count_)
+			try:
+				for room in pool.imap_unordered(extractRoom, tasks):
+					rooms[room["room_id"]] = room
+			finally:
+				pool.close()
+				pool.join()
+
+		# remove the maps of rooms which do not exist anymore
+		for (room_id, former_room) in former_rooms.items():
+			if room_id not in rooms and os.path.isfile(os.path.join(self.maps_path_, former_room["map_filename"])):
+				os.remove(os.path.join(self.maps_path_, former_room["map_filename"]))
+
+		manifest = {"rooms": [rooms[room_id] for room_id in sorted(rooms)]}
+		database_file_writer.saveJsonFile(self.getRoomsManifestFileName(), manifest)
+		map_files = [os.path.join(self.maps_path_, room["map_filename"]) for room in manifest["rooms"]]
+		return self.finishStage("rooms", input_hash, [self.getRoomsManifestFileName()] + map_files)
+
+	# Writes the database files. The entries of an existing rooms.json are kept (e.g. the data of the room plan),
+	# only their map data, room information and geometry are replaced. Rooms of a segmented floor get new entries.
+	def runDatabaseStage(self, map_hash, segmentation_hash, rooms_hash):
+		input_hash = hashValues(map_hash, rooms_hash)
+		rooms_file_name = os.path.join(self.json_path_, "rooms.json")
+		# rooms.json is changed by plan_to_json_converter.py and the application, so the stage tracks its own record of the written rooms
+		output_files = [self.getCreationFileName("database.json"), os.path.join(self.json_path_, "global_map_data.json"),
+						os.path.join(self.maps_path_, "global_map.png"), os.path.join(self.maps_path_, "global_map_segmented.png")]
+		output_hash = self.getUpToDateOutputHash("database", input_hash, output_files)
+		if output_hash is not None and os.path.isfile(rooms_file_name):
+			print "[DatabaseCreationPipeline]: Stage database is up to date"
+			return output_hash
+
+		map_data = self.loadJson(self.getMapFiles()[2])
+		segmentation = self.loadJson(self.getSegmentationFiles()[1])
+		segmentation_rooms = dict((room["room_id"], room) for room in segmentation["rooms"])
+		former_record = self.loadJson(output_files[0], {})
+		# the rooms of a segmented floor get new entries once, when the floor segmentation is written into the database
+		new_floor = segmentation.get("resegmented_floor") if former_record.get("segmentation_hash") != segmentation_hash else None
+		kept_room_ids = segmentation.get("kept_room_ids")
+
+		rooms_dict = self.loadJson(rooms_file_name, {})
+		former_room_keys = dict((room["room_id"], key) for (key, room) in rooms_dict.items())
+		room_database = database.Database(extracted_file_path=self.database_location_, auto_load_database=False)
+		merged_rooms_dict = {}
+		for room_entry in self.loadJson(self.getRoomsManifestFileName())["rooms"]:
+			room_id = room_entry["room_id"]
+			room_key = former_room_keys.get(room_id)
+			if room_key is not None and (new_floor is None or kept_room_ids is None or room_id in kept_room_ids):
+				room_dict = rooms_dict[room_key]
+				room_dict["room_map_filename"] = room_entry["map_filename"]
+				room_dict["room_map_offset"] = room_entry["map_offset"]
+				room_dict["room_information_in_pixel"] = segmentation_rooms[room_id]["room_information_in_pixel"]
+				room_dict["room_information_in_meter"] = segmentation_rooms[room_id]["room_information_in_meter"]
+				room_dict.update(room_entry["geometry"])
+			else:
+				room = DatabaseCreator.createRoomItem(room_id, room_entry["map_filename"], room_entry["map_offset"],
+													  arrayToRoomInformation(segmentation_rooms[room_id]["room_information_in_pixel"]),
+													  arrayToRoomInformation(segmentation_rooms[room_id]["room_information_in_meter"]), room_entry["geometry"])
+				if new_floor is not None:
+					room.room_floor_id_ = new_floor
+				room_database.rooms_ = [room]
+				(room_key, room_dict) = room_database.getRoomsDictFromRoomsList().items()[0]
+			merged_rooms_dict[room_key] = room_dict
+		# rooms which are not in the segmentation anymore have no map
+		for room_id in sorted(set(former_room_keys) - set(room["room_id"] for room in merged_rooms_dict.values())):
+			print "[DatabaseCreationPipeline]: Room " + str(room_id) + " does not exist anymore, removing its entry"
+		database_file_writer.saveJsonFile(rooms_file_name, merged_rooms_dict)
+
+		database_file_writer.saveJsonFile(output_files[1], dict((key, map_data[key]) for key in ["map_resolution", "map_origin", "map_header_frame_id"]))
+		with open(self.getMapFiles()[0], "rb") as map_file:
+			database_file_writer.writeFileAtomically(output_files[2], map_file.read(), binary=True)
+		segmented_map = np.load(self.getSegmentationFiles()[0])
+		self.database_creator_.writeImage(output_files[3], segmented_map.astype(np.uint8 if segmented_map.max() <= 255 else np.uint16))
+
+		# the settings and the progress of an existing database are kept
+		for (file_name, data) in [("robot_properties.json", ROBOT_PROPERTIES), ("robot_settings.json", ROBOT_SETTINGS), ("application_data.json", getApplicationDataDict())]:
+			if not os.path.isfile(os.path.join(self.json_path_, file_name)):
+				database_file_writer.saveJsonFile(os.path.join(self.json_path_, file_name), data)
+		database_file_writer.saveJsonFile(output_files[0], {"room_ids": sorted(room["room_id"] for room in merged_rooms_dict.values()), "segmentation_hash": segmentation_hash})
+		return self.finishStage("database", input_hash, output_files)
+
+	# Run all stages, skipping the stages which are up to date. floor: room_floor_id of the rooms which are segmented again.
+	def run(self, floor=None):
+		map_hash = self.runMapStage()
+		if floor is None:
+			segmentation_hash = self.runSegmentationStage(map_hash)
+		else:
+			segmentation_hash = self.runFloorSegmentationStage(map_hash, floor)
+		rooms_hash = self.runRoomsStage(segmentation_hash)
+		self.runDatabaseStage(map_hash, segmentation_hash, rooms_hash)
+
+
+if __name__ == '__main__':
+	parser = argparse.ArgumentParser(description='Create or update a database set from the map and room segmentation servers')
+	parser.add_argument('--database_location', default='resources', help='Folder of the database set. Default resources')
+	parser.add_argument('--fetch_map', action='store_true', help='Receive the map again, even if it has been received before')
+	parser.add_argument('--force', nargs='+', default=[], choices=STAGES, help='Stages which are run even if they are up to date')
+	parser.add_argument('--floor', default=None, help='Segment only the rooms of this floor (room_floor_id) again, keep the rooms of the other floors')
+	parser.add_argument('--processes', type=int, default=None, help='Number of processes which write the room maps. Default: number of CPUs')
+	parser.add_argument('--segmentation_algorithm', type=int, default=99, help='Room segmentation algorithm. Default 99')
+	parser.add_argument('--robot_radius', type=float, default=0.2875, help='Robot radius of the segmentation in meters. Default 0.2875')
+	args = parser.parse_args()
+
+	pipeline = DatabaseCreationPipeline(args.database_location, process_count=args.processes, force_stages=args.force, fetch_map=args.fetch_map,
+										segmentation_algorithm=args.segmentation_algorithm, robot_radius=args.robot_radius)
+	pipeline.run(args.floor)
@@ -2,6 +2,8 @@
 
 import database
 import database_classes
+# For the atomic replacement of the JSON files
+import database_file_writer
 import rospy
 # For json
 import json
@@ -21,6 +23,68 @@ from geometry_msgs.msg import Point32
 from datetime import datetime, timedelta
 # For CSV creation
 import csv
+# For writing the room maps in parallel
+from multiprocessing.pool import ThreadPool
+# For the area, perimeter, wall length and skeleton length of the rooms
+from room_geometry import computeRoomGeometry, getRoomWindow
+
+# Robot properties of a new database
+ROBOT_PROPERTIES = {
+	"exploration_coverage_radius": 0.25,
+	"exploration_field_of_view": [[0.04035, 0.136], [0.04035, -0.364], [0.54035, -0.364], [0.54035, 0.136]],
+	"exploration_header_frame_id": "base_link",
+	"exploration_robot_radius": 0.325,
+	"path_follow_goal_angle_tolerance": 0.2,
+	"path_follow_goal_position_tolerance": 0.5,
+	"path_follow_path_tolerance": 0.2,
+	"wall_follow_goal_angle_tolerance": 3.14,
+	"wall_follow_goal_position_tolerance": 0.4,
+	"wall_follow_path_tolerance": 0.2
+}
+
+# Robot settings of a new database
+ROBOT_SETTINGS = {
+	"shall_auto_complete": True,
+	"max_aux_time": 24,
+	"assignment_timedelta": 14
+}
+
+
+# Returns the application data of a new database
+def getApplicationDataDict():
+	return {
+		"last_database_save_successful": True,
+		"last_execution_date": database.Database.datetimeToString(datetime(1999, 1, 1)),
+		"last_planning_date": [
+			database.Database.datetimeToString(datetime(1900, 1, 1)),
+			database.Database.datetimeToString(datetime(1900, 1, 1))
+		],
+		"progress": [
+			0,
+			database.Database.datetimeToString(datetime(1900, 1, 1))
+		],
+		"run_count": 0,
+		"planning_offset": 720
+	}
+
+
+# Returns the global map data of a database. map_origin: geometry_msgs/Pose
+def getGlobalMapDataDict(map_resolution, map_origin, map_header_frame_id):
+	map_origin_array = [
+		map_origin.position.x,
+		map_origin.position.y,
+		map_origin.position.z,
+		map_origin.orientation.w,
+		map_origin.orientation.x,
+		map_origin.orientation.y,
+		map_origin.orientation.z
+	]
+	return {
+		"map_resolution": map_resolution,
+		"map_origin": map_origin_array,
+		"map_header_frame_id": map_header_frame_id
+	}
+
 
 class DatabaseCreator():
 
@@ -38,14 +102,14 @@ class DatabaseCreator():
 		self.map_segmentation_service_str_ = '/room_segmentation/room_segmentation_server'
 		self.map_segmentation_algorithm_ = 99
 		self.robot_radius_ = 0.2875
+		self.maps_path_ = "resources/maps"
+		# Number of threads which write the room map images
+		self.image_writer_count_ = 4
 
 	def createDatabase(self):
 		self.database_ = database.Database(auto_load_database=False)
 
-	def createSegmentedMap(self):
-
-		# Receive map
-		# ===========
+	def receiveMaps(self):
 
 		# receive the navigation map in sensor_msgs/Image format
 		rospy.wait_for_service(self.map_receiving_service_str_)
@@ -68,19 +132,17 @@ class DatabaseCreator():
 			except rospy.ServiceException, e:
 				print "No segmented map available: %s" % e
 				self.map_segmented_data_ = None
-		
-
 
-		# Segment map
-		# ===========
+	# Returns the map which is segmented: the segmented map if it is available, otherwise the navigation map
+	def getSegmentationInputMap(self):
+		return self.map_segmented_data_ if self.map_segmented_data_ is not None else self.map_data_
 
+	# Returns the result of the room segmentation of input_map (sensor_msgs/Image)
+	def segmentMap(self, input_map, map_resolution, map_origin):
 		segmentation_goal = MapSegmentationGoal()
-		#segmentation_goal.input_map = self.map_data_.map
-		#segmentation_goal.map_resolution = self.map_data_.map_resolution
-		#segmentation_goal.map_origin = self.map_data_.map_origin
-		segmentation_goal.input_map = self.map_segmented_data_.map
-		segmentation_goal.map_resolution = self.map_segmented_data_.map_resolution
-		segmentation_goal.map_origin = self.map_segmented_data_.map_origin
+		segmentation_goal.input_map = input_map
+		segmentation_goal.map_resolution = map_resolution
+		segmentation_goal.map_origin = map_origin
 		segmentation_goal.return_format_in_meter = True
 		segmentation_goal.return_format_in_pixel = True
 		segmentation_goal.robot_radius = self.robot_radius_
@@ -89,38 +151,76 @@ class DatabaseCreator():
 		segmentation_client.wait_for_server()
 		segmentation_client.send_goal(segmentation_goal)
 		segmentation_client.wait_for_result()
-		self.segmentation_result_ = segmentation_client.get_result()
+		return segmentation_client.get_result()
+
+	def createSegmentedMap(self):
+
+		# Receive map
+		# ===========
+
+		self.receiveMaps()
+
+		# Segment map
+		# ===========
+
+		input_map_data = self.getSegmentationInputMap()
+		self.map_resolution_ = input_map_data.map_resolution
+		self.segmentation_result_ = self.segmentMap(input_map_data.map, input_map_data.map_resolution, input_map_data.map_origin)
+
+	# Set the geometry of the room map (result of room_geometry.computeRoomGeometry)
+	@staticmethod
+	def setRoomGeometry(room, room_geometry):
+		room.room_surface_area_ = room_geometry["room_surface_area"]
+		room.room_perimeter_ = room_geometry["room_perimeter"]
+		room.room_wall_length_ = room_geometry["room_wall_length"]
+		room.room_skeleton_length_ = room_geometry["room_skeleton_length"]
+
+	# Returns a new room with the default data, which is replaced by the room plan data later (see plan_to_json_converter.py)
+	@staticmethod
+	def createRoomItem(room_id, map_filename, map_offset, room_information_in_pixel, room_information_in_meter, room_geometry):
+		room = database_classes.RoomItem()
+		room.room_name_ = "room_" + str(room_id)
+		room.room_id_ = room_id
+		room.room_position_id_ = "1_" + str(room_id)
+		room.room_floor_id_ = "1st Floor"
+		room.room_building_id_ = "Building C"
+		room.room_territory_id_ = "42"
+		room.room_surface_type_ = 0
+		room.room_cleaning_method_ = 0
+		room.room_trashcan_count_ = 4
+		room.room_cleaning_datestamps_ = [datetime(1900, 1, 1), datetime(1900, 1, 1), datetime(1900, 1, 1)]
+		room.room_issues_ = []
+		room.room_map_ = map_filename
+		room.room_map_filename_ = map_filename
+		room.room_map_offset_ = list(map_offset)
+		room.room_information_in_pixel_ = room_information_in_pixel
+		room.room_information_in_meter_ = room_information_in_meter
+		DatabaseCreator.setRoomGeometry(room, room_geometry)
+		room.room_scheduled_days_ = ["x","x","x","x","x","x","x","x","x","x","x","x","x","x"]
+		room.open_cleaning_tasks_ = []
+		return room
 
 	def createRoomEntries(self):
 		if (self.segmentation_result_ == None):
 			return
-		for i in range(len(self.segmentation_result_.room_information_in_pixel)):
+		room_count = len(self.segmentation_result_.room_information_in_pixel)
+		segmented_map = self.cvBridge2OpenCv(self.segmentation_result_.segmented_map)
+		image_writer = ThreadPool(self.image_writer_count_)
+		image_writes = []
+		for (i, (cv_image, offset)) in enumerate(self.getMapSegmentsAsCrops(segmented_map, room_count)):
 			print "Creating room " + str(i)
-			cv_image = self.getMapSegmentAsImage(self.cvBridge2OpenCv(self.segmentation_result_.segmented_map), i)
 			img_file_name = "map_" + str(i) + ".png"
-			cv2.imwrite("resources/maps/" + str(img_file_name), cv_image)
-			room = database_classes.RoomItem()
-			room.room_name_ = "room_" + str(i)
-			room.room_id_ = i
-			room.room_position_id_ = "1_" + str(i)
-			room.room_floor_id_ = "1st Floor"
-			room.room_building_id_ = "Building C"
-			room.room_territory_id_ = "42"
-			room.room_surface_type_ = 0
-			room.room_cleaning_method_ = 0
-			room.room_surface_area_ = 3.141
-			room.room_trashcan_count_ = 4
-			room.room_cleaning_datestamps_ = [datetime(1900, 1, 1), datetime(1900, 1, 1), datetime(1900, 1, 1)]
-			room.room_issues_ = []
-			room.room_map_ = img_file_name
+			image_writes.append(image_writer.apply_async(self.writeImage, (self.maps_path_ + "/" + str(img_file_name), cv_image)))
+			room_geometry = computeRoomGeometry(getRoomWindow(segmented_map, offset, cv_image.shape), i + 1, self.map_resolution_)
+			room = self.createRoomItem(i, img_file_name, offset, self.segmentation_result_.room_information_in_pixel[i],
+									   self.segmentation_result_.room_information_in_meter[i], room_geometry)
 			room.room_map_data_ = self.openCv2CvBridge(cv_image)
-			room.room_map_filename_ = img_file_name
-			room.room_information_in_pixel_ = self.segmentation_result_.room_information_in_pixel[i]
-			room.room_information_in_meter_ = self.segmentation_result_.room_information_in_meter[i]
-			room.room_scheduled_days_ = ["x","x","x","x","x","x","x","x","x","x","x","x","x","x"]
-			room.open_cleaning_tasks_ = []
 			self.database_.rooms_.append(room)
-
+		# wait for all images, raises the error of a failed write
+		for image_write in image_writes:
+			image_write.get()
+		image_writer.close()
+		image_writer.join()
 
 
 
@@ -130,79 +230,27 @@ class DatabaseCreator():
 		# Save global robot properties
 		# ============================
 
-		global_robot_properties_dict = {
-			"exploration_coverage_radius": 0.25,
-			"exploration_field_of_view": [[0.04035, 0.136], [0.04035, -0.364], [0.54035, -0.364], [0.54035, 0.136]],
-			"exploration_header_frame_id": "base_link",
-			"exploration_robot_radius": 0.325,
-			"path_follow_goal_angle_tolerance": 0.2,
-			"path_follow_goal_position_tolerance": 0.5,
-			"path_follow_path_tolerance": 0.2,
-			"wall_follow_goal_angle_tolerance": 3.14,
-			"wall_follow_goal_position_tolerance": 0.4,
-			"wall_follow_path_tolerance": 0.2
-		}
-		global_robot_properties_text = json.dumps(global_robot_properties_dict, indent=4, sort_keys=True)
-		file = open("resources/json/robot_properties.json", "w")
-		file.write(global_robot_properties_text)
+		database_file_writer.saveJsonFile("resources/json/robot_properties.json", ROBOT_PROPERTIES)
 
 		# Save global settings
 		# ====================
 
-		global_settings_dict = {
-			"shall_auto_complete": True,
-			"max_aux_time": 24,
-			"assignment_timedelta": 14
-		}
-		global_settings_text = json.dumps(global_settings_dict, indent=4, sort_keys=True)
-		file = open("resources/json/robot_settings.json", "w")
-		file.write(global_settings_text)
+		database_file_writer.saveJsonFile("resources/json/robot_settings.json", ROBOT_SETTINGS)
 
 		# Save global map data
 		# ====================
 
-		map_origin_array = [
-			self.map_data_.map_origin.position.x,
-			self.map_data_.map_origin.position.y,
-			self.map_data_.map_origin.position.z,
-			self.map_data_.map_origin.orientation.w,
-			self.map_data_.map_origin.orientation.x,
-			self.map_data_.map_origin.orientation.y,
-			self.map_data_.map_origin.orientation.z
-		]
-		global_map_data_dict = {
-			"map_resolution": self.map_data_.map_resolution,
-			"map_origin": map_origin_array,
-			"map_header_frame_id": self.map_data_.map.header.frame_id
-		}
-		global_map_data_text = json.dumps(global_map_data_dict, indent=4, sort_keys=True)
-		file = open("resources/json/global_map_data.json", "w")
-		file.write(global_map_data_text)
+		global_map_data_dict = getGlobalMapDataDict(self.map_data_.map_resolution, self.map_data_.map_origin, self.map_data_.map.header.frame_id)
+		database_file_writer.saveJsonFile("resources/json/global_map_data.json", global_map_data_dict)
 		segmented_map_image_opencv = self.cvBridge2OpenCv(self.segmentation_result_.segmented_map)
-		cv2.imwrite("resources/maps/global_map_segmented.png", segmented_map_image_opencv)
+		self.writeImage(self.maps_path_ + "/global_map_segmented.png", segmented_map_image_opencv)
 		map_image_opencv = self.cvBridge2OpenCv(self.map_data_.map)
-		cv2.imwrite("resources/maps/global_map.png", map_image_opencv)
+		self.writeImage(self.maps_path_ + "/global_map.png", map_image_opencv)
 
 		# Save global application data
 		# ============================
 
-		application_data_dict = {
-			"last_database_save_successful": True,
-			"last_execution_date": self.database_.datetimeToString(datetime(1999, 1, 1)),
-			"last_planning_date": [
-				datetime(1900, 1, 1),
-				datetime(1900, 1, 1)
-			],
-			"progress": [
-				0,
-				datetime(1900, 1, 1)
-			],
-			"run_count": 0,
-			"planning_offset": 720
-		}
-		application_data_dict_text = json.dumps(application_data_dict, indent=4, sort_keys=True)
-		file = open("resources/json/application_data.json", "w")
-		file.write(application_data_dict_text)
+		database_file_writer.saveJsonFile("resources/json/application_data.json", getApplicationDataDict())
 
 
 
@@ -265,26 +313,61 @@ class DatabaseCreator():
 
 
 
+	@staticmethod
+	def writeImage(file_name, opencv_image):
+		if not cv2.imwrite(file_name, opencv_image):
+			raise IOError("Could not write the image " + str(file_name))
+
+
 	# Method for returning the segment of the map corresponding to the order number as cv_bridge
 	def getMapSegmentAsImage(self, opencv_segmented_map, current_room_index):
-		image_height, image_width = opencv_segmented_map.shape
-		tmp_map_opencv = np.zeros((image_height, image_width), np.uint8)
-		for x in range(image_width):
-			for y in range(image_height):
-				if (opencv_segmented_map[y, x] == current_room_index + 1):
-					tmp_map_opencv[y, x] = 255
-		return tmp_map_opencv
+		return (opencv_segmented_map == current_room_index + 1).astype(np.uint8) * 255
+
+
+	# Returns the indices of the pixels (in the flattened map) of every room, the room with index i has the label i + 1.
+	# All rooms are found with one pass over the map and one sort of the room pixels.
+	@staticmethod
+	def getMapSegmentPixelIndices(opencv_segmented_map, room_count):
+		labels = opencv_segmented_map.ravel()
+		pixel_indices = np.flatnonzero((labels >= 1) & (labels <= room_count))
+		room_labels = labels[pixel_indices]
+		order = np.argsort(room_labels, kind='mergesort')
+		bounds = np.searchsorted(room_labels[order], np.arange(1, room_count + 2))
+		return [pixel_indices[order[bounds[i]:bounds[i + 1]]] for i in range(room_count)]
+
+
+	# Yields the segments of all rooms in the order of the room indices, like getMapSegmentAsImage
+	def getMapSegmentsAsImages(self, opencv_segmented_map, room_count):
+		for pixel_indices in self.getMapSegmentPixelIndices(opencv_segmented_map, room_count):
+			tmp_map_opencv = np.zeros(opencv_segmented_map.shape, np.uint8)
+			tmp_map_opencv.flat[pixel_indices] = 255
+			yield tmp_map_opencv
+
+
+	# Yields the bounding box crops of all rooms and their offsets (column, row) in the map, in the order of the room indices
+	def getMapSegmentsAsCrops(self, opencv_segmented_map, room_count):
+		image_width = opencv_segmented_map.shape[1]
+		for pixel_indices in self.getMapSegmentPixelIndices(opencv_segmented_map, room_count):
+			if len(pixel_indices) == 0:
+				yield (np.zeros((1, 1), np.uint8), (0, 0))
+				continue
+			(rows, columns) = np.divmod(pixel_indices, image_width)
+			(row_min, column_min) = (rows.min(), columns.min())
+			tmp_map_opencv = np.zeros((rows.max() - row_min + 1, columns.max() - column_min + 1), np.uint8)
+			tmp_map_opencv[rows - row_min, columns - column_min] = 255
+			yield (tmp_map_opencv, (int(column_min), int(row_min)))
 
 
 
 # =======================================================================================================
 # Calling the database creation
 
-rospy.init_node('database_creation')
-database_creator = DatabaseCreator()
-database_creator.runDatabaseCreation()
-database_creator.createRoomBook()
-database_creator.createTerritoryPlan()
+if __name__ == '__main__':
+	rospy.init_node('database_creation')
+	database_creator = DatabaseCreator()
+	database_creator.runDatabaseCreation()
+	database_creator.createRoomBook()
+	database_creator.createTerritoryPlan()
 
 
 
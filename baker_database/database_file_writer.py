@@ -0,0 +1,136 @@
+#!/usr/bin/env python
+
+import json
+import os
+import tempfile
+from collections import OrderedDict
+
+# Permissions of new files (rw-r--r--), mkstemp creates its files readable for the owner only.
+# The umask is not read, as os.umask changes it for all threads of the process.
+NEW_FILE_MODE = 0o644
+
+# ========================================================================
+# Description:
+# Atomic file writing for the database files.
+# A file is written into a temporary file in the same folder, synchronized
+# to the disk and then renamed to its final name. Readers therefore see
+# either the complete former or the complete new version of a file, even
+# after a crash.
+# Several files can be committed together with an AtomicWriteGroup. Its
+# files are renamed in the order they were written, after all of them have
+# been synchronized. The renames are not atomic as a whole: after a crash
+# during the commit, only the first files of the group can be renamed.
+# A replaced file keeps the permissions of the former file, a new file gets
+# NEW_FILE_MODE. The writing functions raise on any failure, callers may
+# only update their state (e.g. dirty flags) after they have returned.
+# ========================================================================
+
+
+# Synchronize the directory entries (i.e. a rename) of a folder to the disk
+def syncDirectory(directory):
+	try:
+		directory_descriptor = os.open(directory, os.O_RDONLY)
+	except OSError:
+		# Not supported on every platform
+		return
+	try:
+		os.fsync(directory_descriptor)
+	except OSError:
+		pass
+	finally:
+		os.close(directory_descriptor)
+
+
+# Returns the permissions of file_name, or the default permissions if it does not exist
+def getFileMode(file_name):
+	try:
+		return os.stat(file_name).st_mode & 0o7777
+	except OSError:
+		return NEW_FILE_MODE
+
+
+# Write text into a synchronized temporary file next to file_name. Returns the name of the temporary file.
+def writeTemporaryFile(file_name, text, binary=False):
+	directory = os.path.dirname(os.path.abspath(file_name))
+	(file_descriptor, tmp_file_name) = tempfile.mkstemp(prefix="." + os.path.basename(file_name) + ".", suffix=".part", dir=directory)
+	try:
+		with os.fdopen(file_descriptor, "wb" if binary else "w") as tmp_file:
+			tmp_file.write(text)
+			tmp_file.flush()
+			os.fsync(tmp_file.fileno())
+		os.chmod(tmp_file_name, getFileMode(file_name))
+	except:
+		os.remove(tmp_file_name)
+		raise
+	return tmp_file_name
+
+
+def writeFileAtomically(file_name, text, binary=False):
+	tmp_file_name = writeTemporaryFile(file_name, text, binary)
+	os.rename(tmp_file_name, file_name)
+	syncDirectory(os.path.dirname(os.path.abspath(file_name)))
+
+
+# Text representation of the database JSON files
+def jsonToText(data):
+	return json.dumps(data, indent=4, sort_keys=True)
+
+
+# Save data as JSON file. The file is written at once or, if a group is provided, on the commit of the group.
+def saveJsonFile(file_name, data, write_group=None):
+	if write_group is not None:
+		write_group.write(file_name, jsonToText(data))
+	else:
+		writeFileAtomically(file_name, jsonToText(data))
+
+
+class AtomicWriteGroup:
+
+	# Usage:
+	# with AtomicWriteGroup() as write_group:
+	#     write_group.write(file_name, text)
+	# The files are committed at the end of the with statement, nothing is written if an exception occurs.
+
+	def __init__(self):
+		# Writing the same file twice in one group only writes the last text
+		self.pending_files_ = OrderedDict()
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, exception_type, exception_value, traceback):
+		if exception_type is None:
+			self.commit()
+		else:
+			self.pending_files_.clear()
+		return False
+
+	def write(self, file_name, text):
+		self.pending_files_.pop(file_name, None)
+		self.pending_files_[file_name] = text
+
+	def commit(self):
+		tmp_file_names = []
+		try:
+			for (file_name, text) in self.pending_files_.items():
+				tmp_file_names.append((writeTemporaryFile(file_name, text), file_name))
+		except:
+			for (tmp_file_name, _) in tmp_file_names:
+				os.remove(tmp_file_name)
+			raise
+		directories = set()
+		try:
+			while len(tmp_file_names) > 0:
+				(tmp_file_name, file_name) = tmp_file_names[0]
+				os.rename(tmp_file_name, file_name)
+				directories.add(os.path.dirname(os.path.abspath(file_name)))
+				tmp_file_names.pop(0)
+		except:
+			# The files which are not renamed yet keep their former version
+			for (tmp_file_name, _) in tmp_file_names:
+				os.remove(tmp_file_name)
+			raise
+		finally:
+			for directory in directories:
+				syncDirectory(directory)
+			self.pending_files_.clear()
@@ -0,0 +1,68 @@
+#!/usr/bin/env python
+
+import cv2
+import numpy as np
+
+# ========================================================================
+# Description:
+# Geometry of a room from its pixels in the segmented map, computed when
+# the database is created and stored in the room entries of rooms.json:
+#	room_surface_area		area of the room pixels [m2]
+#	room_perimeter			length of the outer and inner room contours [m]
+#	room_wall_length		part of the perimeter which borders on no other
+#							room, i.e. on walls and obstacles [m]
+#	room_skeleton_length	length of the morphological skeleton (medial
+#							axis) of the free space of the room, e.g. for
+#							the travel distance through the room [m]
+# All values are computed on the bounding box of the room with a margin of
+# one pixel (see getRoomWindow), so the work depends on the room size.
+# ========================================================================
+
+
+# Returns the labels of the bounding box of a room (offset (column, row), crop_shape (height, width)) with a margin of one pixel.
+# The margin outside of the map has the label 0 (no room).
+def getRoomWindow(segmented_map, offset, crop_shape):
+	(column, row) = offset
+	window = np.zeros((crop_shape[0] + 2, crop_shape[1] + 2), segmented_map.dtype)
+	(row_min, column_min) = (max(row - 1, 0), max(column - 1, 0))
+	(row_max, column_max) = (min(row + crop_shape[0] + 1, segmented_map.shape[0]), min(column + crop_shape[1] + 1, segmented_map.shape[1]))
+	window[row_min - row + 1:row_max - row + 1, column_min - column + 1:column_max - column + 1] = segmented_map[row_min:row_max, column_min:column_max]
+	return window
+
+
+# Returns the pixels of the morphological skeleton of a mask (which must have an empty border)
+def computeSkeleton(mask):
+	element = cv2.getStructuringElement(cv2.MORPH_CROSS, (3, 3))
+	image = mask.astype(np.uint8)
+	skeleton = np.zeros(mask.shape, np.bool_)
+	while image.any():
+		eroded = cv2.erode(image, element)
+		skeleton |= (image > 0) & (cv2.dilate(eroded, element) == 0)
+		image = eroded
+	return skeleton
+
+
+# Returns the number of pixel edges between the mask and its surroundings and the number of those edges which border on the wall mask
+def countBoundaryEdges(mask, wall_mask):
+	(edge_count, wall_edge_count) = (0, 0)
+	for (mask_a, mask_b, wall_a, wall_b) in [(mask[:-1, :], mask[1:, :], wall_mask[:-1, :], wall_mask[1:, :]),
+											 (mask[:, :-1], mask[:, 1:], wall_mask[:, :-1], wall_mask[:, 1:])]:
+		(boundary_a, boundary_b) = (mask_a & ~mask_b, mask_b & ~mask_a)
+		edge_count += np.count_nonzero(boundary_a) + np.count_nonzero(boundary_b)
+		wall_edge_count += np.count_nonzero(boundary_a & wall_b) + np.count_nonzero(boundary_b & wall_a)
+	return (edge_count, wall_edge_count)
+
+
+# Returns the geometry of the room with the label in the window of the segmented map (see getRoomWindow) as dict of the rooms.json keys.
+# Pixels with the label 0 are walls, obstacles or unknown space. map_resolution [m/pixel].
+def computeRoomGeometry(window, label, map_resolution):
+	mask = window == label
+	contours = cv2.findContours(mask.astype(np.uint8), cv2.RETR_CCOMP, cv2.CHAIN_APPROX_NONE)[-2]
+	perimeter = sum(cv2.arcLength(contour, True) for contour in contours) * map_resolution
+	(edge_count, wall_edge_count) = countBoundaryEdges(mask, window == 0)
+	return {
+		"room_surface_area": float(np.count_nonzero(mask)) * map_resolution * map_resolution,
+		"room_perimeter": perimeter,
+		"room_wall_length": perimeter * wall_edge_count / edge_count if edge_count > 0 else 0.,
+		"room_skeleton_length": float(np.count_nonzero(computeSkeleton(mask))) * map_resolution
+	}
@@ -1,23 +1,26 @@
 #!/usr/bin/env python
 
 from move_base_behavior import MoveBaseBehavior
-from room_exploration_behavior import RoomExplorationBehavior
 from tool_changing_behavior import ToolChangingBehavior
 from trolley_movement_behavior import TrolleyMovementBehavior
 from behavior_container import BehaviorContainer
+from coverage_path_planner import CoveragePathPlanner
+from coverage_path_cache import CoveragePathCache, CACHE_FOLDER_NAME
+from coverage_analytics import computeCoverageStatistics
+from coverage_accumulator import CoverageAccumulator
+from coverage_tracker import CoverageTracker
 
 from utils import getCurrentRobotPosition
-from geometry_msgs.msg import Pose2D, Quaternion
+from service_proxy_pool import getServiceProxyPool
+from geometry_msgs.msg import Quaternion
 import ipa_building_msgs.srv
 import std_srvs.srv
 import rospy
 import services_params as srv
 from math import pi
 import dynamic_reconfigure.client
-from cv_bridge import CvBridge, CvBridgeError
-import cv2
-import numpy as np
 from threading import Thread
+import os
 
 class AbstractCleaningBehavior(BehaviorContainer):
 
@@ -40,9 +43,15 @@ class AbstractCleaningBehavior(BehaviorContainer):
 		self.reset_coverage_monitoring_service_str_ = srv.RESET_COVERAGE_MONITORING_SERVICE_STR
 
 		self.coverage_map_ = None
+		# Live coverage of the current room from the robot poses, runs while the coverage is monitored
+		self.coverage_tracker_ = None
 
 		self.thread_move_to_the_room = None
 
+		# The coverage paths of the next rooms are computed while the current room is cleaned
+		self.coverage_path_planner_ = None
+		self.coverage_path_prefetch_count_ = 2
+
 	def setCommonParameters(self, database_handler, sequencing_result, mapping, coverage_radius, field_of_view,
 					   field_of_view_origin, room_information_in_meter, robot_radius, robot_frame_id):
 		self.database_handler_ = database_handler
@@ -60,12 +69,11 @@ class AbstractCleaningBehavior(BehaviorContainer):
 		self.map_origin_ = self.database_handler_.database_.global_map_data_.map_origin_
 		self.map_header_frame_id_ = self.database_handler_.database_.global_map_data_.map_header_frame_id_
 
+	# The Trigger services of the behaviors switch states, so they may be called again
 	def callService(self, service_name, service_message):
 		print("Call for service {}".format(service_name))
-		rospy.wait_for_service(service_name)
 		try:
-			req = rospy.ServiceProxy(service_name, service_message)
-			req()
+			getServiceProxyPool().call(service_name, service_message, idempotent=True)
 		except rospy.ServiceException, e:
 			print("Service call to {} failed: {}".format(service_name, e))
 
@@ -93,11 +101,38 @@ class AbstractCleaningBehavior(BehaviorContainer):
 		except rospy.ServiceException, e:
 			print("Dynamic reconfigure request to " + self.coverage_monitor_dynamic_reconfigure_service_str_ + " failed: %s" % e)
 
+		if self.coverage_tracker_ is not None:
+			self.coverage_tracker_.start()
+
 	def startCoverageMonitoring(self):
 		self.callService(self.start_coverage_monitoring_service_str_, std_srvs.srv.Trigger)
+		if self.coverage_tracker_ is not None:
+			self.coverage_tracker_.start()
 
 	def stopCoverageMonitoring(self):
 		self.callService(self.stop_coverage_monitoring_service_str_, std_srvs.srv.Trigger)
+		if self.coverage_tracker_ is not None:
+			self.coverage_tracker_.stop()
+
+	# Track the coverage of the room from the robot poses, starts with the coverage monitoring
+	def createCoverageTracker(self, room_id):
+		self.stopCoverageTracker()
+		room = self.database_handler_.database_.getRoomById(room_id)
+		room_mask = room.room_mask_
+		accumulator = CoverageAccumulator(room_mask if room_mask is not None else room.room_map_data_, self.map_resolution_, self.map_origin_, self.field_of_view_,
+										  room_information_in_pixel=room.room_information_in_pixel_)
+		self.coverage_tracker_ = CoverageTracker(accumulator, map_frame=self.map_header_frame_id_, robot_frame=self.robot_frame_id_)
+
+	def stopCoverageTracker(self):
+		if self.coverage_tracker_ is not None:
+			self.coverage_tracker_.stop()
+			self.coverage_tracker_ = None
+
+	# Returns the coverage ratio of the current room from the robot poses, None if it is not tracked
+	def getLiveCoverageRatio(self):
+		if self.coverage_tracker_ is None:
+			return None
+		return self.coverage_tracker_.accumulator_.getCoverageRatio()
 
 	def resetCoverageMonitoring(self):
 		self.callService(self.reset_coverage_monitoring_service_str_, std_srvs.srv.Trigger)
@@ -107,9 +142,7 @@ class AbstractCleaningBehavior(BehaviorContainer):
 
 		area_map = self.database_handler_.database_.getRoomById(room_id).room_map_data_
 		self.printMsg("Receive coverage image from coverage monitor " + self.coverage_map_service_)
-		rospy.wait_for_service(self.coverage_map_service_)
 		try:
-			coverage_image_getter = rospy.ServiceProxy(self.coverage_map_service_, ipa_building_msgs.srv.CheckCoverage)
 			request = ipa_building_msgs.srv.CheckCoverageRequest()
 			request.input_map = area_map
 			request.map_resolution = self.map_resolution_
@@ -119,21 +152,26 @@ class AbstractCleaningBehavior(BehaviorContainer):
 			request.coverage_radius = self.coverage_radius_
 			request.check_for_footprint = False
 			request.check_number_of_coverages = False
-			return coverage_image_getter(request).coverage_map
+			return getServiceProxyPool().call(self.coverage_map_service_, ipa_building_msgs.srv.CheckCoverage, request, idempotent=True).coverage_map
 		except rospy.ServiceException, e:
 			print ("Service call to " + self.coverage_map_service_ + " failed: %s" % e)
 
-	def checkAndComputeCoverageRatio(self, room_id, coverage_map=None):
-		map_image = self.database_handler_.database_.getRoomById(room_id).room_map_data_
-		map_image = CvBridge().imgmsg_to_cv2(map_image, desired_encoding="passthrough")
+	# Returns the coverage ratio of the room. coverage_maps: coverage maps (messages) to combine, requested from the coverage monitor if None.
+	def checkAndComputeCoverageRatio(self, room_id, coverage_maps=None):
+		room = self.database_handler_.database_.getRoomById(room_id)
 
-		if coverage_map is None:
-			coverage_map = self.requestCoverageMapResponse(room_id)
-			coverage_map = CvBridge().imgmsg_to_cv2(coverage_map, desired_encoding="passthrough")
+		if coverage_maps is None:
+			coverage_maps = [self.requestCoverageMapResponse(room_id)]
 
-		ratio_cleaned = float(np.sum(coverage_map))/np.sum(map_image)
+		room_mask = room.room_mask_
+		statistics = computeCoverageStatistics(room_mask if room_mask is not None else room.room_map_data_, coverage_maps, self.map_resolution_, self.map_origin_,
+											   room_information_in_pixel=room.room_information_in_pixel_)
+		ratio_cleaned = statistics.coverage_ratio_
 
 		print("CLEANED {}".format(ratio_cleaned))
+		self.printMsg("Coverage of room ID {}: {}".format(room_id, statistics))
+		if self.getLiveCoverageRatio() is not None:
+			self.printMsg("Coverage of room ID {} from the robot poses: {:.3f}".format(room_id, self.getLiveCoverageRatio()))
 		assert(ratio_cleaned <= 1)
 		#  if ratio_cleaned < 0.9:
 		#     raise RuntimeWarning('Only {}% of room {} cleaned'.format(100*ratio_cleaned, room_id))
@@ -146,33 +184,62 @@ class AbstractCleaningBehavior(BehaviorContainer):
 		# nothing to be undone
 		pass
 
-	def computeCoveragePath(self, room_id):
-		self.printMsg('Starting computing coverage path of room ID {}'.format(room_id))
-
-		room_explorer = RoomExplorationBehavior("RoomExplorationBehavior",
-																		  self.interrupt_var_,
-																		  self.room_exploration_service_str_)
-
-		room_center = self.room_information_in_meter_[room_id].room_center
-		room_map_data = self.database_handler_.database_.getRoomById(room_id).room_map_data_
-		(robot_position, _, _) = getCurrentRobotPosition()
-		starting_position = (robot_position[0], robot_position[1]) if robot_position is not None else (room_center.x, room_center.y)
-		room_explorer.setParameters(
-			input_map=room_map_data,
-			map_resolution=self.database_handler_.database_.global_map_data_.map_resolution_,
-			map_origin=self.database_handler_.database_.global_map_data_.map_origin_,
+	def startCoveragePathPlanner(self):
+		path_cache = CoveragePathCache(os.path.join(self.database_handler_.database_.extracted_file_path, CACHE_FOLDER_NAME))
+		self.coverage_path_planner_ = CoveragePathPlanner(self.interrupt_var_, self.room_exploration_service_str_, path_cache=path_cache)
+		self.coverage_path_planner_.setParameters(
+			map_resolution=self.map_resolution_,
+			map_origin=self.map_origin_,
 			robot_radius=self.robot_radius_,
 			coverage_radius=self.coverage_radius_,
-			field_of_view=self.field_of_view_,  # this field of view represents the off-center iMop floor wiping device
+			field_of_view=self.field_of_view_,
 			field_of_view_origin=self.field_of_view_origin_,
-			starting_position=Pose2D(x=starting_position[0], y=starting_position[1], theta=0.),
-			# todo: determine theta
-			planning_mode=2 # 1 means robot view, 2 fov
+			planning_mode=2  # 1 means robot view, 2 fov
 		)
-		room_explorer.executeBehavior()
+
+	def stopCoveragePathPlanner(self):
+		if self.coverage_path_planner_ is not None:
+			self.coverage_path_planner_.close()
+			self.coverage_path_planner_ = None
+
+	# The coverage paths start at the room center, which is the goal of startMoveToTheRoom.
+	# Returns None if the room or its room information is unknown.
+	def getCoveragePathRequest(self, room_id):
+		room = self.database_handler_.database_.getRoomById(room_id)
+		room_information = self.room_information_in_meter_.get(room_id)
+		if room is None or room_information is None:
+			return None
+		room_center = room_information.room_center
+		return (room, (room_center.x, room_center.y))
+
+	# Returns the coverage path of the room and queues the computation of the paths of the next rooms
+	def computeCoveragePath(self, room_id):
+		self.printMsg('Starting computing coverage path of room ID {}'.format(room_id))
+		if self.coverage_path_planner_ is None:
+			self.startCoveragePathPlanner()
+
+		room_index = self.mapping_.index(room_id) if room_id in self.mapping_ else len(self.mapping_)
+		next_room_ids = self.mapping_[room_index + 1:room_index + 1 + self.coverage_path_prefetch_count_]
+		# rooms without room information are not prefetched
+		requests = [self.getCoveragePathRequest(current_room_id) for current_room_id in [room_id] + next_room_ids]
+		self.coverage_path_planner_.prefetch([request for request in requests if request is not None])
+
+		(room, starting_position) = self.getCoveragePathRequest(room_id)
+		path = self.coverage_path_planner_.getCoveragePath(room, starting_position)
 		self.printMsg('Coverage path of room ID {} computed.'.format(room_id))
+		return path if path is not None else []
 
-		return room_explorer.exploration_result_.coverage_path_pose_stamped
+	# Recompute the coverage path from the current robot position if the robot did not arrive at the room center
+	def checkCoveragePathStart(self, room_id, path):
+		(robot_position, _, _) = getCurrentRobotPosition()
+		if robot_position is None or self.coverage_path_planner_ is None:
+			return path
+		(room, starting_position) = self.getCoveragePathRequest(room_id)
+		if self.coverage_path_planner_.isCloseTo(starting_position, robot_position):
+			return path
+		self.printMsg('Robot is away from the center of room ID {}, recomputing the coverage path.'.format(room_id))
+		path = self.coverage_path_planner_.getCoveragePath(room, (robot_position[0], robot_position[1]))
+		return path if path is not None else []
 
 	def checkoutRoom(self, room_id, cleaning_method, nb_found_dirtspots=0, nb_found_trashcans=0, coverage_ratio=0):
 
@@ -233,20 +300,25 @@ class AbstractCleaningBehavior(BehaviorContainer):
 		self.tool_changer_.setParameters(self.database_handler_)
 		self.tool_changer_.executeBehavior()
 
-		room_counter = 0
-		for checkpoint in self.sequencing_result_.checkpoints:
-			# Trolley movement to checkpoint
-			self.trolley_mover_.setParameters(self.database_handler_)
-			self.trolley_mover_.executeBehavior()
-
-			self.move_base_handler_.setParameters(
-				goal_position=checkpoint.checkpoint_position_in_meter,
-				goal_orientation=Quaternion(x=0., y=0., z=0., w=1.),
-				goal_position_tolerance=0.5,
-				goal_angle_tolerance=2*pi
-			)
-			self.move_base_handler_.executeBehavior()
-			for _ in checkpoint.room_indices:
-				current_room_id = self.mapping_[room_counter]
-				self.executeCustomBehaviorInRoomId(room_id=current_room_id)
-				room_counter += 1
+		self.startCoveragePathPlanner()
+		try:
+			room_counter = 0
+			for checkpoint in self.sequencing_result_.checkpoints:
+				# Trolley movement to checkpoint
+				self.trolley_mover_.setParameters(self.database_handler_)
+				self.trolley_mover_.executeBehavior()
+
+				self.move_base_handler_.setParameters(
+					goal_position=checkpoint.checkpoint_position_in_meter,
+					goal_orientation=Quaternion(x=0., y=0., z=0., w=1.),
+					goal_position_tolerance=0.5,
+					goal_angle_tolerance=2*pi
+				)
+				self.move_base_handler_.executeBehavior()
+				for _ in checkpoint.room_indices:
+					current_room_id = self.mapping_[room_counter]
+					self.executeCustomBehaviorInRoomId(room_id=current_room_id)
+					room_counter += 1
+		finally:
+			self.stopCoverageTracker()
+			self.stopCoveragePathPlanner()
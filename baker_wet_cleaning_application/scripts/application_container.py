@@ -8,6 +8,7 @@ import threading
 from abc import ABCMeta, abstractmethod
 import std_msgs
 from cob_srvs.srv import SetInt, SetIntResponse
+from application_status import ApplicationStatus
 
 
 class ApplicationContainer:
@@ -23,10 +24,11 @@ class ApplicationContainer:
 
 	# Status of the application. 0=OK, 1=Paused, 2=Cancelled, 3=Terminate application server
 	# Starts with 2=Cancelled and waits for an action call to start the application
-	# using a vector because a single int number cannot be passed by reference,
-	# but this apparently works to automatically get the changed number also into the client behaviors
+	# The ApplicationStatus object is shared with the client behaviors, which are woken up on every change
 	STATUS = {'IS_RUNNING': 0, 'IS_PAUSED': 1, 'IS_CANCELLED': 2, 'IS_FINISHED': 3}
-	application_status_ = [STATUS['IS_CANCELLED']]
+	application_status_ = ApplicationStatus(STATUS['IS_CANCELLED'])
+	# Maximum time in seconds of a wait for a status change, after which rospy.is_shutdown() is checked
+	status_wait_timeout_ = 1.
 
 	def __init__(self, application_name, interrupt_action_name):
 		self.application_name_ = application_name
@@ -39,12 +41,15 @@ class ApplicationContainer:
 		# needs to be set to true after a pause for continuing the application
 		self.application_resumed_after_pause = False
 
+	# Publish the status on every change. The topic is latched, so new subscribers receive the current status.
 	def publishApplicationStatus(self):
-		application_status_pub = rospy.Publisher(str(self.application_name_) + '_status', std_msgs.msg.Int32, queue_size=1)
-		rate = rospy.Rate(5)  # 5hz
+		application_status_pub = rospy.Publisher(str(self.application_name_) + '_status', std_msgs.msg.Int32, queue_size=1, latch=True)
+		published_version = None
 		while not rospy.is_shutdown():
-			application_status_pub.publish(self.getStatus())
-			rate.sleep()
+			(version, status) = self.application_status_.waitForChange(published_version, self.status_wait_timeout_)
+			if version != published_version:
+				application_status_pub.publish(status)
+				published_version = version
 
 	# Method for printing messages.
 	def printMsg(self, text):
@@ -91,8 +96,8 @@ class ApplicationContainer:
 		self.printMsg("Current status is " + str(self.application_status_[0]))
 		if self.getStatus() == self.STATUS['IS_PAUSED']:
 			self.prePauseProcedure()
-			while self.getStatus() == self.STATUS['IS_PAUSED']:
-				rospy.sleep(.1)
+			while self.getStatus() == self.STATUS['IS_PAUSED'] and not rospy.is_shutdown():
+				self.application_status_.waitWhile([self.STATUS['IS_PAUSED']], self.status_wait_timeout_)
 			if self.getStatus() == self.STATUS['IS_RUNNING']:
 				self.application_resumed_after_pause = True
 				self.postPauseProcedure()
@@ -117,7 +122,6 @@ class ApplicationContainer:
 	# Call this method to execute the application.
 	def executeApplication(self):
 		self.printMsg("Application server started.")
-		rate = rospy.Rate(10)  # 10hz
 		while not rospy.is_shutdown():
 			if self.getStatus() == self.STATUS['IS_RUNNING']:
 				self.printMsg("Application started.")
@@ -130,10 +134,12 @@ class ApplicationContainer:
 			elif self.getStatus() == self.STATUS['IS_FINISHED']:
 				break
 
-			rate.sleep()
+			else:
+				# wait for the next start of the application
+				self.application_status_.waitUntil([self.STATUS['IS_RUNNING'], self.STATUS['IS_FINISHED']], self.status_wait_timeout_)
 
 	def setStatus(self, status):
-		self.application_status_[0] = status
+		self.application_status_.set(status)
 
 	def getStatus(self):
-		return self.application_status_[0]
+		return self.application_status_.get()
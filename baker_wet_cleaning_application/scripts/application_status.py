@@ -0,0 +1,85 @@
+#!/usr/bin/env python
+
+import threading
+import time
+
+# ========================================================================
+# Description:
+# Status of the application which is shared by the application, its
+# behaviors and the status topic (see ApplicationContainer.STATUS).
+# Every change of the status wakes up all threads waiting on it, so no one
+# has to poll the status. A version number counts the changes, such that
+# a waiting thread does not miss a change which happened in between.
+# For compatibility with the former status lists, the status can also be
+# accessed as status[0].
+# ========================================================================
+
+
+class ApplicationStatus:
+
+	def __init__(self, status):
+		self.status_ = status
+		self.version_ = 0
+		self.condition_ = threading.Condition()
+
+	def __getitem__(self, index):
+		if index != 0:
+			raise IndexError("ApplicationStatus only has the index 0")
+		return self.status_
+
+	def __setitem__(self, index, status):
+		if index != 0:
+			raise IndexError("ApplicationStatus only has the index 0")
+		self.set(status)
+
+	def __len__(self):
+		return 1
+
+	def get(self):
+		return self.status_
+
+	def getVersion(self):
+		return self.version_
+
+	# Set the status and wake up all waiting threads
+	def set(self, status):
+		with self.condition_:
+			self.status_ = status
+			self.version_ += 1
+			self.condition_.notify_all()
+
+	# Wake up all threads waiting on condition_ directly, e.g. for a status and another condition at once
+	def notifyAll(self):
+		with self.condition_:
+			self.condition_.notify_all()
+
+	# Block while the status is one of statuses, at most timeout seconds (None for no limit). Returns the current status.
+	def waitWhile(self, statuses, timeout=None):
+		return self.waitFor(lambda status: status not in statuses, timeout)
+
+	# Block until the status is one of statuses, at most timeout seconds (None for no limit). Returns the current status.
+	def waitUntil(self, statuses, timeout=None):
+		return self.waitFor(lambda status: status in statuses, timeout)
+
+	# Block until predicate(status) is True, at most timeout seconds (None for no limit). Returns the current status.
+	def waitFor(self, predicate, timeout=None):
+		deadline = None if timeout is None else time.time() + timeout
+		with self.condition_:
+			while not predicate(self.status_):
+				remaining = None if deadline is None else deadline - time.time()
+				if remaining is not None and remaining <= 0:
+					break
+				self.condition_.wait(remaining)
+			return self.status_
+
+	# Block until the version differs from version, at most timeout seconds (None for no limit).
+	# Returns the current (version, status).
+	def waitForChange(self, version, timeout=None):
+		deadline = None if timeout is None else time.time() + timeout
+		with self.condition_:
+			while self.version_ == version:
+				remaining = None if deadline is None else deadline - time.time()
+				if remaining is not None and remaining <= 0:
+					break
+				self.condition_.wait(remaining)
+			return (self.version_, self.status_)
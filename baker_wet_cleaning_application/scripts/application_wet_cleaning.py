@@ -10,6 +10,7 @@ from wet_cleaning_behavior import WetCleaningBehavior
 from trashcan_emptying_behavior import TrashcanEmptyingBehavior
 from threading import Thread
 import services_params as srv
+from service_proxy_pool import getServiceProxyPool
 
 import database
 import database_handler
@@ -17,6 +18,13 @@ import database_handler
 from geometry_msgs.msg import Point32
 import datetime
 
+DEFAULT_ROBOT_RADIUS = 0.325
+# Only used by tools which run without the application, e.g. the warm-up of the coverage path cache
+DEFAULT_COVERAGE_RADIUS = 0.233655
+# todo: read from MIRA
+FIELD_OF_VIEW = [Point32(x=-0.5, y=0.5), Point32(x=-0.5, y=-0.7), Point32(x=0.5, y=-0.7), Point32(x=0.5, y=0.7)]
+FIELD_OF_VIEW_ORIGIN = Point32(x=0.0, y=0.0)
+
 class WetCleaningApplication(application_container.ApplicationContainer):
 	# ========================================================================
 	# Description:
@@ -180,7 +188,7 @@ class WetCleaningApplication(application_container.ApplicationContainer):
 			self.robot_radius_ = rospy.get_param("robot_radius")
 			self.printMsg("Imported parameter robot_radius = " + str(self.robot_radius_))
 		else:
-			self.robot_radius_ = 0.325
+			self.robot_radius_ = DEFAULT_ROBOT_RADIUS
 			self.printMsg("Parameter robot_radius assigned to default value '{}'".format(self.robot_radius_))
 
 		if rospy.has_param('coverage_radius'):
@@ -200,9 +208,8 @@ class WetCleaningApplication(application_container.ApplicationContainer):
 		# self.field_of_view_ = [Point32(x=0.080, y=0.7), Point32(x=0.080, y=-0.7),
 		# 					   Point32(x=2.30, y=-0.7), Point32(x=2.30, y=0.7)]	# todo: read from MIRA
 
-		self.field_of_view_ = [Point32(x=-0.5, y=0.5), Point32(x=-0.5, y=-0.7),
-							   Point32(x=0.5, y=-0.7), Point32(x=0.5, y=0.7)]	# todo: read from MIRA
-		self.field_of_view_origin_ = Point32(x=0.0, y=0.0) # todo: read from MIRA
+		self.field_of_view_ = FIELD_OF_VIEW
+		self.field_of_view_origin_ = FIELD_OF_VIEW_ORIGIN
 
 		# todo: hack: cleaning device can be turned off for trade fair show
 		self.use_cleaning_device_ = False
@@ -312,6 +319,7 @@ class WetCleaningApplication(application_container.ApplicationContainer):
 		self.printMsg("Cleaning completed. Overwriting database...")
 		self.database_.application_data_.progress_ = [0, datetime.datetime.now()]
 		self.database_handler_.cleaningFinished()
+		getServiceProxyPool().printLatencies()
 
 	# Abstract method that contains the procedure to be done immediately after the application is paused.
 	def prePauseProcedure(self):
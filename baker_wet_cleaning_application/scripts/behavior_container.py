@@ -5,6 +5,7 @@ import tf
 from abc import ABCMeta, abstractmethod
 from threading import Lock
 from application_container import ApplicationContainer
+from application_status import ApplicationStatus
 
 _tl=None
 _tl_creation_lock = Lock()
@@ -30,17 +31,20 @@ class BehaviorContainer:
 	behavior_name_ = "<Unnamed>"
 	# Status of the behavior. 0=OK, 1=Cancelled, 2=Erroneous (use methods isOk, isCancelled, isErroneous)
 	behavior_status_ = 0
-	# Sleeping time in seconds
+	# Maximum time in seconds between two checks of a running action. Changes are signalled without delay.
 	sleep_time_ = 1
 
 	# Constructor
 	def __init__(self, behavior_name, interrupt_var):
 		self.behavior_name_ = behavior_name
-		# Get the pointer to the interrupt variable of the application container
-		self.interrupt_var_ = interrupt_var
-		self.mutex_ = Lock()
+		# Get the pointer to the interrupt variable (ApplicationStatus) of the application container
+		self.interrupt_var_ = self.toApplicationStatus(interrupt_var)
 		self.is_finished = False
 		self.state_ = None
+		# Set by the done callback of the current action goal
+		self.action_done_ = False
+		# Last feedback of the current action goal
+		self.action_feedback_ = None
 
 	# Method for printing messages.
 	def printMsg(self, text):
@@ -52,26 +56,28 @@ class BehaviorContainer:
 	# a trashcan is detected
 	# This function is used with 'setInterruptVar'
 	def interruptExecution(self):
-		self.mutex_.acquire()
-		self.interrupt_var_ = [ApplicationContainer.STATUS['IS_CANCELLED']]
-		self.mutex_.release()
+		self.setInterruptVar(ApplicationStatus(ApplicationContainer.STATUS['IS_CANCELLED']))
 
+	# The former interrupt variable is notified, so a runAction waiting on it sees the new one at once
 	def setInterruptVar(self, interrupt_var):
-		self.interrupt_var_ = interrupt_var
+		previous_interrupt_var = self.interrupt_var_
+		self.interrupt_var_ = self.toApplicationStatus(interrupt_var)
+		previous_interrupt_var.notifyAll()
+
+	# Status lists of former callers (e.g. [0]) are converted
+	@staticmethod
+	def toApplicationStatus(interrupt_var):
+		if isinstance(interrupt_var, ApplicationStatus):
+			return interrupt_var
+		return ApplicationStatus(interrupt_var[0])
 
 	# Method that returns the current interruption value [True/False]
 	def executionInterrupted(self):
-		self.mutex_.acquire()
-		is_interrupted = self.interrupt_var_[0] != ApplicationContainer.STATUS['IS_RUNNING'] \
-			and self.interrupt_var_[0] != ApplicationContainer.STATUS['IS_PAUSED']
-		self.mutex_.release()
-		return is_interrupted
+		status = self.interrupt_var_.get()
+		return status != ApplicationContainer.STATUS['IS_RUNNING'] and status != ApplicationContainer.STATUS['IS_PAUSED']
 
 	def executionPaused(self):
-		self.mutex_.acquire()
-		is_paused = self.interrupt_var_[0] == ApplicationContainer.STATUS['IS_PAUSED']
-		self.mutex_.release()
-		return is_paused
+		return self.interrupt_var_.get() == ApplicationContainer.STATUS['IS_PAUSED']
 
 	# Method that handles interruptions (ASSUMING: False=OK, True=INTERRUPT)
 	def handleInterrupt(self):
@@ -87,44 +93,70 @@ class BehaviorContainer:
 	def computeNewGoalFromPausedResult(self, prev_action_goal, result):
 		return prev_action_goal
 
+	# Done callback of the action goals sent by runAction
+	def actionDoneCallback(self, state, result):
+		self.action_done_ = True
+		self.interrupt_var_.notifyAll()
+
+	# Feedback callback of the action goals sent by runAction
+	def actionFeedbackCallback(self, feedback):
+		self.action_feedback_ = feedback
+
+	# Block until the current action goal is done or, if stop_on_status_change is True, the execution is paused or interrupted.
+	# Wakes up on the done callback and on status changes, the timeout only protects against lost servers.
+	def waitForAction(self, stop_on_status_change=True):
+		while not self.action_done_ and not rospy.is_shutdown():
+			status = self.interrupt_var_
+			with status.condition_:
+				if self.action_done_ or (stop_on_status_change and (self.executionPaused() or self.executionInterrupted())):
+					return
+				status.condition_.wait(self.sleep_time_)
+
+	def sendGoal(self, action_client, action_goal):
+		self.action_done_ = False
+		self.action_feedback_ = None
+		action_client.send_goal(action_goal, done_cb=self.actionDoneCallback, feedback_cb=self.actionFeedbackCallback)
+
 	# Method for running an action server, shall only be called from def executeCustomBehavior
-	# Definition of SimpleGoalState: 0 = PENDING, 1 = ACTIVE, 3 = DONE
+	# States of the goal (actionlib_msgs/GoalStatus): 0 = PENDING, 1 = ACTIVE, 3 = SUCCEEDED, other = failed
 	def runAction(self, action_client, action_goal):
 
 		self.is_finished = False
 		self.printMsg("Waiting for action " + str(action_client.action_client.ns) + " to become available...")
 		action_client.wait_for_server()
 
-		# loop --> ask for action finished and sleep for one second
-		# in loop check for interrupt --> if necessary stop action with self.executionInterrupted() == True and wait until action stopped
+		# wait for the action to finish or the execution to be paused or interrupted, without polling
+		# in case of an interrupt --> stop action with self.executionInterrupted() == True and wait until action stopped
 		while not self.is_finished:
 			resumed_after_pause = False
 			# action client --> call external functionality but do not wait for finishing
 			self.printMsg("Sending goal...")
-			action_client.send_goal(action_goal)
+			self.sendGoal(action_client, action_goal)
+
+			while not self.action_done_:
+				self.waitForAction()
 
-			while action_client.get_state() < 3:
-				if self.executionPaused():
+				if self.executionPaused() and not self.action_done_:
 					action_client.cancel_goal()
 					action_client.wait_for_result()
 					result = action_client.get_result()
 
+					# wait until the pause ends
 					while self.executionPaused() and not rospy.is_shutdown():
-						rospy.sleep(self.sleep_time_)
+						self.interrupt_var_.waitWhile([ApplicationContainer.STATUS['IS_PAUSED']], self.sleep_time_)
 
 					if self.interrupt_var_[0] == ApplicationContainer.STATUS['IS_RUNNING'] and not rospy.is_shutdown():
 						action_goal = self.computeNewGoalFromPausedResult(prev_action_goal=action_goal, result=result)
 						resumed_after_pause = True
+						break
 
 				if self.executionInterrupted() or rospy.is_shutdown():
 					action_client.cancel_goal()
-					while action_client.get_state() < 3 and not rospy.is_shutdown():
-						rospy.sleep(self.sleep_time_)
+					self.waitForAction(stop_on_status_change=False)
 					action_client.wait_for_result()
 					self.is_finished = True
 					self.state_ = action_client.get_state()
 					return {'interrupt_var': self.handleInterrupt(), 'result': action_client.get_result()}
-				rospy.sleep(self.sleep_time_)
 
 			if resumed_after_pause:
 				continue
@@ -0,0 +1,359 @@
+#!/usr/bin/env python
+
+import argparse
+import random
+import shutil
+import tempfile
+import timeit
+import os
+import numpy as np
+from datetime import datetime, timedelta
+from geometry_msgs.msg import Point32
+from ipa_building_msgs.msg import RoomInformation
+
+import database_classes
+import database_date_format
+import database_forecast
+import database_utils
+from database import Database
+from database_handler import DatabaseHandler
+
+# =========================================================
+# Benchmarks for the database related computations.
+# Usage: python benchmark_database.py --help
+# =========================================================
+
+
+# Creates a synthetic segmented map of size x size pixels split into a grid of (at least) room_count rooms
+# and returns the list of the full size room masks (mono8, 255 inside the room)
+def createRoomMaps(size, room_count):
+	grid = int(np.ceil(np.sqrt(room_count)))
+	cell = size // grid
+	room_maps = []
+	for room_index in range(room_count):
+		(row, column) = divmod(room_index, grid)
+		room_map = np.zeros((size, size), np.uint8)
+		room_map[row*cell + 1:(row + 1)*cell - 1, column*cell + 1:(column + 1)*cell - 1] = 255
+		room_maps.append(room_map)
+	return room_maps
+
+
+# Former implementation of the room map compositing in DatabaseHandler.getMapAndRoomInformationInPixel
+def compositeRoomMapsPixelLoop(room_maps, image_height, image_width):
+	tmp_map_opencv = np.zeros((image_height, image_width), np.uint8)
+	segmentation_id = 0
+	for room_map_opencv in room_maps:
+		for x in range(image_width):
+			for y in range(image_height):
+				if room_map_opencv[y, x] == 255:
+					tmp_map_opencv[y, x] = segmentation_id + 1
+		segmentation_id = segmentation_id + 1
+	return tmp_map_opencv
+
+
+def compositeRoomMapsVectorized(room_maps, image_height, image_width):
+	tmp_map_opencv = np.zeros((image_height, image_width), np.uint8)
+	segmentation_id = 0
+	for room_map_opencv in room_maps:
+		DatabaseHandler.addRoomMapToSegmentedMap(tmp_map_opencv, room_map_opencv, segmentation_id + 1)
+		segmentation_id = segmentation_id + 1
+	return tmp_map_opencv
+
+
+def benchmarkRoomMapCompositing(size, room_count, repetitions):
+	room_maps = createRoomMaps(size, room_count)
+	vectorized_map = compositeRoomMapsVectorized(room_maps, size, size)
+	loop_map = compositeRoomMapsPixelLoop(room_maps, size, size)
+	assert np.array_equal(vectorized_map, loop_map)
+
+	loop_time = timeit.timeit(lambda: compositeRoomMapsPixelLoop(room_maps, size, size), number=1)
+	vectorized_time = timeit.timeit(lambda: compositeRoomMapsVectorized(room_maps, size, size), number=repetitions) / repetitions
+	print("[Compositing] {}x{} px, {} rooms: pixel loop {:.3f}s | vectorized {:.4f}s | speedup x{:.0f}".format(
+		size, size, room_count, loop_time, vectorized_time, loop_time / vectorized_time))
+
+
+# Creates room_count rooms with the content of a typical room entry
+def createRooms(room_count):
+	rooms = []
+	for room_id in range(room_count):
+		room = database_classes.RoomItem()
+		room.room_id_ = room_id
+		room.room_name_ = "room_" + str(room_id)
+		room.room_position_id_ = "1_" + str(room_id)
+		room.room_floor_id_ = "1st Floor"
+		room.room_building_id_ = "Building C"
+		room.room_territory_id_ = "42"
+		room.room_map_filename_ = "map_" + str(room_id) + ".png"
+		room.room_surface_area_ = 20.
+		room.room_trashcan_count_ = 1
+		room.room_issues_ = []
+		room.room_scheduled_days_ = ["x", "", "p", "", "x", "", ""]*2
+		room.room_cleaning_datestamps_ = [datetime.now(), datetime.now(), datetime.now()]
+		room.open_cleaning_tasks_ = []
+		room.room_information_in_pixel_ = RoomInformation()
+		room.room_information_in_pixel_.room_center = Point32(x=10., y=10.)
+		room.room_information_in_pixel_.room_min_max.points = [Point32(x=0., y=0.), Point32(x=20., y=20.)]
+		room.room_information_in_meter_ = RoomInformation()
+		room.room_information_in_meter_.room_center = Point32(x=0.5, y=0.5)
+		room.room_information_in_meter_.room_min_max.points = [Point32(x=0., y=0.), Point32(x=1., y=1.)]
+		rooms.append(room)
+	return rooms
+
+
+# Creates a database in a temporary folder, which has to be removed by the caller
+def createDatabase(room_count):
+	database_location = tempfile.mkdtemp()
+	os.makedirs(database_location + "/json")
+	database = Database(extracted_file_path=database_location, auto_load_database=False)
+	database.application_data_ = database_classes.GlobalApplicationData()
+	database.application_data_.last_planning_date_ = [None, None]
+	database.application_data_.progress_ = [0, None]
+	database.rooms_ = createRooms(room_count)
+	return database, database_location
+
+
+def benchmarkIncrementalSave(room_counts, repetitions):
+	for room_count in room_counts:
+		(database, database_location) = createDatabase(room_count)
+		try:
+			def saveAllRooms():
+				database.tmp_rooms_synchronized_ = False
+				database.saveCompleteDatabase(temporal_file=True)
+
+			# Checking out a room changes a single room between two saves
+			def saveOneChangedRoom():
+				database.rooms_[0].open_cleaning_tasks_ = []
+				database.saveCompleteDatabase(temporal_file=True)
+
+			full_time = timeit.timeit(saveAllRooms, number=repetitions) / repetitions
+			incremental_time = timeit.timeit(saveOneChangedRoom, number=repetitions) / repetitions
+			print("[Saving] {} rooms: all rooms {:.2f}ms | one changed room {:.2f}ms".format(
+				room_count, 1000*full_time, 1000*incremental_time))
+		finally:
+			shutil.rmtree(database_location)
+
+
+def benchmarkRoomsLoading(room_counts, repetitions):
+	for room_count in room_counts:
+		(database, database_location) = createDatabase(room_count)
+		try:
+			database.saveRoomDatabase(temporal=False)
+			database.saveRoomsSnapshot()
+			json_time = timeit.timeit(database.readRoomsJson, number=repetitions) / repetitions
+			snapshot_time = timeit.timeit(database.readRooms, number=repetitions) / repetitions
+			print("[Loading] {} rooms: rooms.json {:.2f}ms | snapshot {:.2f}ms".format(
+				room_count, 1000*json_time, 1000*snapshot_time))
+		finally:
+			shutil.rmtree(database_location)
+
+
+# Database with the former date parsing by strptime
+class StrptimeDatabase(Database):
+
+	@staticmethod
+	def stringToDatetime(string_date):
+		return datetime.strptime(string_date, database_date_format.DATE_FORMAT)
+
+
+# Creates the dict of a log with entry_count entries, one entry per minute
+def createLogDict(entry_count):
+	log_dict = {}
+	first_date = datetime(2018, 7, 24, 6, 0)
+	for entry_index in range(entry_count):
+		date_and_time = database_date_format.datetimeToString(first_date + timedelta(minutes=entry_index))
+		log_dict[date_and_time] = {
+			"cleaned_surface_area": 20., "cleaning_task": 0, "date_and_time": date_and_time, "found_dirtspots": 0,
+			"found_trashcans": 1, "week_and_day": [30, 1], "room_id": entry_index % 100, "status": 0,
+			"trolley_capacity": 0, "used_water_amount": 0, "battery_usage": 0
+		}
+	return log_dict
+
+
+def benchmarkLogLoading(entry_count, repetitions):
+	log_dict = createLogDict(entry_count)
+	strptime_database = StrptimeDatabase(extracted_file_path=tempfile.gettempdir(), auto_load_database=False)
+	database = Database(extracted_file_path=tempfile.gettempdir(), auto_load_database=False)
+	assert [log_item.date_and_time_ for log_item in strptime_database.getLogListFromLogDict(log_dict)] == \
+		[log_item.date_and_time_ for log_item in database.getLogListFromLogDict(log_dict)]
+
+	strptime_time = timeit.timeit(lambda: strptime_database.getLogListFromLogDict(log_dict), number=repetitions) / repetitions
+	fast_time = timeit.timeit(lambda: database.getLogListFromLogDict(log_dict), number=repetitions) / repetitions
+	print("[Log loading] {} entries: strptime {:.1f}ms | database_date_format {:.1f}ms | speedup x{:.1f}".format(
+		entry_count, 1000*strptime_time, 1000*fast_time, strptime_time / fast_time))
+
+
+# Former implementation of DatabaseHandler.computeAllDueRooms (without the check for an earlier run)
+def computeAllDueRoomsLoop(database_handler):
+	database_handler.restoreDueRooms()
+	today = database_handler.robotToday().date()
+	today_index = database_handler.getTodaysScheduleIndex()
+	for room in database_handler.database_.rooms_:
+		cleaning_tasks = set(room.open_cleaning_tasks_)
+		method = room.room_cleaning_method_
+		schedule_char = room.room_scheduled_days_[today_index]
+		if schedule_char == "":
+			continue
+		date_stamps = room.room_cleaning_datestamps_
+		already_done = [date_stamp is not None and database_handler.realToRobotDate(date_stamp).date() == today for date_stamp in date_stamps]
+		if DatabaseHandler.isCleaningDay(schedule_char):
+			if DatabaseHandler.isTrashCleaningMethod(method) and not already_done[0]:
+				cleaning_tasks.add(DatabaseHandler.TRASH_TASK)
+			if DatabaseHandler.isDryCleaningMethod(method) and not already_done[1]:
+				cleaning_tasks.add(DatabaseHandler.DRY_TASK)
+			if DatabaseHandler.isWetCleaningMethod(method) and not already_done[2]:
+				cleaning_tasks.add(DatabaseHandler.WET_TASK)
+		elif DatabaseHandler.isTrashDay(schedule_char):
+			cleaning_tasks.add(DatabaseHandler.TRASH_TASK)
+		room.open_cleaning_tasks_ = list(cleaning_tasks)
+		if len(room.open_cleaning_tasks_) != 0:
+			database_handler.due_rooms_.append(room)
+
+
+# Former implementation of DatabaseHandler.computeAllOverdueRooms
+def computeAllOverdueRoomsLoop(database_handler):
+	today_index = database_handler.getTodaysScheduleIndex()
+	today = database_handler.robotToday()
+	overdue_rooms = set()
+	for room in database_handler.database_.rooms_:
+		if room in database_handler.due_rooms_:
+			continue
+		cleaning_tasks = set(room.open_cleaning_tasks_)
+		for day_delta in range(1, 14):
+			current_schedule_index = (today_index - day_delta) % 14
+			current_schedule_date = today - timedelta(days=day_delta)
+			schedule_char = room.room_scheduled_days_[current_schedule_index]
+			cleaning_method = room.room_cleaning_method_
+			if DatabaseHandler.isCleaningDay(schedule_char):
+				dates = [database_handler.realToRobotDate(date_stamp) for date_stamp in room.room_cleaning_datestamps_]
+				for (is_method, task, date) in [(DatabaseHandler.isTrashCleaningMethod, DatabaseHandler.TRASH_TASK, dates[0]),
+												(DatabaseHandler.isDryCleaningMethod, DatabaseHandler.DRY_TASK, dates[1]),
+												(DatabaseHandler.isWetCleaningMethod, DatabaseHandler.WET_TASK, dates[2])]:
+					if is_method(cleaning_method) and (date is None or date < current_schedule_date):
+						cleaning_tasks.add(task)
+						overdue_rooms.add(room)
+			elif DatabaseHandler.isTrashDay(schedule_char):
+				trashcan_date = room.room_cleaning_datestamps_[0]
+				if trashcan_date is None or trashcan_date < current_schedule_date:
+					cleaning_tasks.add(DatabaseHandler.TRASH_TASK)
+					overdue_rooms.add(room)
+		room.open_cleaning_tasks_ = list(cleaning_tasks)
+	database_handler.overdue_rooms_ = list(overdue_rooms)
+
+
+# Creates a scenario in the format of database_utils.updateDatabaseToScenario (see test_database_handler.py) for room_count rooms
+def createScheduleScenario(room_count, seed=0):
+	generator = random.Random(seed)
+	scenario = {'open_cleaning_tasks': {}, 'cleaning_methods': {}, 'room_cleaning_datestamps': {}, 'room_scheduled_days': {}}
+	for room_id in [str(room_id) for room_id in range(room_count)]:
+		scenario['cleaning_methods'][room_id] = generator.choice([-1, 0, 1, 2])
+		scenario['room_cleaning_datestamps'][room_id] = ['D-' + str(generator.randint(0, 13)) for _ in range(3)]
+		scenario['room_scheduled_days'][room_id] = dict(('D-' + str(generator.randint(0, 13)), generator.choice(['x', 'p', ''])) for _ in range(4))
+		if generator.random() < 0.1:
+			scenario['open_cleaning_tasks'][room_id] = [generator.choice([-1, 0, 1])]
+	return scenario
+
+
+def getRoomTasks(rooms):
+	return dict((room.room_id_, set(room.open_cleaning_tasks_)) for room in rooms)
+
+
+def benchmarkScheduling(room_counts, repetitions, planning_offset=720):
+	for room_count in room_counts:
+		(database, database_location) = createDatabase(room_count)
+		try:
+			database.saveCompleteDatabase(temporal_file=False)
+			json_location = database_location + "/json/"
+			database_utils.updateAndReturnPreviousPlanningOffset(planning_offset, database_location=json_location)
+			database_utils.updateDatabaseToScenario(createScheduleScenario(room_count), database_location=json_location, planning_offset=planning_offset)
+			database.updateGlobalApplicationData(database_utils.loadJsonDatabase(json_location + "application_data.json"))
+			database_handler = DatabaseHandler(database)
+			# The benchmark does not measure the saving of the database
+			database_handler.applyChangesToDatabase = lambda: None
+
+			def computeLoop():
+				database_handler.due_rooms_ = []
+				computeAllDueRoomsLoop(database_handler)
+				computeAllOverdueRoomsLoop(database_handler)
+
+			def computeScheduleEngine():
+				database_handler.computeAllDueRooms()
+				database_handler.computeAllOverdueRooms()
+
+			# Both implementations change the open cleaning tasks, so each run starts from freshly loaded rooms
+			def measure(compute):
+				duration = 0.
+				for _ in range(repetitions):
+					database.readRoomsJson()
+					start_time = timeit.default_timer()
+					compute()
+					duration += timeit.default_timer() - start_time
+				return duration / repetitions, (getRoomTasks(database_handler.due_rooms_), getRoomTasks(database_handler.overdue_rooms_))
+
+			(loop_time, loop_tasks) = measure(computeLoop)
+			(engine_time, engine_tasks) = measure(computeScheduleEngine)
+			assert loop_tasks == engine_tasks
+			print("[Scheduling] {} rooms ({} due, {} overdue): room loop {:.1f}ms | schedule engine {:.1f}ms".format(
+				room_count, len(engine_tasks[0]), len(engine_tasks[1]), 1000*loop_time, 1000*engine_time))
+		finally:
+			shutil.rmtree(database_location)
+
+
+# Creates a log history of entry_count checkouts of random rooms, a few minutes apart
+def createLogHistory(rooms, entry_count, seed=0):
+	generator = random.Random(seed)
+	log_items = []
+	date_and_time = datetime.now() - timedelta(days=30)
+	for _ in range(entry_count):
+		date_and_time = date_and_time + timedelta(minutes=generator.randint(1, 30))
+		log_item = database_classes.LogItem()
+		log_item.room_id_ = generator.choice(rooms).room_id_
+		log_item.cleaning_task_ = generator.choice([-1, 0, 1])
+		log_item.date_and_time_ = date_and_time
+		log_items.append(log_item)
+	return log_items
+
+
+def benchmarkForecast(room_count, days, repetitions, planning_offset=720):
+	(database, database_location) = createDatabase(room_count)
+	try:
+		generator = random.Random(0)
+		for room in database.rooms_:
+			room.room_scheduled_days_ = [generator.choice(["x", "p", "", ""]) for _ in range(14)]
+			room.room_cleaning_method_ = generator.choice([0, 1, 2])
+		database.application_data_.planning_offset_ = planning_offset
+		database_handler = DatabaseHandler(database)
+		log_items = createLogHistory(database.rooms_, 10*room_count)
+
+		def forecast():
+			forecaster = database_forecast.CleaningForecaster(database_handler, log_items=log_items)
+			return forecaster.forecast(days=days, shift_minutes=8*60)
+
+		day_forecasts = forecast()
+		forecast_time = timeit.timeit(forecast, number=repetitions) / repetitions
+		overrun_days = len([day_forecast for day_forecast in day_forecasts if day_forecast.isOverrun()])
+		print("[Forecast] {} rooms, {} days, {} log entries: {:.1f}ms, {} of {} shifts overrun".format(
+			room_count, days, len(log_items), 1000*forecast_time, overrun_days, days))
+	finally:
+		shutil.rmtree(database_location)
+
+
+if __name__ == '__main__':
+	parser = argparse.ArgumentParser(description='Benchmark the database related computations')
+	parser.add_argument('--map_size', type=int, default=500, help='Width and height of the synthetic map in pixels. Default 500')
+	parser.add_argument('--room_count', type=int, default=20, help='Number of rooms of the synthetic map. Default 20')
+	parser.add_argument('--repetitions', type=int, default=10, help='Number of repetitions of the fast implementations. Default 10')
+	parser.add_argument('--schedule_room_counts', type=int, nargs='+', default=[1000, 5000],
+						help='Room counts of the scheduling benchmark. Default 1000 5000')
+	parser.add_argument('--forecast_room_count', type=int, default=1000, help='Number of rooms of the forecast benchmark. Default 1000')
+	parser.add_argument('--forecast_days', type=int, default=14, help='Number of days of the forecast benchmark. Default 14')
+	parser.add_argument('--log_entry_count', type=int, default=10000, help='Number of entries of the log loading benchmark. Default 10000')
+	parser.add_argument('--save_room_counts', type=int, nargs='+', default=[10, 100, 1000],
+						help='Room counts of the database save and load benchmarks. Default 10 100 1000')
+	args = parser.parse_args()
+
+	benchmarkRoomMapCompositing(args.map_size, args.room_count, args.repetitions)
+	benchmarkIncrementalSave(args.save_room_counts, args.repetitions)
+	benchmarkRoomsLoading(args.save_room_counts, args.repetitions)
+	benchmarkLogLoading(args.log_entry_count, args.repetitions)
+	benchmarkScheduling(args.schedule_room_counts, args.repetitions)
+	benchmarkForecast(args.forecast_room_count, args.forecast_days, args.repetitions)
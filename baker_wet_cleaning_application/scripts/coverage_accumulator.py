@@ -0,0 +1,99 @@
+#!/usr/bin/env python
+
+from math import cos, sin, hypot
+from threading import Lock
+import cv2
+import numpy as np
+
+from coverage_analytics import getRoomCrop
+
+# ========================================================================
+# Description:
+# Tracks the covered area of a room while it is cleaned, from the poses
+# of the robot instead of the coverage images of the coverage monitor.
+# CoverageAccumulator rasterizes the field of view polygon (in the robot
+# frame) at every pose into a bitmap of the bounding box of the room. The
+# area swept between two consecutive poses is filled as well, so a low
+# pose rate leaves no gaps. The covered pixels of the room are counted
+# incrementally in the changed window, so the coverage ratio is always
+# available. The accumulator only needs numpy and cv2, so it can be fed
+# with recorded pose sequences offline (see replay_coverage.py).
+# CoverageTracker (coverage_tracker.py) feeds it with the robot pose from
+# tf while the room is cleaned.
+# ========================================================================
+
+
+class CoverageAccumulator:
+
+	# room_map: map of the room (RoomMask, message or array), map_resolution [m/pixel], map_origin: geometry_msgs/Pose of the pixel (0, 0),
+	# field_of_view: points (x, y) of the field of view polygon in the robot frame,
+	# max_sweep_distance [m]: the area between two poses which are further apart is not filled (e.g. after a relocalization)
+	def __init__(self, room_map, map_resolution, map_origin, field_of_view, room_information_in_pixel=None, max_sweep_distance=1.):
+		(room_crop, self.rows_, self.columns_, self.map_shape_) = getRoomCrop(room_map, room_information_in_pixel)
+		self.room_mask_ = room_crop > 0
+		self.room_pixel_count_ = np.count_nonzero(self.room_mask_)
+		self.covered_ = np.zeros(self.room_mask_.shape, np.uint8)
+		self.covered_pixel_count_ = 0
+		self.map_resolution_ = map_resolution
+		# Position of the pixel (0, 0) of the bitmap in meters
+		self.bitmap_origin_ = (map_origin.position.x + self.columns_.start * map_resolution, map_origin.position.y + self.rows_.start * map_resolution)
+		self.field_of_view_ = np.array([(point.x, point.y) for point in field_of_view], np.float64)
+		self.max_sweep_distance_ = max_sweep_distance
+		# Field of view polygon in pixels and position of the last pose
+		(self.last_polygon_, self.last_position_) = (None, None)
+		self.mutex_ = Lock()
+
+	# Returns the field of view polygon at the pose in pixels of the bitmap
+	def getPolygon(self, x, y, yaw):
+		rotation = np.array([[cos(yaw), -sin(yaw)], [sin(yaw), cos(yaw)]])
+		points = self.field_of_view_.dot(rotation.T) + (x, y)
+		return (points - self.bitmap_origin_) / self.map_resolution_
+
+	# Fill the polygon and update the count of the covered room pixels. Call with self.mutex_ acquired.
+	def fillPolygon(self, polygon):
+		(height, width) = self.covered_.shape
+		(column_min, row_min) = np.maximum(np.floor(polygon.min(axis=0)).astype(np.int64), 0)
+		(column_max, row_max) = np.minimum(np.ceil(polygon.max(axis=0)).astype(np.int64) + 1, (width, height))
+		if column_min >= column_max or row_min >= row_max:
+			return
+		window = (slice(row_min, row_max), slice(column_min, column_max))
+		covered_before = np.count_nonzero(self.covered_[window] & self.room_mask_[window])
+		hull = cv2.convexHull(np.round(polygon).astype(np.int32))
+		cv2.fillConvexPoly(self.covered_, hull, 1)
+		self.covered_pixel_count_ += np.count_nonzero(self.covered_[window] & self.room_mask_[window]) - covered_before
+
+	# Add a pose (x, y in meters, yaw in radians) of the robot in the map frame
+	def addPose(self, x, y, yaw):
+		polygon = self.getPolygon(x, y, yaw)
+		with self.mutex_:
+			if self.last_position_ is not None and hypot(x - self.last_position_[0], y - self.last_position_[1]) <= self.max_sweep_distance_:
+				self.fillPolygon(np.vstack((self.last_polygon_, polygon)))
+			else:
+				self.fillPolygon(polygon)
+			(self.last_polygon_, self.last_position_) = (polygon, (x, y))
+
+	# Add a sequence of poses [(x, y, yaw), ...], e.g. a recorded trajectory
+	def addPoses(self, poses):
+		for (x, y, yaw) in poses:
+			self.addPose(x, y, yaw)
+
+	# Start a new sweep at the next pose, e.g. when the robot has been moved without cleaning
+	def interruptSweep(self):
+		with self.mutex_:
+			(self.last_polygon_, self.last_position_) = (None, None)
+
+	def getCoverageRatio(self):
+		with self.mutex_:
+			return float(self.covered_pixel_count_) / self.room_pixel_count_ if self.room_pixel_count_ > 0 else 0.
+
+	# Returns True if at least the ratio of the room is covered
+	def isCovered(self, ratio):
+		return self.getCoverageRatio() >= ratio
+
+	# Returns the coverage map (255 = covered) of the room in the size of the global map
+	def getCoverageMap(self):
+		coverage_map = np.zeros(self.map_shape_, np.uint8)
+		with self.mutex_:
+			coverage_map[self.rows_, self.columns_] = (self.covered_ & self.room_mask_) * 255
+		return coverage_map
+
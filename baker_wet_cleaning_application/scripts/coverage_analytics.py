@@ -0,0 +1,128 @@
+#!/usr/bin/env python
+
+from threading import Lock
+import cv2
+import numpy as np
+from database_map_cache import RoomMask
+
+# ========================================================================
+# Description:
+# Coverage statistics of a room from its map and the coverage maps of the
+# coverage monitor.
+# All images are cropped to the bounding box of the room (of a RoomMask or
+# from room_information_in_pixel_) before they are evaluated, so the work
+# depends on the size of the room instead of the size of the global map.
+# Several coverage maps (e.g. of the path following and of the wall
+# following) are combined in the crop. One pass computes the coverage
+# ratio and the connected uncovered regions with their area, centroid and
+# bounding box. The results are small and can be printed or logged.
+# ========================================================================
+
+_bridge = None
+_bridge_creation_lock = Lock()
+
+
+# Returns the CvBridge shared by all conversions of this module
+def getCvBridge():
+	global _bridge
+	with _bridge_creation_lock:
+		if _bridge is None:
+			from cv_bridge import CvBridge
+			_bridge = CvBridge()
+		return _bridge
+
+
+# Returns an image message (sensor_msgs/Image) or a numpy array as numpy array
+def toImage(image):
+	if isinstance(image, np.ndarray):
+		return image
+	return getCvBridge().imgmsg_to_cv2(image, desired_encoding="passthrough")
+
+
+# Returns the slices (rows, columns) of the bounding box of the room, the full image if it is unknown
+def getRoomSlices(room_information_in_pixel, shape):
+	if room_information_in_pixel is None or len(room_information_in_pixel.room_min_max.points) < 2:
+		return (slice(0, shape[0]), slice(0, shape[1]))
+	(min_point, max_point) = room_information_in_pixel.room_min_max.points[:2]
+	rows = slice(max(0, int(min_point.y)), min(shape[0], int(max_point.y) + 1))
+	columns = slice(max(0, int(min_point.x)), min(shape[1], int(max_point.x) + 1))
+	return (rows, columns)
+
+
+# Returns (crop of the room map, slices (rows, columns) of the crop, (height, width) of the global map).
+# room_map: RoomMask, message or array of the full-size room map.
+def getRoomCrop(room_map, room_information_in_pixel=None):
+	if isinstance(room_map, RoomMask):
+		(rows, columns) = room_map.getSlices()
+		return (room_map.mask_, rows, columns, room_map.map_shape_)
+	room_map = toImage(room_map)
+	(rows, columns) = getRoomSlices(room_information_in_pixel, room_map.shape)
+	return (room_map[rows, columns], rows, columns, room_map.shape[:2])
+
+
+class UncoveredRegion:
+
+	def __init__(self, area, centroid, bounding_box):
+		# Area in square meters
+		self.area_ = area
+		# Centroid (x, y) in meters
+		self.centroid_ = centroid
+		# (column, row, width, height) in pixels of the global map
+		self.bounding_box_ = bounding_box
+
+	def __str__(self):
+		return "{:.2f} m2 at ({:.2f}, {:.2f})".format(self.area_, self.centroid_[0], self.centroid_[1])
+
+
+class CoverageStatistics:
+
+	def __init__(self, room_area, covered_area, uncovered_regions, uncovered_region_count):
+		# Areas in square meters
+		self.room_area_ = room_area
+		self.covered_area_ = covered_area
+		self.coverage_ratio_ = covered_area / room_area if room_area > 0. else 0.
+		# Largest uncovered regions, sorted by decreasing area
+		self.uncovered_regions_ = uncovered_regions
+		# Number of all uncovered regions
+		self.uncovered_region_count_ = uncovered_region_count
+
+	def __str__(self):
+		return "covered {:.3f} of {:.2f} m2, {} uncovered regions{}".format(
+			self.coverage_ratio_, self.room_area_, self.uncovered_region_count_,
+			"".join(", " + str(region) for region in self.uncovered_regions_))
+
+
+# Computes the coverage statistics of a room.
+# room_map: map of the room (RoomMask, message or array), coverage_maps: list of coverage maps of the same size (messages or arrays, None is skipped),
+# map_resolution [m/pixel], map_origin: geometry_msgs/Pose of the pixel (0, 0),
+# max_regions: number of the largest uncovered regions which are returned, min_region_area: smaller regions [m2] are ignored.
+def computeCoverageStatistics(room_map, coverage_maps, map_resolution, map_origin, room_information_in_pixel=None, max_regions=5, min_region_area=0.):
+	(room_crop, rows, columns, _) = getRoomCrop(room_map, room_information_in_pixel)
+	room_mask = room_crop > 0
+	covered_mask = np.zeros(room_mask.shape, np.bool_)
+	for coverage_map in coverage_maps:
+		if coverage_map is not None:
+			covered_mask |= toImage(coverage_map)[rows, columns] > 0
+	covered_mask &= room_mask
+	uncovered_mask = room_mask & ~covered_mask
+
+	pixel_area = map_resolution * map_resolution
+	(_, _, stats, centroids) = cv2.connectedComponentsWithStats(uncovered_mask.view(np.uint8), connectivity=8)
+	# label 0 is the background
+	areas = stats[1:, cv2.CC_STAT_AREA] * pixel_area
+	labels = [label for label in np.argsort(-areas) + 1 if areas[label - 1] >= min_region_area]
+	uncovered_regions = []
+	for label in labels[:max_regions]:
+		(column, row) = (centroids[label][0] + columns.start, centroids[label][1] + rows.start)
+		uncovered_regions.append(UncoveredRegion(
+			area=float(areas[label - 1]),
+			centroid=(map_origin.position.x + column * map_resolution, map_origin.position.y + row * map_resolution),
+			bounding_box=(int(stats[label, cv2.CC_STAT_LEFT]) + columns.start, int(stats[label, cv2.CC_STAT_TOP]) + rows.start,
+						  int(stats[label, cv2.CC_STAT_WIDTH]), int(stats[label, cv2.CC_STAT_HEIGHT]))))
+
+	return CoverageStatistics(
+		room_area=float(np.count_nonzero(room_mask)) * pixel_area,
+		covered_area=float(np.count_nonzero(covered_mask)) * pixel_area,
+		uncovered_regions=uncovered_regions,
+		uncovered_region_count=len(labels)
+	)
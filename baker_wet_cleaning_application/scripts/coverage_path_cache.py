@@ -0,0 +1,167 @@
+#!/usr/bin/env python
+
+import argparse
+import hashlib
+import io
+import os
+import numpy as np
+import rospy
+from geometry_msgs.msg import PoseStamped
+import database_file_writer
+
+# ========================================================================
+# Description:
+# Persistent cache of the coverage paths of the rooms.
+# A path is stored in one binary file (numpy .npz) per key, where the key
+# is the hash of the room map, the planning parameters and the planning
+# mode (see CoveragePathPlanner.getCacheKey). The poses are stored as
+# N x 7 array (position x, y, z, orientation x, y, z, w), the header
+# stamps as N x 2 array (secs, nsecs), the frame IDs and the starting
+# position of the planning, which the planner compares with the requested
+# one.
+# The least recently used paths are removed when there are more than
+# max_entries paths.
+#
+# Precompute the paths of all rooms (needs the room exploration server):
+# python coverage_path_cache.py --warm_up [--database_location ../resources]
+# ========================================================================
+
+CACHE_FOLDER_NAME = "coverage_paths"
+# Increase on every change of the file format
+CACHE_VERSION = 2
+CACHE_EXTENSION = ".npz"
+
+
+class CoveragePathCache:
+
+	def __init__(self, cache_path, max_entries=1000):
+		self.cache_path_ = cache_path
+		self.max_entries_ = max(1, max_entries)
+
+	@staticmethod
+	def getKeyHash(key):
+		return hashlib.sha1(repr((CACHE_VERSION, key))).hexdigest()
+
+	def getFileName(self, key):
+		return os.path.join(self.cache_path_, self.getKeyHash(key) + CACHE_EXTENSION)
+
+	@staticmethod
+	def pathToArrays(path):
+		poses = np.array([[
+			pose.pose.position.x, pose.pose.position.y, pose.pose.position.z,
+			pose.pose.orientation.x, pose.pose.orientation.y, pose.pose.orientation.z, pose.pose.orientation.w
+		] for pose in path], np.float64).reshape(-1, 7)
+		stamps = np.array([[pose.header.stamp.secs, pose.header.stamp.nsecs] for pose in path], np.int64).reshape(-1, 2)
+		frame_ids = np.array([pose.header.frame_id for pose in path], np.str_)
+		return (poses, stamps, frame_ids)
+
+	@staticmethod
+	def arraysToPath(poses, stamps, frame_ids):
+		path = []
+		for (pose_values, stamp, frame_id) in zip(poses.tolist(), stamps.tolist(), frame_ids.tolist()):
+			pose = PoseStamped()
+			pose.header.frame_id = frame_id
+			pose.header.stamp = rospy.Time(stamp[0], stamp[1])
+			(pose.pose.position.x, pose.pose.position.y, pose.pose.position.z) = pose_values[0:3]
+			(pose.pose.orientation.x, pose.pose.orientation.y, pose.pose.orientation.z, pose.pose.orientation.w) = pose_values[3:7]
+			path.append(pose)
+		return path
+
+	# Returns the cached path (list of PoseStamped) and its starting position (x, y) or None
+	def load(self, key):
+		file_name = self.getFileName(key)
+		if not os.path.isfile(file_name):
+			return None
+		try:
+			with open(file_name, "rb") as cache_file:
+				arrays = np.load(cache_file)
+				path = self.arraysToPath(arrays["poses"], arrays["stamps"], arrays["frame_ids"])
+				starting_position = tuple(arrays["starting_position"].tolist())
+		except Exception as e:
+			print("[CoveragePathCache]: Ignoring unreadable path " + str(file_name) + ": " + str(e))
+			return None
+		# the modification time tells the eviction which paths have been used recently
+		try:
+			os.utime(file_name, None)
+		except OSError:
+			pass
+		return (path, starting_position)
+
+	def save(self, key, path, starting_position):
+		if not os.path.isdir(self.cache_path_):
+			os.makedirs(self.cache_path_)
+		(poses, stamps, frame_ids) = self.pathToArrays(path)
+		data = io.BytesIO()
+		np.savez(data, poses=poses, stamps=stamps, frame_ids=frame_ids, starting_position=np.array(starting_position[:2], np.float64))
+		database_file_writer.writeFileAtomically(self.getFileName(key), data.getvalue(), binary=True)
+		self.evict()
+
+	# Remove the least recently used paths beyond max_entries
+	def evict(self):
+		file_names = [os.path.join(self.cache_path_, file_name) for file_name in os.listdir(self.cache_path_) if file_name.endswith(CACHE_EXTENSION)]
+		if len(file_names) <= self.max_entries_:
+			return
+		modification_times = {}
+		for file_name in file_names:
+			try:
+				modification_times[file_name] = os.path.getmtime(file_name)
+			except OSError:
+				pass
+		for file_name in sorted(modification_times, key=modification_times.get)[:len(modification_times) - self.max_entries_]:
+			try:
+				os.remove(file_name)
+			except OSError:
+				pass
+
+	def clear(self):
+		if not os.path.isdir(self.cache_path_):
+			return
+		for file_name in os.listdir(self.cache_path_):
+			if file_name.endswith(CACHE_EXTENSION):
+				os.remove(os.path.join(self.cache_path_, file_name))
+
+
+if __name__ == '__main__':
+	parser = argparse.ArgumentParser(description='Manage the coverage path cache of the rooms')
+	command = parser.add_mutually_exclusive_group(required=True)
+	command.add_argument('--warm_up', action='store_true', help='Compute the coverage paths of all rooms which are not cached yet')
+	command.add_argument('--clear', action='store_true', help='Remove all cached coverage paths')
+	parser.add_argument('--database_location', default='../resources', help='Folder containing the database. Default ../resources')
+	args = parser.parse_args()
+
+	if args.clear:
+		CoveragePathCache(os.path.join(args.database_location, CACHE_FOLDER_NAME)).clear()
+	else:
+		from database import Database
+		from application_status import ApplicationStatus
+		from application_container import ApplicationContainer
+		from coverage_path_planner import CoveragePathPlanner
+		import application_wet_cleaning
+		import services_params as srv
+
+		rospy.init_node('coverage_path_cache_warm_up')
+		if not rospy.has_param('coverage_radius'):
+			print("Parameter coverage_radius does not exist, using the default value " + str(application_wet_cleaning.DEFAULT_COVERAGE_RADIUS))
+		database = Database(extracted_file_path=args.database_location)
+		path_cache = CoveragePathCache(os.path.join(args.database_location, CACHE_FOLDER_NAME))
+		planner = CoveragePathPlanner(ApplicationStatus(ApplicationContainer.STATUS['IS_RUNNING']), srv.ROOM_EXPLORATION_SERVICE_STR, path_cache=path_cache)
+		# The same parameters as in WetCleaningApplication
+		planner.setParameters(
+			map_resolution=database.global_map_data_.map_resolution_,
+			map_origin=database.global_map_data_.map_origin_,
+			robot_radius=rospy.get_param("robot_radius", application_wet_cleaning.DEFAULT_ROBOT_RADIUS),
+			coverage_radius=rospy.get_param("coverage_radius", application_wet_cleaning.DEFAULT_COVERAGE_RADIUS),
+			field_of_view=application_wet_cleaning.FIELD_OF_VIEW,
+			field_of_view_origin=application_wet_cleaning.FIELD_OF_VIEW_ORIGIN,
+			planning_mode=2
+		)
+		for room in database.rooms_:
+			if rospy.is_shutdown():
+				break
+			if room.room_information_in_meter_ is None or room.room_map_data_ is None:
+				print("Room ID " + str(room.room_id_) + ": skipped, no room information or map")
+				continue
+			room_center = room.room_information_in_meter_.room_center
+			path = planner.getCoveragePath(room, (room_center.x, room_center.y))
+			print("Room ID " + str(room.room_id_) + ": " + ("failed" if path is None else str(len(path)) + " poses"))
+		planner.close()
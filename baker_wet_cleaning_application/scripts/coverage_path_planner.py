@@ -0,0 +1,144 @@
+#!/usr/bin/env python
+
+from math import hypot
+from threading import Lock
+from multiprocessing.pool import ThreadPool
+from geometry_msgs.msg import Pose2D
+
+from room_exploration_behavior import RoomExplorationBehavior
+from database_map_cache import getImageHash
+
+
+class CoveragePathPlanner:
+
+	# ========================================================================
+	# Description:
+	# Computes the coverage paths of rooms in the background, such that the
+	# path of a room is ready when the robot arrives there.
+	# Each path is computed by a RoomExplorationBehavior on a worker pool and
+	# cached by room ID, room map hash, radii and field of view. The map hash
+	# is computed once per version of the room map (RoomItem.room_map_hash_).
+	# A cached path is only used if its starting position is closer than
+	# max_start_deviation [m] to the requested starting position.
+	# With a CoveragePathCache, the paths are also kept on the disk and reused
+	# in later runs, with the same check of the starting position.
+	# The room exploration server handles one goal at a time (a new goal
+	# preempts the former one), so keep worker_count = 1 unless the server
+	# accepts parallel goals.
+	# ========================================================================
+
+	def __init__(self, interrupt_var, room_exploration_service_str, worker_count=1, max_start_deviation=1., path_cache=None):
+		self.interrupt_var_ = interrupt_var
+		self.path_cache_ = path_cache
+		self.room_exploration_service_str_ = room_exploration_service_str
+		self.max_start_deviation_ = max_start_deviation
+		self.pool_ = ThreadPool(worker_count)
+		# Planned paths by cache key: (starting position (x, y), AsyncResult of the path or None if failed)
+		self.paths_ = {}
+		self.mutex_ = Lock()
+
+	# Method for setting the planning parameters, which are the same for all rooms
+	def setParameters(self, map_resolution, map_origin, robot_radius, coverage_radius, field_of_view, field_of_view_origin, planning_mode=2):
+		self.map_resolution_ = map_resolution
+		self.map_origin_ = map_origin
+		self.robot_radius_ = robot_radius
+		self.coverage_radius_ = coverage_radius
+		self.field_of_view_ = field_of_view
+		self.field_of_view_origin_ = field_of_view_origin
+		self.planning_mode_ = planning_mode
+
+	# Returns the hash of the room map, a map which has been set explicitly is hashed on every call
+	@staticmethod
+	def getMapHash(room):
+		map_hash = room.room_map_hash_
+		if map_hash is None and room.room_map_data_ is not None:
+			map_hash = getImageHash(room.room_map_data_)
+		return map_hash
+
+	def getCacheKey(self, room):
+		return (
+			room.room_id_,
+			self.getMapHash(room),
+			self.map_resolution_,
+			str(self.map_origin_),
+			self.robot_radius_,
+			self.coverage_radius_,
+			tuple((point.x, point.y) for point in self.field_of_view_),
+			(self.field_of_view_origin_.x, self.field_of_view_origin_.y),
+			self.planning_mode_
+		)
+
+	# Computes a coverage path, runs on the worker pool. Returns None if the planning failed or was interrupted.
+	def computeCoveragePath(self, room, key, starting_position):
+		room_id = room.room_id_
+		# the paths on the disk do not depend on the room ID
+		persistent_key = key[1:]
+		if self.path_cache_ is not None:
+			cached_path = self.path_cache_.load(persistent_key)
+			if cached_path is not None and self.isCloseTo(cached_path[1], starting_position):
+				return cached_path[0]
+		try:
+			room_explorer = RoomExplorationBehavior("RoomExplorationBehavior", self.interrupt_var_, self.room_exploration_service_str_)
+			room_explorer.setParameters(
+				input_map=room.room_map_data_,
+				map_resolution=self.map_resolution_,
+				map_origin=self.map_origin_,
+				robot_radius=self.robot_radius_,
+				coverage_radius=self.coverage_radius_,
+				field_of_view=self.field_of_view_,  # this field of view represents the off-center iMop floor wiping device
+				field_of_view_origin=self.field_of_view_origin_,
+				starting_position=Pose2D(x=starting_position[0], y=starting_position[1], theta=0.),
+				# todo: determine theta
+				planning_mode=self.planning_mode_  # 1 means robot view, 2 fov
+			)
+			room_explorer.executeBehavior()
+			if room_explorer.failed():
+				print("[CoveragePathPlanner]: Planning the coverage path of room ID {} failed".format(room_id))
+				return None
+			path = room_explorer.exploration_result_.coverage_path_pose_stamped
+		except Exception as e:
+			print("[CoveragePathPlanner]: Planning the coverage path of room ID {} failed: {}".format(room_id, e))
+			return None
+		if self.path_cache_ is not None:
+			try:
+				self.path_cache_.save(persistent_key, path, starting_position)
+			except (IOError, OSError) as e:
+				print("[CoveragePathPlanner]: Could not cache the coverage path of room ID {}: {}".format(room_id, e))
+		return path
+
+	def isCloseTo(self, planned_starting_position, starting_position):
+		return hypot(planned_starting_position[0] - starting_position[0], planned_starting_position[1] - starting_position[1]) <= self.max_start_deviation_
+
+	# Returns the key and the cached or pending AsyncResult of the path, or queues the computation
+	def requestCoveragePath(self, room, starting_position):
+		key = self.getCacheKey(room)
+		with self.mutex_:
+			entry = self.paths_.get(key)
+			if entry is not None and self.isCloseTo(entry[0], starting_position):
+				return (key, entry[1])
+			# a path of the room with another map or parameters is out of date
+			for cached_key in [cached_key for cached_key in self.paths_ if cached_key[0] == room.room_id_]:
+				del self.paths_[cached_key]
+			result = self.pool_.apply_async(self.computeCoveragePath, (room, key, tuple(starting_position)))
+			self.paths_[key] = (tuple(starting_position), result)
+			return (key, result)
+
+	# Queue the computation of the paths of the rooms [(RoomItem, starting_position), ...] in this order
+	def prefetch(self, rooms):
+		for (room, starting_position) in rooms:
+			self.requestCoveragePath(room, starting_position)
+
+	# Returns the coverage path of a room (RoomItem), which is computed now if it has not been prefetched
+	def getCoveragePath(self, room, starting_position):
+		(key, result) = self.requestCoveragePath(room, starting_position)
+		path = result.get()
+		if path is None:
+			# do not keep failed or interrupted plannings
+			with self.mutex_:
+				if key in self.paths_ and self.paths_[key][1] is result:
+					del self.paths_[key]
+		return path
+
+	# Stop the worker pool, pending computations are dropped
+	def close(self):
+		self.pool_.terminate()
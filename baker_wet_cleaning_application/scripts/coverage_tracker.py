@@ -0,0 +1,50 @@
+#!/usr/bin/env python
+
+from threading import Thread
+import rospy
+import tf
+
+from utils import getTransformListener
+
+# ========================================================================
+# Description:
+# Feeds a CoverageAccumulator (coverage_accumulator.py) with the pose of
+# the robot from tf in a background thread, while the room is cleaned.
+# ========================================================================
+
+
+class CoverageTracker:
+
+	# Reads the pose of robot_frame in map_frame update_rate times per second and adds it to the accumulator
+	def __init__(self, accumulator, map_frame='/map', robot_frame='/base_link', update_rate=10.):
+		self.accumulator_ = accumulator
+		self.map_frame_ = map_frame
+		self.robot_frame_ = robot_frame
+		self.update_rate_ = update_rate
+		self.active_ = False
+		self.thread_ = None
+
+	def track(self):
+		listener = getTransformListener()
+		rate = rospy.Rate(self.update_rate_)
+		while self.active_ and not rospy.is_shutdown():
+			try:
+				(translation, rotation) = listener.lookupTransform(self.map_frame_, self.robot_frame_, rospy.Time(0))
+				self.accumulator_.addPose(translation[0], translation[1], tf.transformations.euler_from_quaternion(rotation)[2])
+			except (tf.Exception, tf.LookupException, tf.ConnectivityException, tf.ExtrapolationException):
+				pass
+			rate.sleep()
+
+	def start(self):
+		if self.thread_ is None:
+			self.active_ = True
+			self.thread_ = Thread(target=self.track)
+			self.thread_.daemon = True
+			self.thread_.start()
+
+	def stop(self):
+		self.active_ = False
+		if self.thread_ is not None:
+			self.thread_.join()
+			self.thread_ = None
+		self.accumulator_.interruptSweep()
@@ -2,13 +2,23 @@
 
 # For the room and robot data information
 import database_classes
+# For the append-only log files
+import database_log
+# For the atomic replacement of the JSON files
+import database_file_writer
+# For the binary snapshot of the rooms
+import database_snapshot
+# For the conversion of the date strings
+import database_date_format
+# For loading the room maps on demand
+import database_map_cache
 from datetime import datetime
 # For map receiving, for image receiving
 import cv2
 from cv_bridge import CvBridge, CvBridgeError
 import json
 # For copying, finding and deleting JSON files
-from shutil import copyfile
+from shutil import copyfile, rmtree
 import os
 from ipa_building_msgs.msg import RoomInformation
 from geometry_msgs.msg import Point32
@@ -36,6 +46,7 @@ class Database:
 	# File names
 	rooms_filename_ = ""
 	tmp_rooms_filename_ = ""
+	tmp_rooms_path_ = ""
 	application_data_filename_ = ""
 	tmp_application_data_filename_ = ""
 	log_filepath_ = ""
@@ -45,6 +56,20 @@ class Database:
 	global_map_data_filename_ = ""
 	global_map_image_filename_ = ""
 	global_map_segmented_image_filename_ = ""
+	# Journal of the current log file
+	log_journal_ = None
+	# Loader of the room maps
+	room_map_cache_ = None
+	# Do the files in tmp_rooms_path_ contain exactly the rooms of rooms_ (apart from dirty rooms)?
+	tmp_rooms_synchronized_ = False
+	# Indexes of rooms_ by room ID and by territory, floor and building ID (lists of rooms)
+	room_index_by_id_ = {}
+	room_index_by_territory_ = {}
+	room_index_by_floor_ = {}
+	room_index_by_building_ = {}
+	# The rooms_ list and its length at the time the indexes were built
+	indexed_rooms_ = None
+	indexed_room_count_ = 0
 
 # =========================================================================================
 # Private methods
@@ -52,11 +77,11 @@ class Database:
 
 	@staticmethod
 	def datetimeToString(datetime_date):
-		return datetime_date.strftime("%Y-%m-%d_%H:%M")
+		return database_date_format.datetimeToString(datetime_date)
 
 	@staticmethod
 	def stringToDatetime(string_date):
-		return datetime.strptime(string_date, "%Y-%m-%d_%H:%M")
+		return database_date_format.stringToDatetime(string_date)
 
 	@staticmethod
 	def point32ToArray(point32_point):
@@ -142,6 +167,8 @@ class Database:
 		# Get an open cv representation of the map
 		map_opencv = cv2.imread(self.global_map_image_filename_, 0)
 		self.global_map_data_.map_image_ = bridge.cv2_to_imgmsg(map_opencv, encoding="mono8")
+		# The room maps are crops of the global map
+		self.room_map_cache_.setMapShape(map_opencv.shape[0], map_opencv.shape[1])
 		# Get an open cv representation of the segmented map
 		map_segmented_opencv = cv2.imread(self.global_map_segmented_image_filename_, 0)
 		self.global_map_data_.map_image_segmented_ = bridge.cv2_to_imgmsg(map_segmented_opencv, encoding="mono8")
@@ -218,14 +245,10 @@ class Database:
 			current_room.room_territory_id_ = dict_settings.get(room_key).get("room_territory_id")
 			# Get the map of the room
 			current_room.room_map_filename_ = dict_settings.get(room_key).get("room_map_filename")
-			# Get an open cv representation of the map or None if there is no map
-			if current_room.room_map_filename_ is not None:
-				room_map_file_path = str(self.extracted_file_path) + str("/maps/") + str(current_room.room_map_filename_)
-				map_opencv = cv2.imread(room_map_file_path, 0)
-				bridge = CvBridge()
-				current_room.room_map_data_ = bridge.cv2_to_imgmsg(map_opencv, encoding = "mono8")
-			else:
-				current_room.room_map_data = None
+			# Position of the map in the global map, maps without offset are full-size
+			current_room.room_map_offset_ = dict_settings.get(room_key).get("room_map_offset", [0, 0])
+			# The map itself is only loaded on the first access of room_map_data_
+			current_room.room_map_loader_ = self.room_map_cache_
 			# Get the room information
 			pixel_coords = dict_settings.get(room_key).get("room_information_in_pixel")
 			current_room.room_information_in_pixel_ = RoomInformation()
@@ -244,6 +267,10 @@ class Database:
 			# Get the room surface area
 			current_room.room_surface_area_ = dict_settings.get(room_key).get("room_surface_area")
 			assert(current_room.room_surface_area_ > 0)
+			# Get the geometry of the room map, None for databases without it
+			current_room.room_perimeter_ = dict_settings.get(room_key).get("room_perimeter")
+			current_room.room_wall_length_ = dict_settings.get(room_key).get("room_wall_length")
+			current_room.room_skeleton_length_ = dict_settings.get(room_key).get("room_skeleton_length")
 			# Get the room trashcan count
 			current_room.room_trashcan_count_ = dict_settings.get(room_key).get("room_trashcan_count")
 			# Get the days where the room has to be cleaned in a specified way
@@ -262,91 +289,226 @@ class Database:
 			
 			# Append current room object to the rooms_ list
 			self.rooms_.append(current_room)
+		self.rebuildRoomIndexes()
+
+	# Get a dictionary representation of a single room
+	def getRoomDictFromRoom(self, current_room):
+		# Make a dict of the issues of current_room
+		issues_dict = {}
+		for current_issue in current_room.room_issues_:
+			# Check if current_issue is an issue
+			if isinstance(current_issue, database_classes.RoomIssue):
+				# Fill in a string representation of the date
+				date_str_issue = self.datetimeToString(current_issue.issue_date_)
+				# Fill in the issue coordinates
+				ic_x = current_issue.issue_coords_.x
+				ic_y = current_issue.issue_coords_.y
+				ic_z = current_issue.issue_coords_.z
+				issue_coords_list = [ic_x, ic_y, ic_z]
+				# Fill in the dictionary with the data
+				issues_dict[str(current_issue.issue_id_)] = {
+					"issue_id": current_issue.issue_id_,
+					"room_id": current_issue.room_id_,
+					"issue_type": current_issue.issue_type_,
+					"issue_images": current_issue.issue_images_,
+					"issue_coords": issue_coords_list,
+					"issue_date": date_str_issue
+				}
+			else:
+				print "[FATAL]: An element in issues array is not an issue object!"
+
+		# Fill in the datestamps
+		datestamp_list = []
+		for datestamp in current_room.room_cleaning_datestamps_:
+			if datestamp is not None:
+				datestamp_list.append(self.datetimeToString(datestamp))
+			else:
+				datestamp_list.append(None)
+		# Fill in the room information
+		if (current_room.room_information_in_meter_ is not None) and (current_room.room_information_in_pixel_ is not None):
+			px_center_list = self.point32ToArray(current_room.room_information_in_pixel_.room_center)
+			px_min_list = self.point32ToArray(current_room.room_information_in_pixel_.room_min_max.points[0])
+			px_max_list = self.point32ToArray(current_room.room_information_in_pixel_.room_min_max.points[1])
+			room_information_in_pixel_list = [px_center_list, px_min_list, px_max_list]
+			meter_center_list = self.point32ToArray(current_room.room_information_in_meter_.room_center)
+			meter_min_list = self.point32ToArray(current_room.room_information_in_meter_.room_min_max.points[0])
+			meter_max_list = self.point32ToArray(current_room.room_information_in_meter_.room_min_max.points[1])
+			room_information_in_meter_list = [meter_center_list, meter_min_list, meter_max_list]
+		else:
+			room_information_in_pixel_list = [None, None, None]
+			room_information_in_meter_list = [None, None, None]
+		# Fill the dictionary with the data
+		return {
+			"room_id": current_room.room_id_,
+			"room_name": current_room.room_name_,
+			"room_position_id": current_room.room_position_id_,
+			"room_floor_id": current_room.room_floor_id_,
+			"room_building_id": current_room.room_building_id_,
+			"room_territory_id": current_room.room_territory_id_,
+			"room_issues": issues_dict,
+			"room_map_filename": current_room.room_map_filename_,
+			"room_map_offset": list(current_room.room_map_offset_),
+			"room_information_in_pixel": room_information_in_pixel_list,
+			"room_information_in_meter": room_information_in_meter_list,
+			"room_surface_type": current_room.room_surface_type_,
+			"room_cleaning_method": current_room.room_cleaning_method_,
+			"room_surface_area": current_room.room_surface_area_,
+			"room_perimeter": current_room.room_perimeter_,
+			"room_wall_length": current_room.room_wall_length_,
+			"room_skeleton_length": current_room.room_skeleton_length_,
+			"room_trashcan_count": current_room.room_trashcan_count_,
+			"room_scheduled_days": current_room.room_scheduled_days_,
+			"room_cleaning_datestamps": datestamp_list,
+			"open_cleaning_tasks": current_room.open_cleaning_tasks_
+		}
 
 	# Get a dictionary representation of rooms_
 	def getRoomsDictFromRoomsList(self):
 		room_dict = {}
 		for current_room in self.rooms_:
-			# Check if current_room is a room 
+			# Check if current_room is a room
 			if isinstance(current_room, database_classes.RoomItem):
-				# Make a dict of the issues of current_room
-				issues_dict = {}
-				for current_issue in current_room.room_issues_:
-					# Check if current_issue is an issue
-					if isinstance(current_issue, database_classes.RoomIssue):
-						# Fill in a string representation of the date
-						date_str_issue = current_issue.issue_date_.strftime("%Y-%m-%d_%H:%M")
-						# Fill in the issue coordinates
-						ic_x = current_issue.issue_coords_.x
-						ic_y = current_issue.issue_coords_.y
-						ic_z = current_issue.issue_coords_.z
-						issue_coords_list = [ic_x, ic_y, ic_z]
-						# Fill in the dictionary with the data
-						issues_dict[str(current_issue.issue_id_)] = {
-							"issue_id": current_issue.issue_id_,
-							"room_id": current_issue.room_id_,
-							"issue_type": current_issue.issue_type_,
-							"issue_images": current_issue.issue_images_,
-							"issue_coords": issue_coords_list,
-							"issue_date": date_str_issue
-						}
-					else:
-						print "[FATAL]: An element in issues array is not an issue object!"
-				
-				
-				# Fill in the datestamps
-				datestamp_list = []
-				for datestamp in current_room.room_cleaning_datestamps_:
-					if datestamp is not None:
-						datestamp_list.append(self.datetimeToString(datestamp))
-					else:
-						datestamp_list.append(None)
-				# Fill in the room information
-				if (current_room.room_information_in_meter_ is not None) and (current_room.room_information_in_pixel_ is not None):
-					px_center_list = self.point32ToArray(current_room.room_information_in_pixel_.room_center)
-					px_min_list = self.point32ToArray(current_room.room_information_in_pixel_.room_min_max.points[0])
-					px_max_list = self.point32ToArray(current_room.room_information_in_pixel_.room_min_max.points[1])
-					room_information_in_pixel_list = [px_center_list, px_min_list, px_max_list]
-					meter_center_list = self.point32ToArray(current_room.room_information_in_meter_.room_center)
-					meter_min_list = self.point32ToArray(current_room.room_information_in_meter_.room_min_max.points[0])
-					meter_max_list = self.point32ToArray(current_room.room_information_in_meter_.room_min_max.points[1])
-					room_information_in_meter_list = [meter_center_list, meter_min_list, meter_max_list]
-				else:
-					room_information_in_pixel_list = [None, None, None]
-					room_information_in_meter_list = [None, None, None]
-				# Fill the dictionary with the data
-				room_dict[str(current_room.room_id_)] = {
-					"room_id": current_room.room_id_,
-					"room_name": current_room.room_name_,
-					"room_position_id": current_room.room_position_id_,
-					"room_floor_id": current_room.room_floor_id_,
-					"room_building_id": current_room.room_building_id_,
-					"room_territory_id": current_room.room_territory_id_,
-					"room_issues": issues_dict,
-					"room_map_filename": current_room.room_map_filename_,
-					"room_information_in_pixel": room_information_in_pixel_list,
-					"room_information_in_meter": room_information_in_meter_list,
-					"room_surface_type": current_room.room_surface_type_,
-					"room_cleaning_method": current_room.room_cleaning_method_,
-					"room_surface_area": current_room.room_surface_area_,
-					"room_trashcan_count": current_room.room_trashcan_count_,
-					"room_scheduled_days": current_room.room_scheduled_days_,
-					"room_cleaning_datestamps": datestamp_list,
-					"open_cleaning_tasks": current_room.open_cleaning_tasks_
-				}
+				room_dict[str(current_room.room_id_)] = self.getRoomDictFromRoom(current_room)
 			else:
 				print "[FATAL]: An element in rooms_ array is not a room object!"
 		return room_dict
 
+	# Get the snapshot representation of a single room (see database_snapshot.py).
+	# The order of the values must match getRoomFromRoomSnapshot, increase SNAPSHOT_VERSION on changes.
+	def getRoomSnapshotFromRoom(self, room):
+		issues = []
+		for issue in room.room_issues_:
+			issues.append((issue.issue_id_, issue.issue_type_, issue.issue_images_, self.point32ToArray(issue.issue_coords_), issue.issue_date_))
+		room_information = []
+		for information in [room.room_information_in_pixel_, room.room_information_in_meter_]:
+			if information is not None:
+				room_information.append((self.point32ToArray(information.room_center),
+										 self.point32ToArray(information.room_min_max.points[0]),
+										 self.point32ToArray(information.room_min_max.points[1])))
+			else:
+				room_information.append(None)
+		return (room.room_id_, room.room_name_, room.room_position_id_, room.room_floor_id_, room.room_building_id_,
+				room.room_territory_id_, room.room_map_filename_, room_information[0], room_information[1],
+				room.room_surface_type_, room.room_cleaning_method_, room.room_surface_area_, room.room_trashcan_count_,
+				room.room_scheduled_days_, room.open_cleaning_tasks_, list(room.room_cleaning_datestamps_), issues,
+				list(room.room_map_offset_), room.room_perimeter_, room.room_wall_length_, room.room_skeleton_length_)
+
+	def getRoomFromRoomSnapshot(self, room_snapshot):
+		(room_id, room_name, room_position_id, room_floor_id, room_building_id, room_territory_id, room_map_filename,
+		 room_information_in_pixel, room_information_in_meter, room_surface_type, room_cleaning_method, room_surface_area,
+		 room_trashcan_count, room_scheduled_days, open_cleaning_tasks, room_cleaning_datestamps, issues, room_map_offset,
+		 room_perimeter, room_wall_length, room_skeleton_length) = room_snapshot
+		room = database_classes.RoomItem()
+		room.room_id_ = room_id
+		room.room_name_ = room_name
+		room.room_position_id_ = room_position_id
+		room.room_floor_id_ = room_floor_id
+		room.room_building_id_ = room_building_id
+		room.room_territory_id_ = room_territory_id
+		room.room_map_filename_ = room_map_filename
+		room.room_map_offset_ = room_map_offset
+		room.room_map_loader_ = self.room_map_cache_
+		room_information = []
+		for information_coords in [room_information_in_pixel, room_information_in_meter]:
+			if information_coords is not None:
+				information = RoomInformation()
+				information.room_center = self.arrayToPoint32(information_coords[0])
+				information.room_min_max.points.append(self.arrayToPoint32(information_coords[1]))
+				information.room_min_max.points.append(self.arrayToPoint32(information_coords[2]))
+				room_information.append(information)
+			else:
+				room_information.append(None)
+		room.room_information_in_pixel_ = room_information[0]
+		room.room_information_in_meter_ = room_information[1]
+		room.room_surface_type_ = room_surface_type
+		room.room_cleaning_method_ = room_cleaning_method
+		room.room_surface_area_ = room_surface_area
+		assert(room.room_surface_area_ > 0)
+		room.room_perimeter_ = room_perimeter
+		room.room_wall_length_ = room_wall_length
+		room.room_skeleton_length_ = room_skeleton_length
+		room.room_trashcan_count_ = room_trashcan_count
+		room.room_scheduled_days_ = room_scheduled_days
+		room.open_cleaning_tasks_ = open_cleaning_tasks
+		room.room_cleaning_datestamps_ = room_cleaning_datestamps
+		room_issues = []
+		for (issue_id, issue_type, issue_images, issue_coords, issue_date) in issues:
+			issue = database_classes.RoomIssue()
+			issue.issue_id_ = issue_id
+			issue.issue_type_ = issue_type
+			issue.issue_images_ = issue_images
+			issue.issue_coords_ = self.arrayToPoint32(issue_coords)
+			issue.issue_date_ = issue_date
+			room_issues.append(issue)
+		room.room_issues_ = room_issues
+		return room
+
+	# Make rooms_ contain all the rooms of a snapshot
+	def updateRoomsListFromSnapshot(self, rooms_snapshot):
+		self.rooms_ = [self.getRoomFromRoomSnapshot(room_snapshot) for room_snapshot in rooms_snapshot]
+		self.rebuildRoomIndexes()
+
+	# Load the rooms from rooms.json
+	def readRoomsJson(self):
+		self.updateRoomsList(json.loads(open(self.rooms_filename_, "r").read()))
+
+	# Save the snapshot of rooms.json. rooms_ must contain the rooms of rooms.json.
+	def saveRoomsSnapshot(self):
+		rooms_snapshot = [self.getRoomSnapshotFromRoom(room) for room in self.rooms_]
+		database_snapshot.saveSnapshot(self.rooms_filename_, rooms_snapshot)
+
+	# Load the rooms of rooms.json from its snapshot if it is fresh. Otherwise the snapshot is renewed.
+	def readRooms(self):
+		rooms_snapshot = database_snapshot.loadSnapshot(self.rooms_filename_)
+		if rooms_snapshot is not None:
+			self.updateRoomsListFromSnapshot(rooms_snapshot)
+			return
+		self.readRoomsJson()
+		try:
+			self.saveRoomsSnapshot()
+		except (IOError, OSError) as e:
+			print "[Database]: Could not save the rooms snapshot: " + str(e)
+
+	# The temporal room data is saved with one file per room, such that only changed rooms need to be written
+	def getTemporalRoomFileName(self, room_id):
+		return str(self.tmp_rooms_path_) + "room_" + str(room_id) + ".json"
+
+	# Load the temporal room data from the room files
+	def readTemporalRoomFiles(self):
+		rooms_dict = {}
+		for filename in os.listdir(self.tmp_rooms_path_):
+			if filename.startswith("room_") and filename.endswith(".json"):
+				room_dict = json.loads(open(str(self.tmp_rooms_path_) + filename, "r").read())
+				rooms_dict[str(room_dict.get("room_id"))] = room_dict
+		return rooms_dict
+
+	def temporalRoomsExist(self):
+		return os.path.isdir(self.tmp_rooms_path_) or os.path.isfile(self.tmp_rooms_filename_)
+
+	# Remove the temporal room data, including a single temporal rooms file written by former versions
+	def removeTemporalRooms(self):
+		if os.path.isdir(self.tmp_rooms_path_):
+			rmtree(str(self.tmp_rooms_path_))
+		if os.path.isfile(self.tmp_rooms_filename_):
+			os.remove(str(self.tmp_rooms_filename_))
+		self.tmp_rooms_synchronized_ = False
+
 	# Load temporal/original database from file.
 	def readFiles(self, temporal):
 		# Load the room data
-		if temporal:
-			datafile = open(self.tmp_rooms_filename_, "r").read()
+		if temporal and os.path.isdir(self.tmp_rooms_path_):
+			self.updateRoomsList(self.readTemporalRoomFiles())
+		elif temporal:
+			self.updateRoomsList(json.loads(open(self.tmp_rooms_filename_, "r").read()))
 		else:
-			datafile = open(self.rooms_filename_, "r").read()
-		rooms_dict = json.loads(datafile)
-		self.updateRoomsList(rooms_dict)
+			self.readRooms()
+		# Rooms loaded from the room files do not need to be written again until they are changed
+		self.tmp_rooms_synchronized_ = temporal and os.path.isdir(self.tmp_rooms_path_)
+		for room in self.rooms_:
+			if self.tmp_rooms_synchronized_:
+				room.setClean()
+			else:
+				room.setDirty()
 
 		# Load the application data
 		if temporal:
@@ -444,27 +606,86 @@ class Database:
 			}
 		return log_dict
 
-	# Save the room data
-	def saveRoomDatabase(self, temporal=True):
-		rooms_dict = self.getRoomsDictFromRoomsList()
-		rooms_text = json.dumps(rooms_dict, indent=4, sort_keys=True)
-		if temporal:
-			datafile = open(self.tmp_rooms_filename_, "w")
-		else:
-			datafile = open(self.rooms_filename_, "w")
-		datafile.write(rooms_text)
-		datafile.close()
+	# Get the dict of a log file, i.e. the entries of the legacy JSON file and the entries of its journal
+	def readLogDict(self, log_filename):
+		log_file_name = str(self.log_filepath_) + str(log_filename)
+		log_dict = {}
+		if os.path.isfile(log_file_name):
+			log_dict = json.loads(open(log_file_name, "r").read())
+		journal_file_name = database_log.LogJournal.getJournalFileName(log_file_name)
+		if self.log_journal_ is not None and self.log_journal_.file_name_ == journal_file_name:
+			self.log_journal_.sync()
+		for log_entry in database_log.LogJournal.readEntries(journal_file_name):
+			log_dict[str(log_entry.get("date_and_time"))] = log_entry
+		return log_dict
 
-	# Save the application data
-	def saveGlobalApplicationData(self, temporal=True):
+	# Get the names of all log files (log_<year>_<week>_<day>_run<n>.json) which have a JSON file or a journal, discarded logs excluded
+	def getLogFileNames(self):
+		log_filenames = set()
+		if os.path.isdir(str(self.log_filepath_)):
+			for filename in os.listdir(str(self.log_filepath_)):
+				(base_name, extension) = os.path.splitext(filename)
+				if base_name.startswith("log_") and extension in [".json", database_log.LOG_JOURNAL_EXTENSION]:
+					log_filenames.add(base_name + ".json")
+		return sorted(log_filenames)
+
+	# Get the log items of all log files, sorted by date
+	def readLogHistory(self):
+		log_item_list = []
+		for log_filename in self.getLogFileNames():
+			log_item_list.extend(self.getLogListFromLogDict(self.readLogDict(log_filename)))
+		log_item_list.sort(key=lambda log_item: log_item.date_and_time_)
+		return log_item_list
+
+	def closeLogJournal(self):
+		if self.log_journal_ is not None:
+			self.log_journal_.close()
+			self.log_journal_ = None
+
+	# Save the room data. The temporal save only writes the rooms which changed since the last save.
+	# The files are committed with write_group if provided, else at once. Returns the written rooms.
+	# Without write_group they are set clean at once, else the caller has to set them clean after the commit,
+	# such that the rooms of a failed commit are written again by the next save.
+	def saveRoomDatabase(self, temporal=True, write_group=None):
+		if not temporal:
+			database_file_writer.saveJsonFile(self.rooms_filename_, self.getRoomsDictFromRoomsList(), write_group)
+			return []
+		saved_rooms = []
+
+		# Files of another state of the database are replaced completely.
+		# All rooms are written into a new folder, which then replaces the former one,
+		# such that a partially written set of room files is never loaded.
+		if not self.tmp_rooms_synchronized_:
+			new_tmp_rooms_path = str(self.tmp_rooms_path_).rstrip("/") + ".part/"
+			if os.path.isdir(new_tmp_rooms_path):
+				rmtree(new_tmp_rooms_path)
+			os.makedirs(new_tmp_rooms_path)
+			for room in self.rooms_:
+				room_file_name = new_tmp_rooms_path + os.path.basename(self.getTemporalRoomFileName(room.room_id_))
+				database_file_writer.saveJsonFile(room_file_name, self.getRoomDictFromRoom(room))
+				saved_rooms.append(room)
+			self.removeTemporalRooms()
+			os.rename(new_tmp_rooms_path, str(self.tmp_rooms_path_))
+			database_file_writer.syncDirectory(os.path.dirname(os.path.abspath(self.tmp_rooms_filename_)))
+			self.tmp_rooms_synchronized_ = True
+		else:
+			for room in self.rooms_:
+				if room.is_dirty_:
+					database_file_writer.saveJsonFile(self.getTemporalRoomFileName(room.room_id_), self.getRoomDictFromRoom(room), write_group)
+					saved_rooms.append(room)
+
+		if write_group is None:
+			for room in saved_rooms:
+				room.setClean()
+		return saved_rooms
+
+	# Save the application data. The file is committed with write_group if provided, else at once.
+	def saveGlobalApplicationData(self, temporal=True, write_group=None):
 		application_data_dict = self.getGlobalApplicationDataDictFromGlobalApplicationData()
-		application_data_text = json.dumps(application_data_dict, indent=4, sort_keys=True)
 		if temporal:
-			datafile = open(self.tmp_application_data_filename_, "w")
+			database_file_writer.saveJsonFile(self.tmp_application_data_filename_, application_data_dict, write_group)
 		else:
-			datafile = open(self.application_data_filename_, "w")
-		datafile.write(application_data_text)
-		datafile.close()
+			database_file_writer.saveJsonFile(self.application_data_filename_, application_data_dict, write_group)
 
 
 # =========================================================================================
@@ -472,10 +693,12 @@ class Database:
 # =========================================================================================
 
 	# Constructor method
-	def __init__(self, extracted_file_path='resources', auto_load_database=True):
+	def __init__(self, extracted_file_path='resources', auto_load_database=True, max_resident_room_maps=16):
 		self.extracted_file_path = extracted_file_path
+		self.room_map_cache_ = database_map_cache.RoomMapCache(self.extracted_file_path + str("/maps"), max_resident_maps=max_resident_room_maps)
 		self.rooms_filename_ = self.extracted_file_path + str("/json/rooms.json")
 		self.tmp_rooms_filename_ = self.extracted_file_path + str("/json/tmp_rooms.json")
+		self.tmp_rooms_path_ = self.extracted_file_path + str("/json/tmp_rooms/")
 		self.robot_properties_filename_ = self.extracted_file_path + str("/json/robot_properties.json")
 		self.global_settings_filename_ = self.extracted_file_path + str("/json/robot_settings.json")
 		self.global_map_data_filename_ = self.extracted_file_path + str("/json/global_map_data.json")
@@ -492,12 +715,12 @@ class Database:
 		# Save current log as "_discarded_<old logfile name>.txt"
 		current_logfile_filename = self.getCurrentLogfileName()
 		current_file_name = str(self.log_filepath_) + str(current_logfile_filename)
+		self.compactLogFile(current_logfile_filename)
 		if os.path.isfile(current_file_name):
 			current_discarded_logfile_name = str(self.log_filepath_) + "_discarded_" + str(current_logfile_filename)
 			copyfile(current_file_name, current_discarded_logfile_name)
 		# Remove temporal files from disk
-		if os.path.isfile(self.tmp_rooms_filename_):
-			os.remove(str(self.tmp_rooms_filename_))
+		self.removeTemporalRooms()
 		if os.path.isfile(self.tmp_application_data_filename_):
 			os.remove(str(self.tmp_application_data_filename_))
 		# Reload database from original files
@@ -509,7 +732,7 @@ class Database:
 	# Load database data from files
 	def loadDatabase(self):
 		# Check if there is a temporal representation
-		temporal_room_exists = os.path.isfile(self.tmp_rooms_filename_)
+		temporal_room_exists = self.temporalRoomsExist()
 		temporal_appdata_exists = os.path.isfile(self.tmp_application_data_filename_)
 		temporal_exists = temporal_appdata_exists and temporal_room_exists
 		#try:
@@ -520,60 +743,119 @@ class Database:
 		#except:
 		#	print "[Database] Loading of database failed. No valid original or temporal JSON file set found. Check for damaged data."
 		#	exit(1)
+		# Journals left by a crashed run are compacted, the journal of the current log file may still be continued
+		self.compactLogFiles(keep_current_log=True)
 
+	# Append a log entry to the journal of the current log file
 	def addLogEntry(self, log_element):
-		# Load current log file. If there is not a suiting log file, create one
-		current_logfile_filename = self.getCurrentLogfileName()
-		current_file_name = str(self.log_filepath_) + str(current_logfile_filename)
-		if os.path.isfile(current_file_name):
-			datafile = open(current_file_name, "r").read()
-			# Translate text to dict and dict to list of LogItem
-			log_item_dict = json.loads(datafile)
-			log_item_list = self.getLogListFromLogDict(log_item_dict)
-		else:
-			# Create empty logfile and empty LogItem list
-			datafile = open(current_file_name, "w")
-			datafile.write("{}")
-			datafile.close
-			log_item_list = []
-
-		# Append new LogItem instance to the LogItem list
-		log_item_list.append(log_element)
-		# Translate LogItem list to dict and dict to text
-		log_item_dict = self.getLogDictFromLogList(log_item_list)
-		print(log_item_dict)
-		log_text = json.dumps(log_item_dict, indent=4, sort_keys=True)
-		# Copy current log file and name the copy _backup_<Filename>.json
-		current_backup_file_name = str(self.log_filepath_) + "_backup_" + str(current_logfile_filename)
-		copyfile(current_file_name, current_backup_file_name)
-		# Save dict into current file
-		datafile = open(current_file_name, "w")
-		datafile.write(log_text)
-		datafile.close
-		# Remove backup file
-		os.remove(current_backup_file_name)
-
-	# Save the complete database safely, remove temporal data on final save
+		current_file_name = str(self.log_filepath_) + str(self.getCurrentLogfileName())
+		journal_file_name = database_log.LogJournal.getJournalFileName(current_file_name)
+		# A new log file is started when the run count or the progress date changed
+		if self.log_journal_ is None or self.log_journal_.file_name_ != journal_file_name:
+			self.closeLogJournal()
+			self.log_journal_ = database_log.LogJournal(journal_file_name)
+		log_item_dict = self.getLogDictFromLogList([log_element])
+		for log_key in log_item_dict:
+			self.log_journal_.append(log_item_dict[log_key])
+
+	# Merge the journal of a log file into the legacy JSON log file (readable by getLogListFromLogDict)
+	# and remove the journal. The current log file is compacted if no file name is provided.
+	def compactLogFile(self, log_filename=None):
+		if log_filename is None:
+			log_filename = self.getCurrentLogfileName()
+		log_file_name = str(self.log_filepath_) + str(log_filename)
+		journal_file_name = database_log.LogJournal.getJournalFileName(log_file_name)
+		if self.log_journal_ is not None and self.log_journal_.file_name_ == journal_file_name:
+			self.closeLogJournal()
+		if not os.path.isfile(journal_file_name):
+			return
+		database_file_writer.saveJsonFile(log_file_name, self.readLogDict(log_filename))
+		# The journal is only removed once its content is contained in the JSON log file
+		os.remove(journal_file_name)
+
+	# Compact the journals of all log files (see getLogFileNames), except the current log file if keep_current_log is set
+	def compactLogFiles(self, keep_current_log=False):
+		current_log_filename = None
+		# There is no current log file before the application has been started
+		if keep_current_log and self.application_data_.progress_[1] is not None:
+			current_log_filename = self.getCurrentLogfileName()
+		for log_filename in self.getLogFileNames():
+			if log_filename != current_log_filename:
+				self.compactLogFile(log_filename)
+
+	# Save the complete database safely, remove temporal data on final save.
+	# Every file is replaced atomically, so no file is ever partially written. The files of the group are renamed
+	# one after another though, so the application data is first saved with last_database_save_successful False
+	# and is the last file of the group, which sets it True. A save which is cut off during the renames
+	# therefore fails checkIntegrity.
 	def saveCompleteDatabase(self, temporal_file=True):
 		self.application_data_.last_database_save_successful_ = False
 		self.saveGlobalApplicationData(temporal=temporal_file)
-		self.saveRoomDatabase(temporal=temporal_file)
-		self.application_data_.last_database_save_successful_ = True
-		self.saveGlobalApplicationData(temporal=temporal_file)
+		with database_file_writer.AtomicWriteGroup() as write_group:
+			saved_rooms = self.saveRoomDatabase(temporal=temporal_file, write_group=write_group)
+			self.application_data_.last_database_save_successful_ = True
+			self.saveGlobalApplicationData(temporal=temporal_file, write_group=write_group)
+		# Only the rooms of a committed group are clean, a failed commit raises before
+		for room in saved_rooms:
+			room.setClean()
 
 		if not temporal_file:
-			if os.path.isfile(self.tmp_rooms_filename_):
-				os.remove(str(self.tmp_rooms_filename_))
+			# The snapshot is made from the new rooms.json
+			self.saveRoomsSnapshot()
+			self.compactLogFiles()
+			self.removeTemporalRooms()
 			if os.path.isfile(self.tmp_application_data_filename_):
 				os.remove(str(self.tmp_application_data_filename_))
 
+	# Build the room indexes from rooms_. Has to be called after changing the ID, territory, floor or building of a room.
+	def rebuildRoomIndexes(self):
+		self.room_index_by_id_ = {}
+		self.room_index_by_territory_ = {}
+		self.room_index_by_floor_ = {}
+		self.room_index_by_building_ = {}
+		for room in self.rooms_:
+			self.addRoomToIndexes(room)
+		self.indexed_rooms_ = self.rooms_
+		self.indexed_room_count_ = len(self.rooms_)
+
+	def addRoomToIndexes(self, room):
+		# Rooms with the same ID: the last one is found, as by the former linear search
+		self.room_index_by_id_[room.room_id_] = room
+		self.room_index_by_territory_.setdefault(room.room_territory_id_, []).append(room)
+		self.room_index_by_floor_.setdefault(room.room_floor_id_, []).append(room)
+		self.room_index_by_building_.setdefault(room.room_building_id_, []).append(room)
+
+	# The indexes are rebuilt if rooms_ has been replaced or rooms were appended to it directly
+	def updateRoomIndexes(self):
+		if self.indexed_rooms_ is not self.rooms_ or self.indexed_room_count_ != len(self.rooms_):
+			self.rebuildRoomIndexes()
+
+	# Add a new room to the database
+	def addRoom(self, room):
+		self.updateRoomIndexes()
+		self.rooms_.append(room)
+		self.addRoomToIndexes(room)
+		self.indexed_room_count_ = len(self.rooms_)
+
 	# Retrieve a room by providing a room_id
 	def getRoomById(self, room_id):
-		result = None
-		for i in range(len(self.rooms_)):
-			if self.rooms_[i].room_id_ == room_id:
-				result = self.rooms_[i]
-		return result
+		self.updateRoomIndexes()
+		return self.room_index_by_id_.get(room_id)
+
+	# Retrieve all rooms of a territory, in the order of rooms_
+	def getRoomsByTerritory(self, territory_id):
+		self.updateRoomIndexes()
+		return list(self.room_index_by_territory_.get(territory_id, []))
+
+	# Retrieve all rooms of a floor, in the order of rooms_
+	def getRoomsByFloor(self, floor_id):
+		self.updateRoomIndexes()
+		return list(self.room_index_by_floor_.get(floor_id, []))
+
+	# Retrieve all rooms of a building, in the order of rooms_
+	def getRoomsByBuilding(self, building_id):
+		self.updateRoomIndexes()
+		return list(self.room_index_by_building_.get(building_id, []))
 
 """
 
@@ -167,7 +167,7 @@ class RoomIssue():
 
 
 # Item that contains information on a room
-class RoomItem():
+class RoomItem(object):
 
 	# DATA AQUIRED FROM THE ROOM AND TERRITORY PLAN
 	# =============================================
@@ -196,7 +196,7 @@ class RoomItem():
 	# Room cleaning method [0=dry, 1=wet, 2=both]
 	# (INTEGER)
 	room_cleaning_method_ = 0
-	# Room surface area
+	# Room surface area [m2]
 	# (FLOAT)
 	room_surface_area_ = 0.0
 	# Amount of trashcans in the room
@@ -218,9 +218,21 @@ class RoomItem():
 	# Filename of the room map file
 	# (STRING)
 	room_map_filename_ = ""
-	# CV_Bridge representation of the map
+	# Position [column, row] of the room map file (the bounding box crop of the room) in the global map
+	# (ARRAY OF INTEGER)
+	room_map_offset_ = [0, 0]
+	# Geometry of the room map (see room_geometry.py in baker_database) [m], None if unknown:
+	# length of the room contours, of the contours bordering on walls and of the skeleton of the free space
+	# (FLOAT)
+	room_perimeter_ = None
+	room_wall_length_ = None
+	room_skeleton_length_ = None
+	# CV_Bridge representation of the map, if it has been set explicitly. Use room_map_data_.
 	# (CV_BRIDGE)
-	room_map_data_ = None
+	room_map_data_value_ = None
+	# Loader which provides the map from room_map_filename_ on demand (see database_map_cache.py)
+	# (ROOMMAPCACHE)
+	room_map_loader_ = None
 	# Room Information in pixel
 	# (ROOMINFORMATION)
 	room_information_in_pixel_ = None
@@ -234,6 +246,48 @@ class RoomItem():
 	# MISCELLANEOUS STUFF
 	# ===================
 
+	# Has the room been changed since it was saved the last time? Set by any attribute assignment.
+	# In-place changes of list attributes must be declared with setDirty().
+	# (BOOLEAN)
+	is_dirty_ = True
+
+	def __setattr__(self, name, value):
+		object.__setattr__(self, name, value)
+		if name != "is_dirty_":
+			object.__setattr__(self, "is_dirty_", True)
+
+	def setDirty(self):
+		self.is_dirty_ = True
+
+	def setClean(self):
+		self.is_dirty_ = False
+
+	# CV_Bridge representation of the map in the size of the global map. It is only loaded when it is needed.
+	@property
+	def room_map_data_(self):
+		if self.room_map_data_value_ is None and self.room_map_loader_ is not None and self.room_map_filename_ is not None:
+			return self.room_map_loader_.getRoomMap(self.room_map_filename_, self.room_map_offset_)
+		return self.room_map_data_value_
+
+	# Bounding box crop of the map with its offset (see database_map_cache.RoomMask) or None if the map has been set explicitly
+	@property
+	def room_mask_(self):
+		if self.room_map_data_value_ is None and self.room_map_loader_ is not None and self.room_map_filename_ is not None:
+			return self.room_map_loader_.getRoomMask(self.room_map_filename_, self.room_map_offset_)
+		return None
+
+	# Hash which identifies the version of the map file (see database_map_cache.RoomMapCache.getRoomMapHash).
+	# None if the map has been set explicitly or there is no map file.
+	@property
+	def room_map_hash_(self):
+		if self.room_map_data_value_ is None and self.room_map_loader_ is not None and self.room_map_filename_ is not None:
+			return self.room_map_loader_.getRoomMapHash(self.room_map_filename_, self.room_map_offset_)
+		return None
+
+	@room_map_data_.setter
+	def room_map_data_(self, room_map_data):
+		self.room_map_data_value_ = room_map_data
+
 	# RoomItems must be hashable for convenience
 	def __hash__(self):
 		return self.room_id_
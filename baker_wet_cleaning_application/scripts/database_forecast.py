@@ -0,0 +1,163 @@
+#!/usr/bin/env python
+
+import numpy as np
+from datetime import datetime, time, timedelta
+import database_schedule
+
+# ========================================================================
+# Description:
+# Forecast of the cleaning plan of the next days.
+# The due and overdue tasks of all rooms are simulated day by day with the
+# ScheduleEngine, in the way DatabaseHandler computes them: the due tasks
+# of a day are planned first, then the overdue tasks of the rooms without
+# any due task. Each task has an estimated duration, which is derived from
+# the log history (time between two consecutive log entries of a day) or
+# from the work area of the room for rooms without history. The work area
+# is room_surface_area_ plus, for the wet cleaning with its wall following,
+# a strip along room_wall_length_.
+# With a shift length, the tasks which do not fit into the shift of a day
+# stay open for the next day, so overrunning shifts become visible.
+# ========================================================================
+
+# Minutes per square meter of a task if there is no log history, by task [Trashcan, Dry, Wet]
+DEFAULT_MINUTES_PER_SQUARE_METER = [0.05, 0.3, 0.5]
+# Width [m] of the strip along the walls which is added to the work area of a task, by task [Trashcan, Dry, Wet]
+WALL_STRIP_WIDTH = [0., 0., 0.5]
+# Longer gaps between two log entries are breaks and not used as task duration
+MAX_TASK_MINUTES = 120.
+
+
+class DayForecast:
+
+	# Robot date of the day
+	# (DATE)
+	date_ = None
+	# Rooms x [Trashcan, Dry, Wet] arrays of the tasks which became due / overdue on this day
+	# or were left open from the day before
+	# (NUMPY ARRAY OF BOOLEAN)
+	due_tasks_ = None
+	overdue_tasks_ = None
+	carried_over_tasks_ = None
+	# Tasks which fit into the shift of the day
+	# (NUMPY ARRAY OF BOOLEAN)
+	completed_tasks_ = None
+	# Estimated duration of all open tasks of the day
+	# (FLOAT, minutes)
+	workload_minutes_ = 0.
+	# Duration of the shift, None for unlimited
+	# (FLOAT, minutes)
+	shift_minutes_ = None
+
+	# Duration of the open tasks exceeding the shift
+	def getOverrunMinutes(self):
+		if self.shift_minutes_ is None:
+			return 0.
+		return max(0., self.workload_minutes_ - self.shift_minutes_)
+
+	def isOverrun(self):
+		return self.getOverrunMinutes() > 0.
+
+
+class CleaningForecaster:
+
+	def __init__(self, database_handler, log_items=None):
+		self.database_handler_ = database_handler
+		self.rooms_ = list(database_handler.database_.rooms_)
+		self.minutes_per_square_meter_ = list(DEFAULT_MINUTES_PER_SQUARE_METER)
+		# Mean duration by (room ID, task) from the log history
+		self.room_task_minutes_ = {}
+		if log_items:
+			self.estimateDurations(log_items)
+
+	@staticmethod
+	def getScheduleIndex(robot_date):
+		return (robot_date.isocalendar()[1] % 2) * 7 + robot_date.weekday()
+
+	# Rooms x [Trashcan, Dry, Wet] array of the work areas [m2] of the tasks, from the room geometry
+	def getWorkAreas(self):
+		surface_areas = np.array([room.room_surface_area_ or 0. for room in self.rooms_], np.float64)
+		wall_lengths = np.array([room.room_wall_length_ or 0. for room in self.rooms_], np.float64)
+		return surface_areas[:, np.newaxis] + wall_lengths[:, np.newaxis] * np.array(WALL_STRIP_WIDTH)[np.newaxis, :]
+
+	# Estimate the durations of the tasks from LogItems. The duration of a log entry is the time since the former entry of the same day.
+	def estimateDurations(self, log_items):
+		work_areas = dict((room.room_id_, room_work_areas) for (room, room_work_areas) in zip(self.rooms_, self.getWorkAreas()))
+		durations = {}
+		previous_date = None
+		for log_item in sorted(log_items, key=lambda item: item.date_and_time_):
+			current_date = log_item.date_and_time_
+			if previous_date is not None and previous_date.date() == current_date.date() and log_item.cleaning_task_ in database_schedule.TASKS:
+				minutes = (current_date - previous_date).total_seconds() / 60.
+				if 0. < minutes <= MAX_TASK_MINUTES:
+					durations.setdefault((log_item.room_id_, log_item.cleaning_task_), []).append(minutes)
+			previous_date = current_date
+
+		task_minutes = [0.]*3
+		task_areas = [0.]*3
+		for ((room_id, task), minutes) in durations.items():
+			self.room_task_minutes_[(room_id, task)] = sum(minutes) / len(minutes)
+			if room_id in work_areas and work_areas[room_id][task + 1] > 0.:
+				task_minutes[task + 1] += sum(minutes)
+				task_areas[task + 1] += work_areas[room_id][task + 1] * len(minutes)
+		for task_column in range(3):
+			if task_areas[task_column] > 0.:
+				self.minutes_per_square_meter_[task_column] = task_minutes[task_column] / task_areas[task_column]
+
+	# Rooms x [Trashcan, Dry, Wet] array of the estimated task durations in minutes
+	def getDurations(self):
+		durations = self.getWorkAreas() * np.array(self.minutes_per_square_meter_)[np.newaxis, :]
+		for (room_index, room) in enumerate(self.rooms_):
+			for (task_column, task) in enumerate(database_schedule.TASKS):
+				minutes = self.room_task_minutes_.get((room.room_id_, task))
+				if minutes is not None:
+					durations[room_index, task_column] = minutes
+		return durations
+
+	# Simulate the next days, starting with today (robot date). Returns a list of DayForecast.
+	# shift_minutes is the working time per day, None for unlimited.
+	def forecast(self, days=14, shift_minutes=None, start_date=None):
+		planning_offset = self.database_handler_.database_.application_data_.planning_offset_
+		if start_date is None:
+			start_date = self.database_handler_.robotToday().date()
+		schedule = database_schedule.ScheduleEngine(self.rooms_)
+		durations = self.getDurations()
+		open_tasks = np.array([[task in room.open_cleaning_tasks_ for task in database_schedule.TASKS] for room in self.rooms_], bool).reshape(-1, 3)
+		day_forecasts = []
+		for day in range(days):
+			day_forecast = DayForecast()
+			day_forecast.date_ = start_date + timedelta(days=day)
+			day_forecast.shift_minutes_ = shift_minutes
+			robot_day_start = datetime.combine(day_forecast.date_, time())
+			schedule_index = self.getScheduleIndex(day_forecast.date_)
+
+			day_forecast.carried_over_tasks_ = open_tasks
+			day_forecast.due_tasks_ = schedule.computeDueTasks(schedule_index, day_forecast.date_, planning_offset)
+			open_tasks = open_tasks | day_forecast.due_tasks_
+			# Overdue tasks are only planned for rooms without any due task
+			overdue_tasks = schedule.computeOverdueTasks(schedule_index, robot_day_start, planning_offset)
+			overdue_tasks[open_tasks.any(axis=1)] = False
+			day_forecast.overdue_tasks_ = overdue_tasks
+			open_tasks = open_tasks | overdue_tasks
+
+			# The due rooms are cleaned before the overdue rooms, each in the order of the rooms
+			task_durations = np.where(open_tasks, durations, 0.)
+			day_forecast.workload_minutes_ = float(task_durations.sum())
+			if shift_minutes is None:
+				completed_tasks = open_tasks
+			else:
+				order = np.argsort(overdue_tasks.any(axis=1), kind="mergesort")
+				end_minutes = np.cumsum(task_durations[order].ravel()).reshape(-1, 3)
+				completed_tasks = np.zeros(open_tasks.shape, bool)
+				completed_tasks[order] = open_tasks[order] & (end_minutes <= shift_minutes)
+			day_forecast.completed_tasks_ = completed_tasks
+
+			# Completed tasks are stamped with the (real) start of the day
+			completed_datestamp = np.datetime64(robot_day_start + timedelta(minutes=planning_offset), "us")
+			schedule.datestamps_[completed_tasks] = completed_datestamp
+			open_tasks = open_tasks & ~completed_tasks
+			day_forecasts.append(day_forecast)
+		return day_forecasts
+
+	# Returns the list of (room, set of tasks) of a task array of a DayForecast
+	def getRoomTasks(self, task_array):
+		return database_schedule.getRoomTasks(self.rooms_, task_array)
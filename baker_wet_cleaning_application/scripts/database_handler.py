@@ -2,6 +2,10 @@
 
 # For database
 import database_classes
+# For the evaluation of the schedules
+import database_schedule
+# For the forecast of the cleaning plan
+import database_forecast
 # For date and time calculations
 from datetime import date, timedelta, datetime
 # For room information
@@ -73,8 +77,6 @@ class DatabaseHandler:
 		return self.getTodaysWeekType() * 7 + self.getTodaysWeekDay()
 
 	def realToRobotDate(self, real_date):
-		print("real_date:", real_date)
-		print("self.database_.application_data_.planning_offset_:", self.database_.application_data_.planning_offset_)
 		robot_date = real_date - timedelta(minutes=self.database_.application_data_.planning_offset_)
 		return robot_date
 
@@ -82,6 +84,19 @@ class DatabaseHandler:
 		real_date = robot_date + timedelta(minutes=self.database_.application_data_.planning_offset_)
 		return real_date
 
+	@staticmethod
+	# Write the label of a room into the segmented map wherever the room map is white (255).
+	# Rooms added later overwrite the labels of rooms added before, as the former pixel loop did.
+	def addRoomMapToSegmentedMap(segmented_map, room_map, label):
+		segmented_map[room_map == 255] = label
+
+	@staticmethod
+	# Like addRoomMapToSegmentedMap, for the bounding box crop of a room (database_map_cache.RoomMask)
+	def addRoomMaskToSegmentedMap(segmented_map, room_mask, label):
+		(rows, columns) = room_mask.getSlices()
+		segmented_map_crop = segmented_map[rows, columns]
+		segmented_map_crop[room_mask.mask_[:segmented_map_crop.shape[0], :segmented_map_crop.shape[1]] == 255] = label
+
 	# Get the room information in pixel
 	def getMapAndRoomInformationInPixel(self, rooms_array):
 		room_information_in_pixel = []
@@ -92,13 +107,13 @@ class DatabaseHandler:
 		image_height, image_width = complete_map_opencv.shape
 		tmp_map_opencv = np.zeros((image_height, image_width), np.uint8)
 		for room in rooms_array:
-			# Get an OPENCV representation of the image
-			room_map_opencv = bridge.imgmsg_to_cv2(room.room_map_data_, desired_encoding="passthrough")
-			# Add the room to the final map
-			for x in range(image_width):
-				for y in range(image_height):
-					if room_map_opencv[y, x] == 255:
-						tmp_map_opencv[y, x] = segmentation_id + 1
+			# Add the room to the final map, from the crop if the map is loaded from a file
+			room_mask = room.room_mask_
+			if room_mask is not None:
+				self.addRoomMaskToSegmentedMap(tmp_map_opencv, room_mask, segmentation_id + 1)
+			else:
+				room_map_opencv = bridge.imgmsg_to_cv2(room.room_map_data_, desired_encoding="passthrough")
+				self.addRoomMapToSegmentedMap(tmp_map_opencv, room_map_opencv, segmentation_id + 1)
 			# Get room_information_in_pixels
 			room_information_in_pixel.append(room.room_information_in_pixel_)
 			segmentation_id = segmentation_id + 1
@@ -141,44 +156,13 @@ class DatabaseHandler:
 			return False
 
 		today_index = self.getTodaysScheduleIndex()
+		schedule = database_schedule.ScheduleEngine(self.database_.rooms_)
+		due_tasks = schedule.computeDueTasks(today_index, today, self.database_.application_data_.planning_offset_)
+		for (room, cleaning_tasks) in schedule.getRoomTasks(due_tasks):
+			room.open_cleaning_tasks_ = list(cleaning_tasks.union(room.open_cleaning_tasks_))
 
-		for room in self.database_.rooms_:
-			cleaning_tasks = set(room.open_cleaning_tasks_)
-			method = room.room_cleaning_method_
-			schedule_char = room.room_scheduled_days_[today_index]
-			# Some cleaning required
-			if schedule_char == "":
-				continue
-
-			# Find out if the timestamps indicate that the room has been handled already today
-			date_stamps = room.room_cleaning_datestamps_
-
-			already_done = {
-				'TRASH': date_stamps[0] is not None and self.realToRobotDate(date_stamps[0]).date() == today,
-				'DRY': date_stamps[1] is not None and self.realToRobotDate(date_stamps[1]).date() == today,
-				'WET': date_stamps[2] is not None and self.realToRobotDate(date_stamps[2]).date() == today
-			}
-
-			# If today is a cleaning day
-			if self.isCleaningDay(schedule_char):
-
-				if self.isTrashCleaningMethod(method) and not already_done['TRASH']:
-					cleaning_tasks.add(self.TRASH_TASK)
-
-				if self.isDryCleaningMethod(method) and not already_done['DRY']:
-					cleaning_tasks.add(self.DRY_TASK)
-
-				if self.isWetCleaningMethod(method) and not already_done['WET']:
-					cleaning_tasks.add(self.WET_TASK)
-
-			# If today is only a trashcan day
-			elif self.isTrashDay(schedule_char):
-				cleaning_tasks.add(self.TRASH_TASK)
-
-			room.open_cleaning_tasks_ = list(cleaning_tasks)
-			# Append room to the due list if any task is to be done
-			if len(room.open_cleaning_tasks_) != 0:
-				self.due_rooms_.append(room)
+		# All rooms with any task to be done, including the restored ones
+		self.due_rooms_ = [room for room in self.database_.rooms_ if len(room.open_cleaning_tasks_) != 0]
 
 		self.applyChangesToDatabase()  # saves all the due rooms in the database
 		return True
@@ -201,49 +185,23 @@ class DatabaseHandler:
 		today_index = self.getTodaysScheduleIndex()
 		today = self.robotToday()
 
+		schedule = database_schedule.ScheduleEngine(self.database_.rooms_)
+		overdue_tasks = schedule.computeOverdueTasks(today_index, today, self.database_.application_data_.planning_offset_)
+		due_rooms = set(self.due_rooms_)
 		overdue_rooms = set()
-
-		for room in self.database_.rooms_:
-			if room in self.due_rooms_:
+		for (room, cleaning_tasks) in schedule.getRoomTasks(overdue_tasks):
+			if room in due_rooms:
 				continue
+			room.open_cleaning_tasks_ = list(cleaning_tasks.union(room.open_cleaning_tasks_))
+			overdue_rooms.add(room)
+
+		self.overdue_rooms_ = [room for room in self.database_.rooms_ if room in overdue_rooms]
 
-			cleaning_tasks = set(room.open_cleaning_tasks_)
-			for day_delta in range(1, 14):
-				current_schedule_index = (today_index - day_delta) % 14
-				current_schedule_date = today - timedelta(days=day_delta)
-
-				schedule_char = room.room_scheduled_days_[current_schedule_index]
-				cleaning_method = room.room_cleaning_method_
-				# Room floor cleaning with trashcan was scheduled
-				if self.isCleaningDay(schedule_char):
-					trashcan_date = self.realToRobotDate(room.room_cleaning_datestamps_[0])
-					dry_date = self.realToRobotDate(room.room_cleaning_datestamps_[1])
-					wet_date = self.realToRobotDate(room.room_cleaning_datestamps_[2])
-					# Room's trashcan was to be emptied and that did not happen
-					if self.isTrashCleaningMethod(cleaning_method) and (trashcan_date is None or trashcan_date < current_schedule_date):
-						cleaning_tasks.add(self.TRASH_TASK)
-						overdue_rooms.add(room)
-
-					# Room was to be cleaned dry and that did not happen
-					if self.isDryCleaningMethod(cleaning_method) and (dry_date is None or dry_date < current_schedule_date):
-						cleaning_tasks.add(self.DRY_TASK)
-						overdue_rooms.add(room)
-
-					# Room was to be cleaned wet and that did not happen
-					if self.isWetCleaningMethod(cleaning_method) and (wet_date is None or wet_date < current_schedule_date):
-						cleaning_tasks.add(self.WET_TASK)
-						overdue_rooms.add(room)
-
-				# Trashcan emptying was scheduled
-				elif self.isTrashDay(schedule_char):
-					trashcan_date = room.room_cleaning_datestamps_[0]
-					if trashcan_date is None or trashcan_date < current_schedule_date:
-						cleaning_tasks.add(self.TRASH_TASK)
-						overdue_rooms.add(room)
-
-			room.open_cleaning_tasks_ = list(cleaning_tasks)
-
-		self.overdue_rooms_ = list(overdue_rooms)
+	# Method for simulating the due and overdue tasks of the next days, with task durations estimated from the log history.
+	# Returns a list of database_forecast.DayForecast. shift_minutes is the working time per day, None for unlimited.
+	def forecastCleaningPlan(self, days=14, shift_minutes=None):
+		forecaster = database_forecast.CleaningForecaster(self, log_items=self.database_.readLogHistory())
+		return forecaster.forecast(days=days, shift_minutes=shift_minutes)
 
 	# Method for figuring out whether the application had been started today already
 	def noPlanningHappenedToday(self):
@@ -296,6 +254,7 @@ class DatabaseHandler:
 		room.open_cleaning_tasks_.remove(assignment_type)
 		# Save current datetime as timestamp for the specified assignment
 		room.room_cleaning_datestamps_[assignment_type + 1] = datetime.now()
+		room.setDirty()
 
 		# Save all changes to the database
 		self.applyChangesToDatabase()
@@ -0,0 +1,182 @@
+#!/usr/bin/env python
+
+import io
+import os
+from datetime import datetime
+from threading import Lock
+import numpy as np
+import database_file_writer
+from coverage_analytics import getRoomSlices
+
+# ========================================================================
+# Description:
+# Persistent maps of the places where dirt and trash have been found.
+# Every room has a raster of cell_size [m] cells over its bounding box
+# (plus margin [m], cells aligned with the global map) with one layer per
+# kind of detection ("dirt", "trash"). Each detection adds 1
+# to its cell. On every new day, all values are multiplied by daily_decay,
+# so places which have not been dirty for a long time fade out.
+# The rasters are stored with their origin as numpy .npz files in the
+# folder hotspots next to the room maps. The query methods tell which
+# parts of a coverage path have yielded dirt in former runs, the dry
+# cleaning follows these parts first (prioritizeSegments).
+# ========================================================================
+
+HOTSPOT_FOLDER_NAME = "hotspots"
+KINDS = ["dirt", "trash"]
+
+
+# Returns the poses of the path in the segments (first pose index, last pose index + 1, score) first, then the other poses.
+# Both parts keep the order of the path, so adjacent segments are still followed in one piece.
+def prioritizeSegments(path, segments):
+	prioritized = np.zeros(len(path), np.bool_)
+	for (start, end, _) in segments:
+		prioritized[start:end] = True
+	return [path[index] for index in np.flatnonzero(prioritized)] + [path[index] for index in np.flatnonzero(~prioritized)]
+
+
+class RoomHotspotMap:
+
+	def __init__(self, shape, cell_size, origin):
+		self.cell_size_ = cell_size
+		# Position of the corner of the cell (0, 0) in meters
+		self.origin_ = origin
+		self.layers_ = dict((kind, np.zeros(shape, np.float32)) for kind in KINDS)
+		# Date of the last added detection
+		self.last_update_ = None
+
+	# Cell (row, column) of positions in meters, as arrays
+	def getCells(self, x, y):
+		columns = np.floor((np.asarray(x, np.float64) - self.origin_[0]) / self.cell_size_).astype(np.int64)
+		rows = np.floor((np.asarray(y, np.float64) - self.origin_[1]) / self.cell_size_).astype(np.int64)
+		return (rows, columns)
+
+	def isInside(self, rows, columns):
+		(height, width) = self.layers_[KINDS[0]].shape
+		return (rows >= 0) & (rows < height) & (columns >= 0) & (columns < width)
+
+	# Fade out the values of the former days
+	def decay(self, today, daily_decay):
+		if self.last_update_ is not None and today > self.last_update_:
+			factor = daily_decay ** (today - self.last_update_).days
+			for layer in self.layers_.values():
+				layer *= factor
+		self.last_update_ = today
+
+	def addDetection(self, kind, x, y, today, daily_decay):
+		self.decay(today, daily_decay)
+		(row, column) = self.getCells(x, y)
+		if self.isInside(row, column):
+			self.layers_[kind][row, column] += 1.
+
+	# Sums of the values within radius meters (square window) of the positions
+	def getValues(self, kind, x, y, radius):
+		(rows, columns) = self.getCells(x, y)
+		half_window = int(np.ceil(radius / self.cell_size_))
+		layer = self.layers_[kind]
+		# summed area table with a leading row and column of zeros
+		summed_area = np.zeros((layer.shape[0] + 1, layer.shape[1] + 1), np.float64)
+		summed_area[1:, 1:] = layer.cumsum(axis=0).cumsum(axis=1)
+		(row_min, row_max) = (np.clip(rows - half_window, 0, layer.shape[0]), np.clip(rows + half_window + 1, 0, layer.shape[0]))
+		(column_min, column_max) = (np.clip(columns - half_window, 0, layer.shape[1]), np.clip(columns + half_window + 1, 0, layer.shape[1]))
+		return summed_area[row_max, column_max] - summed_area[row_min, column_max] - summed_area[row_max, column_min] + summed_area[row_min, column_min]
+
+	# Splits a coverage path (list of PoseStamped) into segments of segment_length poses.
+	# Returns a list of (index of the first pose, index after the last pose, sum of the values around the poses).
+	def getSegmentScores(self, kind, path, radius, segment_length=10):
+		if len(path) == 0:
+			return []
+		x = [pose.pose.position.x for pose in path]
+		y = [pose.pose.position.y for pose in path]
+		values = self.getValues(kind, x, y, radius)
+		segment_starts = range(0, len(path), segment_length)
+		scores = np.add.reduceat(values, segment_starts)
+		return [(start, min(start + segment_length, len(path)), float(score)) for (start, score) in zip(segment_starts, scores)]
+
+
+class HotspotMapStore:
+
+	# margin [m] around the bounding box of a room, for detections next to its walls
+	def __init__(self, maps_path, map_resolution, map_origin, map_height, map_width, cell_size=0.25, daily_decay=0.95, margin=0.5):
+		self.hotspot_path_ = os.path.join(maps_path, HOTSPOT_FOLDER_NAME)
+		self.cell_size_ = cell_size
+		self.daily_decay_ = daily_decay
+		self.margin_ = margin
+		self.map_resolution_ = map_resolution
+		# Origin of the global map in meters and its size in pixels
+		self.origin_ = (map_origin.position.x, map_origin.position.y)
+		self.map_shape_ = (map_height, map_width)
+		# Number of cells of the global map
+		self.shape_ = (int(np.ceil(map_height * map_resolution / cell_size)), int(np.ceil(map_width * map_resolution / cell_size)))
+		# Loaded hotspot maps by room ID
+		self.room_hotspot_maps_ = {}
+		self.mutex_ = Lock()
+
+	def getFileName(self, room):
+		if room.room_map_filename_:
+			return os.path.join(self.hotspot_path_, os.path.splitext(os.path.basename(room.room_map_filename_))[0] + ".npz")
+		return os.path.join(self.hotspot_path_, "room_" + str(room.room_id_) + ".npz")
+
+	# Returns the cells (first, last + 1) along one axis which cover the pixel slice of the bounding box and the margin
+	def getCellRange(self, pixels, cell_count):
+		first = int(np.floor((pixels.start * self.map_resolution_ - self.margin_) / self.cell_size_))
+		last = int(np.ceil((pixels.stop * self.map_resolution_ + self.margin_) / self.cell_size_))
+		return (max(first, 0), min(max(last, first + 1), cell_count))
+
+	# Returns (origin in meters, shape) of the raster of the room, the whole global map if the bounding box of the room is unknown
+	def getRoomRaster(self, room):
+		room_mask = room.room_mask_
+		if room_mask is not None:
+			(rows, columns) = room_mask.getSlices()
+		else:
+			(rows, columns) = getRoomSlices(room.room_information_in_pixel_, self.map_shape_)
+		(row_min, row_max) = self.getCellRange(rows, self.shape_[0])
+		(column_min, column_max) = self.getCellRange(columns, self.shape_[1])
+		origin = (self.origin_[0] + column_min * self.cell_size_, self.origin_[1] + row_min * self.cell_size_)
+		return (origin, (max(row_max - row_min, 1), max(column_max - column_min, 1)))
+
+	def loadRoomHotspotMap(self, room):
+		(origin, shape) = self.getRoomRaster(room)
+		hotspot_map = RoomHotspotMap(shape, self.cell_size_, origin)
+		file_name = self.getFileName(room)
+		if not os.path.isfile(file_name):
+			return hotspot_map
+		try:
+			with open(file_name, "rb") as hotspot_file:
+				arrays = np.load(hotspot_file)
+				# a map of another room size, map or cell size is discarded
+				if float(arrays["cell_size"]) == self.cell_size_ and np.allclose(arrays["origin"], origin) and tuple(arrays["dirt"].shape) == shape:
+					for kind in KINDS:
+						hotspot_map.layers_[kind] = arrays[kind].astype(np.float32)
+					last_update = str(arrays["last_update"])
+					hotspot_map.last_update_ = datetime.strptime(last_update, "%Y-%m-%d").date() if last_update else None
+		except Exception as e:
+			print("[HotspotMapStore]: Ignoring unreadable hotspot map " + str(file_name) + ": " + str(e))
+		return hotspot_map
+
+	def getRoomHotspotMap(self, room):
+		with self.mutex_:
+			if room.room_id_ not in self.room_hotspot_maps_:
+				self.room_hotspot_maps_[room.room_id_] = self.loadRoomHotspotMap(room)
+			return self.room_hotspot_maps_[room.room_id_]
+
+	def addDetection(self, room, kind, x, y):
+		hotspot_map = self.getRoomHotspotMap(room)
+		with self.mutex_:
+			hotspot_map.addDetection(kind, x, y, datetime.now().date(), self.daily_decay_)
+
+	def saveRoomHotspotMap(self, room):
+		hotspot_map = self.getRoomHotspotMap(room)
+		if not os.path.isdir(self.hotspot_path_):
+			os.makedirs(self.hotspot_path_)
+		data = io.BytesIO()
+		with self.mutex_:
+			last_update = hotspot_map.last_update_.strftime("%Y-%m-%d") if hotspot_map.last_update_ is not None else ""
+			np.savez_compressed(data, cell_size=self.cell_size_, origin=np.array(hotspot_map.origin_), last_update=last_update, **hotspot_map.layers_)
+		database_file_writer.writeFileAtomically(self.getFileName(room), data.getvalue(), binary=True)
+
+	# Segments of a coverage path with their scores (see RoomHotspotMap.getSegmentScores)
+	def getSegmentScores(self, room, kind, path, radius, segment_length=10):
+		hotspot_map = self.getRoomHotspotMap(room)
+		with self.mutex_:
+			return hotspot_map.getSegmentScores(kind, path, radius, segment_length)
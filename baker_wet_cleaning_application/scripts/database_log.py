@@ -0,0 +1,87 @@
+#!/usr/bin/env python
+
+import json
+import os
+
+# ========================================================================
+# Description:
+# Append-only journal for the log entries of one log file.
+# Every entry is stored as one JSON object per line (JSON lines). Appending
+# never rewrites the previous entries, so the cost of logging does not grow
+# with the size of the log. The file is flushed after every entry and
+# synchronized to the disk every fsync_batch_size entries.
+# A line which was cut by a crash can only be the last one of the file.
+# It is ignored when reading and removed before the next append.
+# ========================================================================
+
+LOG_JOURNAL_EXTENSION = ".jsonl"
+
+
+class LogJournal:
+
+	def __init__(self, file_name, fsync_batch_size=8):
+		self.file_name_ = file_name
+		self.fsync_batch_size_ = max(1, fsync_batch_size)
+		self.unsynced_entries_ = 0
+		self.file_ = None
+
+	@staticmethod
+	def getJournalFileName(log_file_name):
+		return os.path.splitext(log_file_name)[0] + LOG_JOURNAL_EXTENSION
+
+	# Read all complete entries of a journal file. Returns a list of dicts.
+	@staticmethod
+	def readEntries(file_name):
+		entries = []
+		if not os.path.isfile(file_name):
+			return entries
+		with open(file_name, "r") as journal_file:
+			for line in journal_file:
+				# A line without line break is an incomplete tail
+				if not line.endswith("\n"):
+					print("[LogJournal]: Ignoring incomplete last entry of " + str(file_name))
+					break
+				try:
+					entries.append(json.loads(line))
+				except ValueError:
+					print("[LogJournal]: Ignoring damaged entry of " + str(file_name))
+		return entries
+
+	# Cut the file after its last complete line, i.e. remove a tail left by a crash
+	@staticmethod
+	def repairTail(file_name):
+		if not os.path.isfile(file_name):
+			return
+		with open(file_name, "rb+") as journal_file:
+			content = journal_file.read()
+			if len(content) == 0 or content.endswith(b"\n"):
+				return
+			print("[LogJournal]: Removing incomplete last entry of " + str(file_name))
+			journal_file.truncate(content.rfind(b"\n") + 1)
+
+	def open(self):
+		if self.file_ is None:
+			self.repairTail(self.file_name_)
+			self.file_ = open(self.file_name_, "a")
+
+	# Append one entry (dict). The entry is visible for readers as soon as this method returns.
+	def append(self, entry):
+		self.open()
+		self.file_.write(json.dumps(entry, sort_keys=True) + "\n")
+		self.file_.flush()
+		self.unsynced_entries_ += 1
+		if self.unsynced_entries_ >= self.fsync_batch_size_:
+			self.sync()
+
+	# Force all appended entries to the disk
+	def sync(self):
+		if self.file_ is not None and self.unsynced_entries_ > 0:
+			self.file_.flush()
+			os.fsync(self.file_.fileno())
+		self.unsynced_entries_ = 0
+
+	def close(self):
+		if self.file_ is not None:
+			self.sync()
+			self.file_.close()
+			self.file_ = None
@@ -0,0 +1,180 @@
+#!/usr/bin/env python
+
+import hashlib
+import os
+from collections import OrderedDict
+from threading import Lock
+import numpy as np
+import cv2
+
+# ========================================================================
+# Description:
+# Lazy loader for the room maps of the database.
+# A room map file only contains the bounding box crop of the room. The
+# position of the crop in the global map is stored as room_map_offset_
+# (column, row) of the room, files without offset are full-size maps.
+# The mono8 room masks are decoded from their PNG file only once and stored
+# uncompressed (.npy) in the cache folder next to the PNG files. Afterwards
+# they are memory-mapped from there instead of being decoded again.
+# getRoomMask returns the crop with its offset. Only getRoomMap builds the
+# full-size sensor_msgs/Image which the ROS services expect. At most
+# max_resident_maps of these maps are kept in memory, the least recently
+# used map is dropped first.
+# getRoomMapHash identifies the version of a room map (e.g. for the
+# coverage path cache). It is computed once per version of the map file.
+# ========================================================================
+
+CACHE_FOLDER_NAME = "cache"
+
+
+# Returns the bounding box crop of the pixels > 0 of a full-size mask and its offset (column, row)
+def cropMask(mask):
+	(rows, columns) = np.nonzero(mask)
+	if len(rows) == 0:
+		return (np.zeros((1, 1), np.uint8), (0, 0))
+	(row_min, column_min) = (rows.min(), columns.min())
+	crop = np.ascontiguousarray(mask[row_min:rows.max() + 1, column_min:columns.max() + 1])
+	return (crop, (int(column_min), int(row_min)))
+
+
+# Returns a hash of a room map given as sensor_msgs/Image, e.g. of a map which has not been loaded from a file
+def getImageHash(image):
+	image_hash = hashlib.sha1(image.data)
+	image_hash.update(str((image.width, image.height, image.step, image.encoding)))
+	return image_hash.hexdigest()
+
+
+class RoomMask:
+
+	# mask: crop of the room map, offset: (column, row) of the crop in the global map, map_shape: (height, width) of the global map
+	def __init__(self, mask, offset, map_shape):
+		self.mask_ = mask
+		self.offset_ = (int(offset[0]), int(offset[1]))
+		self.map_shape_ = map_shape
+
+	# Returns the slices (rows, columns) of the crop in the global map
+	def getSlices(self):
+		(height, width) = self.mask_.shape[:2]
+		return (slice(self.offset_[1], self.offset_[1] + height), slice(self.offset_[0], self.offset_[0] + width))
+
+	def toFullImage(self):
+		(rows, columns) = self.getSlices()
+		if self.offset_ == (0, 0) and self.mask_.shape[:2] == tuple(self.map_shape_):
+			return np.ascontiguousarray(self.mask_)
+		full_mask = np.zeros(self.map_shape_, np.uint8)
+		full_mask[rows, columns] = self.mask_[:self.map_shape_[0] - rows.start, :self.map_shape_[1] - columns.start]
+		return full_mask
+
+
+class RoomMapCache:
+
+	def __init__(self, maps_path, max_resident_maps=16):
+		self.maps_path_ = maps_path
+		self.cache_path_ = os.path.join(maps_path, CACHE_FOLDER_NAME)
+		self.max_resident_maps_ = max(1, max_resident_maps)
+		self.resident_maps_ = OrderedDict()
+		# Created at the first conversion into a message, so the cache can be used without ROS
+		self.bridge_ = None
+		# Hashes of the room maps by (file name, offset, modification time of the file, size of the global map)
+		self.map_hashes_ = {}
+		# (height, width) of the global map, None if unknown
+		self.map_shape_ = None
+		self.mutex_ = Lock()
+
+	# Set the size of the global map, which is the size of the full-size room maps
+	def setMapShape(self, height, width):
+		with self.mutex_:
+			if self.map_shape_ != (height, width):
+				self.resident_maps_.clear()
+			self.map_shape_ = (height, width)
+
+	def getRawMapFileName(self, map_filename):
+		return os.path.join(self.cache_path_, os.path.splitext(map_filename)[0] + ".npy")
+
+	# Store the mask uncompressed. The file is renamed at the end such that no partial file can be read.
+	def saveRawMap(self, raw_map_file_name, mask):
+		if not os.path.isdir(self.cache_path_):
+			os.makedirs(self.cache_path_)
+		tmp_raw_map_file_name = raw_map_file_name + ".part"
+		with open(tmp_raw_map_file_name, "wb") as raw_map_file:
+			np.save(raw_map_file, mask)
+		os.rename(tmp_raw_map_file_name, raw_map_file_name)
+
+	# Return the mono8 mask of a room map as numpy array or None if there is no such map
+	def loadMask(self, map_filename):
+		map_file_name = os.path.join(self.maps_path_, map_filename)
+		raw_map_file_name = self.getRawMapFileName(map_filename)
+		if not os.path.isfile(map_file_name):
+			return None
+		# The uncompressed map is outdated if the PNG file has been changed afterwards
+		if os.path.isfile(raw_map_file_name) and os.path.getmtime(raw_map_file_name) >= os.path.getmtime(map_file_name):
+			return np.load(raw_map_file_name, mmap_mode="r")
+		mask = cv2.imread(map_file_name, 0)
+		if mask is not None:
+			try:
+				self.saveRawMap(raw_map_file_name, mask)
+			except (IOError, OSError) as e:
+				print("[RoomMapCache]: Could not cache map " + str(map_filename) + ": " + str(e))
+		return mask
+
+	# Return the RoomMask of a room map or None if there is no such map. offset: (column, row) of the map file in the global map.
+	def getRoomMask(self, map_filename, offset=(0, 0)):
+		mask = self.loadMask(map_filename)
+		if mask is None:
+			return None
+		map_shape = self.map_shape_
+		if map_shape is None:
+			# without global map the full-size map ends with the crop
+			map_shape = (offset[1] + mask.shape[0], offset[0] + mask.shape[1])
+		return RoomMask(mask, offset, map_shape)
+
+	# Return the hash of a room map (crop, offset and size of the global map) or None if there is no such map
+	def getRoomMapHash(self, map_filename, offset=(0, 0)):
+		map_file_name = os.path.join(self.maps_path_, map_filename)
+		if not os.path.isfile(map_file_name):
+			return None
+		key = (map_filename, tuple(offset), os.path.getmtime(map_file_name), self.map_shape_)
+		with self.mutex_:
+			map_hash = self.map_hashes_.get(key)
+		if map_hash is not None:
+			return map_hash
+		room_mask = self.getRoomMask(map_filename, offset)
+		if room_mask is None:
+			return None
+		map_hash = hashlib.sha1(np.ascontiguousarray(room_mask.mask_))
+		map_hash.update(str((room_mask.mask_.shape, room_mask.offset_, tuple(room_mask.map_shape_))))
+		map_hash = map_hash.hexdigest()
+		with self.mutex_:
+			# a former version of the map file is not requested again
+			for former_key in [former_key for former_key in self.map_hashes_ if former_key[:2] == key[:2]]:
+				del self.map_hashes_[former_key]
+			self.map_hashes_[key] = map_hash
+		return map_hash
+
+	# Return the full-size room map as sensor_msgs/Image (mono8) or None if there is no such map
+	def getRoomMap(self, map_filename, offset=(0, 0)):
+		key = (map_filename, tuple(offset))
+		with self.mutex_:
+			room_map = self.resident_maps_.pop(key, None)
+			if room_map is not None:
+				self.resident_maps_[key] = room_map
+				return room_map
+
+		room_mask = self.getRoomMask(map_filename, offset)
+		if room_mask is None:
+			return None
+		if self.bridge_ is None:
+			from cv_bridge import CvBridge
+			self.bridge_ = CvBridge()
+		room_map = self.bridge_.cv2_to_imgmsg(room_mask.toFullImage(), encoding="mono8")
+
+		with self.mutex_:
+			self.resident_maps_[key] = room_map
+			while len(self.resident_maps_) > self.max_resident_maps_:
+				self.resident_maps_.popitem(last=False)
+		return room_map
+
+	# Drop all resident maps, e.g. after the room map files have been changed
+	def clear(self):
+		with self.mutex_:
+			self.resident_maps_.clear()
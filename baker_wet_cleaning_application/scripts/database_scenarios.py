@@ -5,6 +5,7 @@ import json
 from datetime import datetime, timedelta
 import sys
 import database_utils
+import database_date_format
 
 DATABASE_LOCATION = '../resources/json/'
 SET_APPLICATION_STATUS_SERVICE = '/set_application_status_application_wet_cleaning'
@@ -25,10 +26,9 @@ def resetLastPlanningDate():
 
 	today = datetime.now()
 	new_date = today - timedelta(days=1)
-	data['last_planning_date'] = [new_date.strftime(database_utils.DATE_FORMAT)]*2
+	data['last_planning_date'] = [database_date_format.datetimeToString(new_date)]*2
 
-	with open(app_filename, 'w') as wf:
-		json.dump(data, wf, indent=4, sort_keys=True)
+	database_utils.saveJsonDatabase(app_filename, data)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,105 @@
+#!/usr/bin/env python
+
+import numpy as np
+from datetime import datetime, timedelta
+
+# ========================================================================
+# Description:
+# Evaluation of the cleaning schedule of many rooms at once.
+# The 14 day schedules of the rooms are precomputed into a rooms x 14 array
+# of day types and their cleaning datestamps into a rooms x 3 datetime64
+# array ([Trashcan, Dry, Wet], NaT for None). The due and overdue tasks of
+# all rooms are then evaluated with array operations.
+# The results are rooms x 3 boolean arrays with the columns [Trashcan, Dry,
+# Wet], i.e. the column of a task is task + 1 (see DatabaseHandler).
+# ========================================================================
+
+NO_DAY = 0
+CLEANING_DAY = 1
+TRASH_DAY = 2
+SCHEDULE_LENGTH = 14
+# Day types of the schedule characters (see DatabaseHandler.isCleaningDay and isTrashDay)
+DAY_TYPES = {"x": CLEANING_DAY, "X": CLEANING_DAY, "p": TRASH_DAY, "P": TRASH_DAY}
+# Tasks of the columns of the task arrays
+TASKS = [-1, 0, 1]
+EPOCH = datetime(1970, 1, 1)
+NAT_VALUE = np.iinfo(np.int64).min
+
+
+# Integer representation of datetime64[us], which is faster to create than converting datetime objects with numpy
+def datetimeToMicroseconds(datetime_date):
+	if datetime_date is None:
+		return NAT_VALUE
+	delta = datetime_date - EPOCH
+	return (delta.days*86400 + delta.seconds)*1000000 + delta.microseconds
+
+
+# Returns the list of (room, set of tasks) of all rooms with at least one task in task_array (rows in the order of rooms)
+def getRoomTasks(rooms, task_array):
+	room_tasks = []
+	for room_index in np.flatnonzero(task_array.any(axis=1)):
+		tasks = set(TASKS[task_column] for task_column in np.flatnonzero(task_array[room_index]))
+		room_tasks.append((rooms[room_index], tasks))
+	return room_tasks
+
+
+class ScheduleEngine:
+
+	def __init__(self, rooms):
+		self.rooms_ = list(rooms)
+		self.day_types_ = np.array([self.getDayTypes(room.room_scheduled_days_) for room in self.rooms_], np.uint8).reshape(-1, SCHEDULE_LENGTH)
+		cleaning_methods = np.array([room.room_cleaning_method_ if room.room_cleaning_method_ in [0, 1, 2] else -1 for room in self.rooms_], np.int16)
+		self.datestamps_ = np.array([[datetimeToMicroseconds(datestamp) for datestamp in room.room_cleaning_datestamps_[:3]] for room in self.rooms_], np.int64).reshape(-1, 3).view("datetime64[us]")
+		# Tasks which are part of the cleaning method of a room (see DatabaseHandler.is<Trash/Dry/Wet>CleaningMethod)
+		self.method_tasks_ = np.column_stack([
+			cleaning_methods >= 0,
+			(cleaning_methods == 0) | (cleaning_methods == 2),
+			(cleaning_methods == 1) | (cleaning_methods == 2)
+		])
+
+	@staticmethod
+	def getDayTypes(scheduled_days):
+		day_types = [DAY_TYPES.get(schedule_char, NO_DAY) for schedule_char in scheduled_days[:SCHEDULE_LENGTH]]
+		return day_types + [NO_DAY]*(SCHEDULE_LENGTH - len(day_types))
+
+	# Datestamps shifted by the planning offset (minutes), i.e. converted from real to robot dates
+	def getRobotDatestamps(self, planning_offset):
+		return self.datestamps_ - np.timedelta64(timedelta(minutes=planning_offset))
+
+	# Tasks which become due today (robot_today is a date): every task of the cleaning method on a cleaning day,
+	# unless it has been done today already, and the trashcan on a trash day.
+	def computeDueTasks(self, today_index, robot_today, planning_offset):
+		day_types = self.day_types_[:, today_index]
+		done_today = self.getRobotDatestamps(planning_offset).astype("datetime64[D]") == np.datetime64(robot_today, "D")
+		due_tasks = (day_types == CLEANING_DAY)[:, np.newaxis] & self.method_tasks_ & ~done_today
+		due_tasks[:, 0] |= day_types == TRASH_DAY
+		return due_tasks
+
+	# Tasks which were scheduled on one of the 13 days before today and have not been done since.
+	# robot_now is the current robot datetime. As earlier days have earlier deadlines,
+	# only the latest scheduled day of each day type matters.
+	def computeOverdueTasks(self, today_index, robot_now, planning_offset):
+		past_day_deltas = np.arange(1, SCHEDULE_LENGTH)
+		past_day_types = self.day_types_[:, (today_index - past_day_deltas) % SCHEDULE_LENGTH]
+		robot_now = np.datetime64(robot_now, "us")
+
+		# Missed cleaning days: compared with the robot datestamps
+		is_cleaning_day = past_day_types == CLEANING_DAY
+		cleaning_deadlines = robot_now - (np.argmax(is_cleaning_day, axis=1) + 1).astype("timedelta64[D]")
+		robot_datestamps = self.getRobotDatestamps(planning_offset)
+		not_done = np.isnat(robot_datestamps)
+		not_done[~not_done] = robot_datestamps[~not_done] < np.broadcast_to(cleaning_deadlines[:, np.newaxis], robot_datestamps.shape)[~not_done]
+		overdue_tasks = is_cleaning_day.any(axis=1)[:, np.newaxis] & self.method_tasks_ & not_done
+
+		# Missed trash days: compared with the real datestamp of the trashcan, as in the former implementation
+		is_trash_day = past_day_types == TRASH_DAY
+		trash_deadlines = robot_now - (np.argmax(is_trash_day, axis=1) + 1).astype("timedelta64[D]")
+		trash_datestamps = self.datestamps_[:, 0]
+		trash_not_done = np.isnat(trash_datestamps)
+		trash_not_done[~trash_not_done] = trash_datestamps[~trash_not_done] < trash_deadlines[~trash_not_done]
+		overdue_tasks[:, 0] |= is_trash_day.any(axis=1) & trash_not_done
+		return overdue_tasks
+
+	# Returns the list of (room, set of tasks) of all rooms with at least one task in task_array
+	def getRoomTasks(self, task_array):
+		return getRoomTasks(self.rooms_, task_array)
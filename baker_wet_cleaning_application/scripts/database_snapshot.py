@@ -0,0 +1,95 @@
+#!/usr/bin/env python
+
+import argparse
+import os
+try:
+	import cPickle as pickle
+except ImportError:
+	import pickle
+import database_file_writer
+
+# ========================================================================
+# Description:
+# Binary snapshot of the room database (rooms.json).
+# The snapshot stores every room as a tuple of plain values in a fixed
+# order (see Database.getRoomSnapshotFromRoom), with the dates already
+# converted to datetime. It is pickled together with a header holding the
+# snapshot version and the size and modification time of the rooms.json
+# it was made from. A snapshot is only used while it is fresh, i.e. while
+# rooms.json and the snapshot version are unchanged.
+# rooms.json stays the source and export format of the room database.
+#
+# Conversion between both formats:
+# python database_snapshot.py --to_snapshot [--database_location ../resources]
+# python database_snapshot.py --to_json [--database_location ../resources]
+# ========================================================================
+
+SNAPSHOT_FORMAT = "baker_rooms_snapshot"
+# Increase on every change of the room tuples
+SNAPSHOT_VERSION = 3
+SNAPSHOT_EXTENSION = ".snapshot"
+
+
+def getSnapshotFileName(json_file_name):
+	return os.path.splitext(json_file_name)[0] + SNAPSHOT_EXTENSION
+
+
+# Identification of the JSON file a snapshot was made from
+def getSourceStamp(json_file_name):
+	file_stat = os.stat(json_file_name)
+	return [file_stat.st_size, file_stat.st_mtime]
+
+
+# Write the room tuples as snapshot of json_file_name, which has to be written before
+def saveSnapshot(json_file_name, room_records):
+	snapshot = {
+		"format": SNAPSHOT_FORMAT,
+		"version": SNAPSHOT_VERSION,
+		"source": getSourceStamp(json_file_name),
+		"rooms": room_records
+	}
+	database_file_writer.writeFileAtomically(getSnapshotFileName(json_file_name), pickle.dumps(snapshot, pickle.HIGHEST_PROTOCOL), binary=True)
+
+
+# Returns the room tuples of the snapshot of json_file_name, or None if there is no fresh snapshot
+def loadSnapshot(json_file_name):
+	snapshot_file_name = getSnapshotFileName(json_file_name)
+	if not os.path.isfile(snapshot_file_name) or not os.path.isfile(json_file_name):
+		return None
+	try:
+		with open(snapshot_file_name, "rb") as snapshot_file:
+			snapshot = pickle.load(snapshot_file)
+	except Exception as e:
+		print("[DatabaseSnapshot]: Ignoring unreadable snapshot " + str(snapshot_file_name) + ": " + str(e))
+		return None
+	if not isinstance(snapshot, dict) or snapshot.get("format") != SNAPSHOT_FORMAT or snapshot.get("version") != SNAPSHOT_VERSION:
+		return None
+	if snapshot.get("source") != getSourceStamp(json_file_name):
+		return None
+	return snapshot.get("rooms")
+
+
+if __name__ == '__main__':
+	parser = argparse.ArgumentParser(description='Convert the room database between rooms.json and its binary snapshot')
+	direction = parser.add_mutually_exclusive_group(required=True)
+	direction.add_argument('--to_snapshot', action='store_true', help='Create the snapshot from rooms.json')
+	direction.add_argument('--to_json', action='store_true', help='Write rooms.json from the snapshot')
+	parser.add_argument('--database_location', default='../resources', help='Folder containing json/rooms.json. Default ../resources')
+	args = parser.parse_args()
+
+	from database import Database
+	database = Database(extracted_file_path=args.database_location, auto_load_database=False)
+	if args.to_snapshot:
+		database.readRoomsJson()
+		database.saveRoomsSnapshot()
+	else:
+		snapshot_file_name = getSnapshotFileName(database.rooms_filename_)
+		with open(snapshot_file_name, "rb") as snapshot_file:
+			snapshot = pickle.load(snapshot_file)
+		if snapshot.get("format") != SNAPSHOT_FORMAT or snapshot.get("version") != SNAPSHOT_VERSION:
+			raise SystemExit("Unsupported snapshot " + str(snapshot_file_name))
+		database.updateRoomsListFromSnapshot(snapshot.get("rooms"))
+		database.saveRoomDatabase(temporal=False)
+		# The new rooms.json invalidates the former snapshot
+		database.saveRoomsSnapshot()
+	print("Converted " + str(len(database.rooms_)) + " rooms")
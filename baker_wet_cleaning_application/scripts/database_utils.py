@@ -3,12 +3,15 @@
 import json
 from datetime import datetime, timedelta
 import os
+import shutil
+import database_file_writer
+import database_date_format
 
 # =========================================================
 # Contains some functions to manipulate the json database
 # =========================================================
 
-DATE_FORMAT = '%Y-%m-%d_%H:%M'
+DATE_FORMAT = database_date_format.DATE_FORMAT
 DATABASE_LOCATION = '../resources/json'
 
 def updateAndReturnPreviousPlanningOffset(planning_offset, database_location=DATABASE_LOCATION):
@@ -32,8 +35,7 @@ def loadJsonDatabase(filename):
 
 
 def saveJsonDatabase(filename, data):
-	f = open(filename, 'w')
-	json.dump(data, f, indent=4, sort_keys=True)
+	database_file_writer.saveJsonFile(filename, data)
 
 
 def reset(data, reset_opened_tasks=False, reset_timestamps=False, reset_scheduled_tasks=False, reset_tmp_database=False):
@@ -47,7 +49,7 @@ def reset(data, reset_opened_tasks=False, reset_timestamps=False, reset_schedule
 			data[key]['open_cleaning_tasks'] = []
 
 		if reset_timestamps:
-			data[key]['room_cleaning_datestamps'] = [previous_date.strftime(DATE_FORMAT)] * 3
+			data[key]['room_cleaning_datestamps'] = [database_date_format.datetimeToString(previous_date)] * 3
 
 		if reset_scheduled_tasks:
 			data[key]['room_scheduled_days'] = ['']*14
@@ -81,7 +83,7 @@ def updateRooms(data, methods_dict, offset=0, reset_opened_tasks=False, reset_ti
 			data[key]['open_cleaning_tasks'] = []
 
 		if reset_timestamps:
-			data[key]['room_cleaning_datestamps'] = [previous_date.strftime(DATE_FORMAT)] * 3
+			data[key]['room_cleaning_datestamps'] = [database_date_format.datetimeToString(previous_date)] * 3
 
 		data[key]['room_cleaning_method'] = methods_dict[key]
 
@@ -98,6 +100,8 @@ def removeTmpDatabase(database_location):
 		except OSError as error:
 			print(error)
 			pass
+	# Temporal rooms are saved with one file per room
+	shutil.rmtree(database_location + '/tmp_rooms', ignore_errors=True)
 
 
 def updateDatabaseToScenario(scenario, database_location=DATABASE_LOCATION, planning_offset=0):
@@ -127,7 +131,7 @@ def updateDatabaseToScenario(scenario, database_location=DATABASE_LOCATION, plan
 				# days_delta_str == 'D-5' means 5 days before now (now == 'D-0')
 				days_delta_str = scenario['room_cleaning_datestamps'][room_id][method_index]
 				days_delta = int(days_delta_str[1:])
-				rooms_data[room_id]['room_cleaning_datestamps'][method_index] = (today + timedelta(days=days_delta)).strftime(DATE_FORMAT)
+				rooms_data[room_id]['room_cleaning_datestamps'][method_index] = database_date_format.datetimeToString(today + timedelta(days=days_delta))
 
 		if 'room_scheduled_days' in scenario.keys() and room_id in scenario['room_scheduled_days'].keys():
 			for (days_delta_str, method) in scenario['room_scheduled_days'][room_id].items():
@@ -139,14 +143,14 @@ def updateDatabaseToScenario(scenario, database_location=DATABASE_LOCATION, plan
 
 	app_data = loadJsonDatabase(database_location + 'application_data.json')
 	previous_date = datetime.now() - timedelta(days=3)
-	app_data['last_planning_date'] = [previous_date.strftime(DATE_FORMAT)]*2
+	app_data['last_planning_date'] = [database_date_format.datetimeToString(previous_date)]*2
 
 	if 'last_planning_date' in scenario.keys():
 		planning_dates = scenario['last_planning_date']
 		for k in range(len(planning_dates)):
 			if planning_dates[k] == 'TODAY':
-				app_data['last_planning_date'][k] = datetime.now().strftime(DATE_FORMAT)
+				app_data['last_planning_date'][k] = database_date_format.datetimeToString(datetime.now())
 				print(app_data['last_planning_date'])
 			elif planning_dates[k] == 'YESTERDAY':
-				app_data['last_planning_date'][k] = (datetime.now() - timedelta(days=1)).strftime(DATE_FORMAT)
+				app_data['last_planning_date'][k] = database_date_format.datetimeToString(datetime.now() - timedelta(days=1))
 	saveJsonDatabase(database_location + 'application_data.json', app_data)
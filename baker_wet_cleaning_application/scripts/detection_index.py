@@ -0,0 +1,121 @@
+#!/usr/bin/env python
+
+from math import ceil, floor, hypot
+from threading import Lock
+
+# ========================================================================
+# Description:
+# Spatial index of the detections (cob_object_detection_msgs/Detection)
+# of one kind, e.g. dirt spots or trashcans.
+# Repeated sightings of the same object are fused into one track, which
+# counts the sightings as confidence. Two detections belong to the same
+# object if the distance of their positions is at most the merge radius or
+# the half diagonal of the larger bounding box.
+# The tracks are stored in a grid of merge radius sized cells, so finding
+# the track of a detection only looks at the neighboring cells instead of
+# all tracks.
+# ========================================================================
+
+
+class DetectionTrack:
+
+	def __init__(self, detection, x, y, radius):
+		# First detection of the object
+		self.detection_ = detection
+		# Mean position of all sightings
+		(self.x_, self.y_) = (x, y)
+		self.radius_ = radius
+		# Number of sightings
+		self.count_ = 1
+
+	def fuse(self, x, y, radius):
+		self.count_ += 1
+		self.x_ += (x - self.x_) / self.count_
+		self.y_ += (y - self.y_) / self.count_
+		self.radius_ = max(self.radius_, radius)
+
+
+class DetectionIndex:
+
+	def __init__(self, merge_radius=0.3):
+		self.merge_radius_ = merge_radius
+		self.cell_size_ = max(merge_radius, 0.01)
+		# Tracks by grid cell (column, row)
+		self.cells_ = {}
+		self.tracks_ = []
+		# Largest bounding box radius of all tracks, which limits the search for neighbors
+		self.max_radius_ = 0.
+		self.mutex_ = Lock()
+
+	def __len__(self):
+		return len(self.tracks_)
+
+	def getTracks(self):
+		with self.mutex_:
+			return list(self.tracks_)
+
+	@staticmethod
+	def getPositionAndRadius(detection):
+		position = detection.pose.pose.position
+		bounding_box = detection.bounding_box_lwh
+		return (position.x, position.y, 0.5 * hypot(bounding_box.x, bounding_box.y))
+
+	def getCell(self, x, y):
+		return (int(floor(x / self.cell_size_)), int(floor(y / self.cell_size_)))
+
+	# Returns the closest track of an object at the position or None. Call with self.mutex_ acquired.
+	def findClosestTrack(self, x, y, radius):
+		search_radius = max(self.merge_radius_, radius, self.max_radius_)
+		cell_range = int(ceil(search_radius / self.cell_size_))
+		(column, row) = self.getCell(x, y)
+		(closest_track, closest_distance) = (None, None)
+		for neighbor_column in range(column - cell_range, column + cell_range + 1):
+			for neighbor_row in range(row - cell_range, row + cell_range + 1):
+				for track in self.cells_.get((neighbor_column, neighbor_row), []):
+					distance = hypot(track.x_ - x, track.y_ - y)
+					if distance <= max(self.merge_radius_, radius, track.radius_) and (closest_distance is None or distance < closest_distance):
+						(closest_track, closest_distance) = (track, distance)
+		return closest_track
+
+	# Add a sighting to a track. Call with self.mutex_ acquired.
+	def fuseTrack(self, track, x, y, radius):
+		cell = self.getCell(track.x_, track.y_)
+		track.fuse(x, y, radius)
+		# the mean position may move the track into another cell
+		if self.getCell(track.x_, track.y_) != cell:
+			self.cells_[cell].remove(track)
+			self.cells_.setdefault(self.getCell(track.x_, track.y_), []).append(track)
+		self.max_radius_ = max(self.max_radius_, track.radius_)
+
+	def findTrack(self, detection):
+		(x, y, radius) = self.getPositionAndRadius(detection)
+		with self.mutex_:
+			return self.findClosestTrack(x, y, radius)
+
+	# Fuse the detection into the track of its object or start a new track. Returns (track, True if the track is new).
+	def add(self, detection):
+		(x, y, radius) = self.getPositionAndRadius(detection)
+		with self.mutex_:
+			track = self.findClosestTrack(x, y, radius)
+			if track is not None:
+				self.fuseTrack(track, x, y, radius)
+				return (track, False)
+			track = DetectionTrack(detection, x, y, radius)
+			self.cells_.setdefault(self.getCell(x, y), []).append(track)
+			self.tracks_.append(track)
+			self.max_radius_ = max(self.max_radius_, radius)
+			return (track, True)
+
+	# Returns the detections of objects which are not in the index yet, at most one per object.
+	# Detections of known objects are counted as sightings of their tracks.
+	def filterNewDetections(self, detections):
+		new_detections = DetectionIndex(self.merge_radius_)
+		for detection in detections:
+			(x, y, radius) = self.getPositionAndRadius(detection)
+			with self.mutex_:
+				track = self.findClosestTrack(x, y, radius)
+				if track is not None:
+					self.fuseTrack(track, x, y, radius)
+					continue
+			new_detections.add(detection)
+		return [track.detection_ for track in new_detections.tracks_]
@@ -0,0 +1,132 @@
+#!/usr/bin/env python
+
+import time
+from collections import deque
+from threading import Condition, Event, Lock, Thread
+import rospy
+from std_srvs.srv import Trigger
+from service_proxy_pool import getServiceProxyPool
+
+# ========================================================================
+# Description:
+# Switches detectors on and off with their start and stop trigger
+# services, without blocking the caller.
+# The calls are made by a fixed number of worker threads. Each detector
+# only keeps its latest desired state: requests which arrive while a
+# detector is switched collapse into one call, and a detector is never
+# switched by two workers at the same time.
+# Every request returns a DetectorStateFuture, which is resolved with True
+# as soon as the detector is confirmed in the requested state, and with
+# False if the call failed or a later request changed the desired state.
+# ========================================================================
+
+
+class DetectorStateFuture:
+
+	def __init__(self, active):
+		self.active_ = active
+		self.event_ = Event()
+		self.result_ = None
+
+	def setResult(self, result):
+		self.result_ = result
+		self.event_.set()
+
+	def done(self):
+		return self.event_.is_set()
+
+	# Returns True if the requested state has been confirmed, False if not, None on timeout
+	def result(self, timeout=None):
+		self.event_.wait(timeout)
+		return self.result_
+
+
+class DetectorSwitch:
+
+	# detectors: {detector name: (start service name, stop service name)}
+	def __init__(self, detectors, worker_count=2):
+		self.detectors_ = dict(detectors)
+		# Desired state (True = active) and the last confirmed state (None if unknown) of each detector
+		self.desired_states_ = {}
+		self.confirmed_states_ = dict((name, None) for name in self.detectors_)
+		self.futures_ = dict((name, []) for name in self.detectors_)
+		# Detectors waiting for a worker, and detectors which are being switched
+		self.queue_ = deque()
+		self.scheduled_ = set()
+		self.condition_ = Condition(Lock())
+		for _ in range(worker_count):
+			worker = Thread(target=self.work)
+			worker.daemon = True
+			worker.start()
+
+	def setState(self, name, active):
+		future = DetectorStateFuture(active)
+		with self.condition_:
+			self.desired_states_[name] = active
+			# requests of the other state are superseded
+			for pending_future in self.futures_[name]:
+				if pending_future.active_ != active:
+					pending_future.setResult(False)
+			self.futures_[name] = [pending_future for pending_future in self.futures_[name] if not pending_future.done()]
+			self.futures_[name].append(future)
+			# if the detector is being switched, its worker applies the new state afterwards
+			if name not in self.scheduled_ and self.confirmed_states_[name] == active:
+				self.resolveFutures(name, True)
+			elif name not in self.scheduled_:
+				self.scheduled_.add(name)
+				self.queue_.append(name)
+				self.condition_.notify()
+		return future
+
+	def start(self, name):
+		return self.setState(name, True)
+
+	def stop(self, name):
+		return self.setState(name, False)
+
+	def stopAll(self):
+		return [self.stop(name) for name in self.detectors_]
+
+	# Returns True if all futures have been resolved with True within timeout seconds
+	@staticmethod
+	def waitAll(futures, timeout=None):
+		deadline = None if timeout is None else time.time() + timeout
+		return all([future.result(None if deadline is None else max(0., deadline - time.time())) for future in futures])
+
+	# Resolve the futures of the desired state of a detector with result and all others with False.
+	# Call with self.condition_ acquired.
+	def resolveFutures(self, name, result):
+		for future in self.futures_[name]:
+			future.setResult(result if future.active_ == self.desired_states_.get(name) else False)
+		self.futures_[name] = []
+
+	# Returns True if the detector answered, i.e. it is in the requested state
+	def switchDetector(self, name, active):
+		service_name = self.detectors_[name][0 if active else 1]
+		try:
+			response = getServiceProxyPool().call(service_name, Trigger, idempotent=True)
+			# e.g. the start of a running detector is answered with success = False, its state is still the requested one
+			if response is not None and not response.success:
+				print("[DetectorSwitch]: Service {} answered: {}".format(service_name, response.message))
+			return True
+		except (rospy.ServiceException, rospy.ROSException) as e:
+			print("[DetectorSwitch]: Service call to {} failed: {}".format(service_name, e))
+			return False
+
+	def work(self):
+		while True:
+			with self.condition_:
+				while len(self.queue_) == 0:
+					self.condition_.wait()
+				name = self.queue_.popleft()
+				active = self.desired_states_[name]
+			success = self.switchDetector(name, active)
+			with self.condition_:
+				self.confirmed_states_[name] = active if success else None
+				if self.desired_states_[name] != active:
+					# the desired state changed during the call, switch again
+					self.queue_.append(name)
+					self.condition_.notify()
+					continue
+				self.resolveFutures(name, success and self.desired_states_[name] == active)
+				self.scheduled_.discard(name)
@@ -6,6 +6,7 @@ from cob_map_accessibility_analysis.srv import CheckPerimeterAccessibility, Chec
 from baker_msgs.srv import CleanPattern, CleanPatternRequest
 from geometry_msgs.msg import Pose2D, Pose, Quaternion
 from utils import getCurrentRobotPosition
+from service_proxy_pool import getServiceProxyPool
 
 from move_base_behavior import MoveBaseBehavior
 import behavior_container
@@ -43,8 +44,6 @@ class DirtRemovingBehavior(behavior_container.BehaviorContainer):
 		pass
 
 	def computeAccessiblePosesForVacuumCleaner(self):
-		accessibility_checker = rospy.ServiceProxy(self.map_accessibility_service_str_, CheckPerimeterAccessibility)
-
 		request = CheckPerimeterAccessibilityRequest()
 
 		center = Pose2D()
@@ -54,7 +53,7 @@ class DirtRemovingBehavior(behavior_container.BehaviorContainer):
 
 		request.radius = 0.8  # todo (rmb-ma) use the value from the cleaning device
 		request.rotational_sampling_step = 0.3
-		response = accessibility_checker(request)
+		response = getServiceProxyPool().call(self.map_accessibility_service_str_, CheckPerimeterAccessibility, request, idempotent=True)
 
 		accessible_poses = response.accessible_poses_on_perimeter
 		return accessible_poses
@@ -163,9 +162,6 @@ class DirtRemovingBehavior(behavior_container.BehaviorContainer):
 		return best_pose
 
 	def removeDirt(self):
-		clean_pattern = rospy.ServiceProxy(self.clean_pattern_str_, CleanPattern)
-
-
 		(robot_position, robot_orientation, robot_rotation) = getCurrentRobotPosition()
 		theta = robot_rotation[0]
 		(x_robot, y_robot) = (robot_position[0], robot_position[1])
@@ -184,7 +180,7 @@ class DirtRemovingBehavior(behavior_container.BehaviorContainer):
 
 			request.clean_pattern_params.repetitions = [ 1 ]
 			request.clean_pattern_params.retract = True
-			response = clean_pattern(request)
+			response = getServiceProxyPool().call(self.clean_pattern_str_, CleanPattern, request)
 			return response.success
 
 		return True
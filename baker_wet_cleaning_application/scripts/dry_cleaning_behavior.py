@@ -1,14 +1,17 @@
 #!/usr/bin/env python
 
+import os
 import rospy
 from cob_object_detection_msgs.msg import DetectionArray
 from geometry_msgs.msg import Pose2D, Quaternion, Pose, Point
-from std_srvs.srv import Trigger
 
 from move_base_path_behavior import MoveBasePathBehavior
 from dirt_removing_behavior import DirtRemovingBehavior
 from abstract_cleaning_behavior import AbstractCleaningBehavior
 from trashcan_emptying_behavior import TrashcanEmptyingBehavior
+from detector_switch import DetectorSwitch
+from detection_index import DetectionIndex
+from database_hotspot_map import HotspotMapStore, prioritizeSegments
 
 from threading import Lock, Thread
 from utils import projectToCamera, projectToFrame, getCurrentRobotPosition
@@ -36,8 +39,24 @@ class DryCleaningBehavior(AbstractCleaningBehavior):
 		super(DryCleaningBehavior, self).__init__(behavior_name, interrupt_var)
 		(self.detected_dirts_, self.detected_trashs_) = ([], [])
 		self.local_mutex_ = Lock()
+		# Path follower which is currently running, interrupted by the detection callbacks
+		self.path_follower_ = None
 		(self.trash_topic_subscriber_, self.dirt_topic_subscriber_) = (None, None)
-		(self.found_dirtspots_, self.found_trashcans_) = ([], [])
+		# Distance in meters within which two detections are taken as the same dirt spot / trashcan
+		self.detection_merge_radius_ = 0.3
+		(self.found_dirtspots_, self.found_trashcans_) = (DetectionIndex(self.detection_merge_radius_), DetectionIndex(self.detection_merge_radius_))
+		self.detector_switch_ = DetectorSwitch({
+			'dirt': (srv.START_DIRT_DETECTOR_SERVICE_STR, srv.STOP_DIRT_DETECTOR_SERVICE_STR),
+			'trash': (srv.START_TRASH_DETECTOR_SERVICE_STR, srv.STOP_TRASH_DETECTOR_SERVICE_STR)
+		})
+		# Maximum time in seconds to wait for the detectors before following the path
+		self.detector_start_timeout_ = 5.
+		# Places of the dirt and trash found in all runs, created with the first room
+		self.hotspot_maps_ = None
+		# Number of coverage path poses per segment in the hotspot queries
+		self.hotspot_segment_length_ = 10
+		# Follow the coverage path segments which yielded dirt in former runs first
+		self.prioritize_dirt_hotspots_ = True
 
 	# Method for setting parameters for the behavior
 	def setParameters(self, database_handler, sequencing_result, mapping, robot_radius, coverage_radius, field_of_view,
@@ -59,11 +78,12 @@ class DryCleaningBehavior(AbstractCleaningBehavior):
 	def trashcanRoutine(self, room_id, detected_trash):
 		assert(detected_trash is not None)
 
-		self.found_trashcans_.append(detected_trash)
+		self.found_trashcans_.add(detected_trash)
 		trashcan_emptier = TrashcanEmptyingBehavior("TrashcanEmptyingBehavior", self.interrupt_var_, srv.MOVE_BASE_SERVICE_STR)
 		checkpoint_position = self.getCheckpointForRoomId(room_id).checkpoint_position_in_meter
 
 		traschan_pose = projectToFrame(detected_trash.pose, 'map').pose
+		self.recordHotspot(room_id, 'trash', traschan_pose.position)
 
 		trolley_pose = Pose()
 		trolley_pose.position = checkpoint_position
@@ -89,47 +109,57 @@ class DryCleaningBehavior(AbstractCleaningBehavior):
 	def dirtRoutine(self, room_id, detected_dirt):
 		assert(detected_dirt is not None)
 
-		self.found_dirtspots_.append(detected_dirt)
+		self.found_dirtspots_.add(detected_dirt)
 		dirt_remover = DirtRemovingBehavior("DirtRemovingBehavior", self.interrupt_var_,
 											move_base_service_str=srv.MOVE_BASE_SERVICE_STR,
 											map_accessibility_service_str=srv.MAP_ACCESSIBILITY_SERVICE_STR,
 											clean_pattern_str=srv.CLEAN_PATTERN_STR)
 
 		position = detected_dirt.pose.pose.position
+		self.recordHotspot(room_id, 'dirt', position)
 		dirt_remover.setParameters(dirt_position=position)
 
 		dirt_remover.executeBehavior()
 
-	# todo rmb-ma. tmp because the message will change
-	def callTriggerServiceTmp(self, service_name):
-		self.callService(service_name, Trigger)
-
+	def getHotspotMaps(self):
+		if self.hotspot_maps_ is None:
+			database = self.database_handler_.database_
+			self.hotspot_maps_ = HotspotMapStore(os.path.join(database.extracted_file_path, "maps"), self.map_resolution_,
+												 self.map_origin_, self.map_data_.height, self.map_data_.width)
+		return self.hotspot_maps_
+
+	def recordHotspot(self, room_id, kind, position):
+		room = self.database_handler_.database_.getRoomById(room_id)
+		self.getHotspotMaps().addDetection(room, kind, position.x, position.y)
+
+	def saveHotspotMap(self, room_id):
+		room = self.database_handler_.database_.getRoomById(room_id)
+		try:
+			self.getHotspotMaps().saveRoomHotspotMap(room)
+		except (IOError, OSError) as e:
+			self.printMsg('Could not save the hotspot map of room ID {}: {}'.format(room_id, e))
+
+	# Returns the segments (first pose index, last pose index + 1, score) of the path, where dirt has been found in former runs
+	def getHistoricalDirtSegments(self, room_id, path):
+		room = self.database_handler_.database_.getRoomById(room_id)
+		segments = self.getHotspotMaps().getSegmentScores(room, 'dirt', path, self.coverage_radius_, self.hotspot_segment_length_)
+		return [segment for segment in segments if segment[2] > 0.]
+
+	# Returns the futures of the detector states, does not wait for the detectors
 	def stopDetections(self):
-		Thread(target=self.callTriggerServiceTmp, args=(srv.STOP_DIRT_DETECTOR_SERVICE_STR,)).start()
-		Thread(target=self.callTriggerServiceTmp, args=(srv.STOP_TRASH_DETECTOR_SERVICE_STR,)).start()
+		return self.detector_switch_.stopAll()
 
 	def returnToRobotStandardState(self):
 		self.stopDetections()
 
-	@staticmethod
-	def isAlreadyDetected(detections, new_detection):
-		# todo (rmb-ma). if already detected add an issue / ask for the picture?
-		# todo rmb-ma handle the size
-		new_position = new_detection.pose.pose.position
-		for detection in detections:
-			position = detection.pose.pose.position
-			if position.x == new_position.x and position.y == new_position.y:
-				print("Detection on pos ({}, {}) is already detected".format(new_position.x, new_position.y))
-				return True
-		return False
-
 	def dirtDetectionCallback(self, detections):
 		detections = detections.detections
 
 		# todo rmb-ma temporary solution. Keep camera, robot or room coordinates?
-		detections = [projectToCamera(detection) for detection in detections]
+		detections = [detection for detection in map(projectToCamera, detections) if detection is not None]
 
-		detections = list(filter(lambda detection: not self.isAlreadyDetected(self.found_dirtspots_, detection), detections))
+		# todo (rmb-ma). if already detected add an issue / ask for the picture?
+		detections = self.found_dirtspots_.filterNewDetections(detections)
 		if len(detections) == 0:
 			return
 
@@ -141,6 +171,7 @@ class DryCleaningBehavior(AbstractCleaningBehavior):
 		# 2. Stop the path follower
 		self.local_mutex_.acquire()
 		self.detected_dirts_ = detections
+		self.interruptPathFollower()
 		self.local_mutex_.release()
 
 		position = self.detected_dirts_[0].pose.pose.position
@@ -148,7 +179,10 @@ class DryCleaningBehavior(AbstractCleaningBehavior):
 
 	def trashDetectionCallback(self, detections):
 		detections = detections.detections
-		detections = list(filter(lambda detection: not self.isAlreadyDetected(self.found_trashcans_, detection), detections))
+
+		# the found trashcans are indexed in the map frame, like the dirt spots
+		detections = [detection for detection in map(projectToCamera, detections) if detection is not None]
+		detections = self.found_trashcans_.filterNewDetections(detections)
 		if len(detections) == 0:
 			return
 		self.printMsg("Trash(S) DETECTED!!")
@@ -159,11 +193,17 @@ class DryCleaningBehavior(AbstractCleaningBehavior):
 		# 2. Stop the path follower
 		self.local_mutex_.acquire()
 		self.detected_trashs_ = detections
+		self.interruptPathFollower()
 		self.local_mutex_.release()
 
 		position = self.detected_trashs_[0].pose.pose.position
 		print("FIRST ON POSITION ({}, {})".format(position.x, position.y))
 
+	# Interrupt the running path follower if something has been detected. Call with self.local_mutex_ acquired.
+	def interruptPathFollower(self):
+		if self.path_follower_ is not None and (len(self.detected_dirts_) > 0 or len(self.detected_trashs_) > 0):
+			self.path_follower_.interruptExecution()
+
 	def executeCustomBehaviorInRoomId(self, room_id):
 		cleaning_tasks = self.database_handler_.database_.getRoomById(room_id).open_cleaning_tasks_
 		assert(DryCleaningBehavior.containsTrashcanTask(cleaning_tasks) or DryCleaningBehavior.containsDirtTask(cleaning_tasks))
@@ -189,18 +229,26 @@ class DryCleaningBehavior(AbstractCleaningBehavior):
 		if self.move_base_handler_.failed():
 			self.printMsg('Room center is not accessible. Failed to clean room {}'.format(room_id))
 			return
-
+		path = self.checkCoveragePathStart(room_id, path)
+		if DryCleaningBehavior.containsDirtTask(cleaning_tasks) and self.prioritize_dirt_hotspots_:
+			dirt_segments = self.getHistoricalDirtSegments(room_id, path)
+			path = prioritizeSegments(path, dirt_segments)
+			self.printMsg('Cleaning first the {} of {} coverage path segments of room ID {} which yielded dirt in former runs.'.format(
+				len(dirt_segments), (len(path) + self.hotspot_segment_length_ - 1) // self.hotspot_segment_length_, room_id))
+
+		self.createCoverageTracker(room_id)
 		self.initAndStartCoverageMonitoring()
 
 		while len(path) > 0:
 			self.startCoverageMonitoring()
 			(self.detected_trashs_, self.detected_dirts_) = ([], [])
 
+			detector_futures = []
 			if DryCleaningBehavior.containsTrashcanTask(cleaning_tasks):
-				Thread(target=self.callTriggerServiceTmp, args=(srv.START_TRASH_DETECTOR_SERVICE_STR,)).start()
+				detector_futures.append(self.detector_switch_.start('trash'))
 
 			if DryCleaningBehavior.containsDirtTask(cleaning_tasks):
-				Thread(target=self.callTriggerServiceTmp, args=(srv.START_DIRT_DETECTOR_SERVICE_STR,)).start()
+				detector_futures.append(self.detector_switch_.start('dirt'))
 
 			room_map_data = self.database_handler_.database_.getRoomById(room_id).room_map_data_
 			path_follower.setParameters(
@@ -211,18 +259,23 @@ class DryCleaningBehavior(AbstractCleaningBehavior):
 				goal_angle_tolerance=1.57
 			)
 
+			if not DetectorSwitch.waitAll(detector_futures, self.detector_start_timeout_):
+				self.printMsg('Detectors not confirmed as started, following the path anyway.')
+
 			path_follower.setInterruptVar(self.interrupt_var_)
 			explorer_thread = Thread(target=path_follower.executeBehavior)
 			explorer_thread.start()
 
-			while not path_follower.is_finished:
-				self.local_mutex_.acquire()
-				if len(self.detected_dirts_) > 0 or len(self.detected_trashs_) > 0:
-					path_follower.interruptExecution()
-				self.local_mutex_.release()
-				rospy.sleep(2)
+			# the detection callbacks interrupt the path follower at once, including detections made before
+			self.local_mutex_.acquire()
+			self.path_follower_ = path_follower
+			self.interruptPathFollower()
+			self.local_mutex_.release()
 
 			explorer_thread.join()
+			self.local_mutex_.acquire()
+			self.path_follower_ = None
+			self.local_mutex_.release()
 			if path_follower.failed():
 				self.printMsg('Error in path following. Failed to clean room {}'.format(room_id))
 				return
@@ -235,6 +288,8 @@ class DryCleaningBehavior(AbstractCleaningBehavior):
 				self.dirtRoutine(room_id=room_id, detected_dirt=dirt)
 			for trash in self.detected_trashs_:
 				self.trashcanRoutine(room_id=room_id, detected_trash=trash)
+			if len(self.detected_dirts_) > 0 or len(self.detected_trashs_) > 0:
+				self.saveHotspotMap(room_id)
 
 			# start again on the current position
 			self.printMsg("Result is {}".format(path_follower.move_base_path_result_))
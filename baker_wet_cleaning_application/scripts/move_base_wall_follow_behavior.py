@@ -6,6 +6,7 @@ from scitos_msgs.msg import MoveBaseWallFollowAction
 from scitos_msgs.msg import MoveBaseWallFollowGoal
 import ipa_building_msgs.srv
 import behavior_container
+from service_proxy_pool import getServiceProxyPool
 from cv_bridge import CvBridge, CvBridgeError
 import cv2
 
@@ -50,9 +51,7 @@ class MoveBaseWallFollowBehavior(behavior_container.BehaviorContainer):
 	def requestCoverageMapResponse(self):
 
 		self.printMsg("Receive coverage image from coverage monitor " + self.coverage_map_service_)
-		rospy.wait_for_service(self.coverage_map_service_)
 		try:
-			coverage_image_getter = rospy.ServiceProxy(self.coverage_map_service_, ipa_building_msgs.srv.CheckCoverage)
 			request = ipa_building_msgs.srv.CheckCoverageRequest()
 			request.input_map = self.area_map_
 			request.map_resolution = self.map_resolution_
@@ -62,7 +61,7 @@ class MoveBaseWallFollowBehavior(behavior_container.BehaviorContainer):
 			request.coverage_radius = self.coverage_radius_
 			request.check_for_footprint = False
 			request.check_number_of_coverages = False
-			self.coverage_map_ = coverage_image_getter(request).coverage_map
+			self.coverage_map_ = getServiceProxyPool().call(self.coverage_map_service_, ipa_building_msgs.srv.CheckCoverage, request, idempotent=True).coverage_map
 
 		except rospy.ServiceException, e:
 			print ("Service call to " + self.coverage_map_service_ + " failed: %s" % e)
@@ -0,0 +1,69 @@
+#!/usr/bin/env python
+
+import argparse
+from collections import namedtuple
+import cv2
+
+from coverage_accumulator import CoverageAccumulator
+
+# ========================================================================
+# Description:
+# Replays a recorded pose sequence of the robot through a
+# CoverageAccumulator and prints the coverage ratio of the room, without
+# a running ROS system.
+# The room map is an image of the size of the global map (room pixels > 0).
+# The pose file has one pose "x y yaw" (map frame, meters and radians) per
+# line, lines starting with # are ignored and an empty line starts a new
+# sweep (e.g. a relocalization).
+# Usage: python replay_coverage.py --help
+# ========================================================================
+
+Point = namedtuple('Point', ['x', 'y'])
+Pose = namedtuple('Pose', ['position'])
+
+
+# Yields the poses (x, y, yaw) of the pose file, None at an empty line
+def readPoses(pose_file_name):
+	with open(pose_file_name, "r") as pose_file:
+		for line in pose_file:
+			line = line.strip()
+			if line.startswith("#"):
+				continue
+			if len(line) == 0:
+				yield None
+				continue
+			(x, y, yaw) = [float(value) for value in line.replace(",", " ").split()[:3]]
+			yield (x, y, yaw)
+
+
+if __name__ == '__main__':
+	parser = argparse.ArgumentParser(description='Replay recorded robot poses and print the coverage ratio of a room')
+	parser.add_argument('room_map', help='Image of the room map in the size of the global map')
+	parser.add_argument('poses', help='File of the poses, one "x y yaw" per line')
+	parser.add_argument('--resolution', type=float, default=0.05, help='Map resolution [m/pixel]. Default 0.05')
+	parser.add_argument('--origin', type=float, nargs=2, default=[0., 0.], metavar=('X', 'Y'), help='Position of the map pixel (0, 0) [m]')
+	parser.add_argument('--field_of_view', type=float, nargs='+', required=True, metavar='X Y',
+						help='Points x1 y1 x2 y2 ... of the field of view polygon in the robot frame [m]')
+	parser.add_argument('--max_sweep_distance', type=float, default=1., help='Poses further apart start a new sweep [m]. Default 1')
+	parser.add_argument('--coverage_map', help='Write the coverage map (255 = covered) into this image')
+	args = parser.parse_args()
+
+	if len(args.field_of_view) < 6 or len(args.field_of_view) % 2 != 0:
+		parser.error('--field_of_view needs at least three points')
+	room_map = cv2.imread(args.room_map, 0)
+	if room_map is None:
+		parser.error('cannot read the room map ' + args.room_map)
+	field_of_view = [Point(args.field_of_view[i], args.field_of_view[i + 1]) for i in range(0, len(args.field_of_view), 2)]
+	accumulator = CoverageAccumulator(room_map, args.resolution, Pose(Point(args.origin[0], args.origin[1])), field_of_view,
+									  max_sweep_distance=args.max_sweep_distance)
+
+	pose_count = 0
+	for pose in readPoses(args.poses):
+		if pose is None:
+			accumulator.interruptSweep()
+		else:
+			accumulator.addPose(*pose)
+			pose_count += 1
+	print "[ReplayCoverage]: " + str(pose_count) + " poses cover " + "{:.1f}".format(100. * accumulator.getCoverageRatio()) + " % of the room"
+	if args.coverage_map:
+		cv2.imwrite(args.coverage_map, accumulator.getCoverageMap())
@@ -0,0 +1,153 @@
+#!/usr/bin/env python
+
+import bisect
+import time
+from threading import Lock
+import rospy
+
+# ========================================================================
+# Description:
+# Process-wide pool of persistent service proxies.
+# The proxy of a service is created on its first call, after waiting for
+# the service once. Later calls reuse the open connection instead of
+# waiting for the service and connecting again. Calls of the same service
+# are serialized, as a persistent connection handles one call at a time.
+# If a call fails, the proxy is closed and the call is retried once on a
+# new connection if
+# - it failed before the request was sent, e.g. if the connection could
+#   not be opened. This is detected from the sequence number of the proxy,
+#   which rospy increases right before the request is sent.
+# - or the request is idempotent and the proxy was the open connection of
+#   a former call, e.g. to a service which has been restarted since. Such a
+#   request may be executed twice (an error reported by the service is
+#   retried as well), so only queries and state switches are idempotent.
+# Other requests which have been sent are never sent again, as the service
+# may have executed them already (e.g. a cleaning pattern).
+# The duration of every call is recorded in a latency histogram per service.
+# ========================================================================
+
+# Upper bounds of the histogram buckets in seconds, the last bucket takes all longer calls
+LATENCY_BUCKETS = [0.001, 0.002, 0.005, 0.01, 0.02, 0.05, 0.1, 0.2, 0.5, 1., 2., 5., 10.]
+
+
+class LatencyHistogram:
+
+	def __init__(self):
+		self.counts_ = [0]*(len(LATENCY_BUCKETS) + 1)
+		self.call_count_ = 0
+		self.failure_count_ = 0
+		self.total_seconds_ = 0.
+		self.max_seconds_ = 0.
+
+	def add(self, seconds, failed=False):
+		self.counts_[bisect.bisect_left(LATENCY_BUCKETS, seconds)] += 1
+		self.call_count_ += 1
+		self.failure_count_ += 1 if failed else 0
+		self.total_seconds_ += seconds
+		self.max_seconds_ = max(self.max_seconds_, seconds)
+
+	def getMeanSeconds(self):
+		return self.total_seconds_ / self.call_count_ if self.call_count_ > 0 else 0.
+
+	# Upper bound of the bucket which contains the given fraction of the calls (e.g. 0.95), None if it is the last bucket
+	def getPercentileSeconds(self, fraction):
+		if self.call_count_ == 0:
+			return 0.
+		calls = 0
+		for (bucket_index, count) in enumerate(self.counts_):
+			calls += count
+			if calls >= fraction*self.call_count_:
+				return LATENCY_BUCKETS[bucket_index] if bucket_index < len(LATENCY_BUCKETS) else None
+		return None
+
+	def __str__(self):
+		return "{} calls ({} failed), mean {:.4f} s, p95 <= {} s, max {:.4f} s".format(
+			self.call_count_, self.failure_count_, self.getMeanSeconds(), self.getPercentileSeconds(0.95), self.max_seconds_)
+
+
+class ServiceProxyPool:
+
+	def __init__(self):
+		# Persistent proxy by service name. A service is ready while it has a proxy.
+		self.proxies_ = {}
+		self.service_mutexes_ = {}
+		self.latencies_ = {}
+		self.mutex_ = Lock()
+
+	def getServiceMutex(self, service_name):
+		with self.mutex_:
+			if service_name not in self.service_mutexes_:
+				self.service_mutexes_[service_name] = Lock()
+				self.latencies_[service_name] = LatencyHistogram()
+			return self.service_mutexes_[service_name]
+
+	# Returns the proxy of the service, waits for the service if it is not ready. Call with the service mutex acquired.
+	def getProxy(self, service_name, service_class, timeout=None):
+		proxy = self.proxies_.get(service_name)
+		if proxy is None:
+			rospy.wait_for_service(service_name, timeout)
+			proxy = rospy.ServiceProxy(service_name, service_class, persistent=True)
+			self.proxies_[service_name] = proxy
+		return proxy
+
+	# Close the proxy of the service, the next call waits for the service and reconnects. Call with the service mutex acquired.
+	def dropProxy(self, service_name):
+		proxy = self.proxies_.pop(service_name, None)
+		if proxy is not None:
+			try:
+				proxy.close()
+			except Exception:
+				pass
+
+	# Call the service with the request (or without arguments if request is None) and return the response.
+	# idempotent: the request may be sent again after a failure of a reused connection (see the description above).
+	# Raises rospy.ServiceException if the call fails and rospy.ROSException if the service does not become available within timeout.
+	def call(self, service_name, service_class, request=None, timeout=None, idempotent=False):
+		with self.getServiceMutex(service_name):
+			for attempt in range(2):
+				reused_proxy = service_name in self.proxies_
+				proxy = self.getProxy(service_name, service_class, timeout)
+				sequence_number = proxy.seq
+				start_time = time.time()
+				try:
+					response = proxy() if request is None else proxy(request)
+				except (rospy.ServiceException, rospy.exceptions.TransportException) as e:
+					self.latencies_[service_name].add(time.time() - start_time, failed=True)
+					self.dropProxy(service_name)
+					request_sent = proxy.seq != sequence_number
+					if attempt > 0 or (request_sent and not (idempotent and reused_proxy)):
+						if isinstance(e, rospy.ServiceException):
+							raise
+						raise rospy.ServiceException(str(e))
+					continue
+				self.latencies_[service_name].add(time.time() - start_time)
+				return response
+
+	# Returns the latency histogram of every called service by service name
+	def getLatencies(self):
+		with self.mutex_:
+			return dict(self.latencies_)
+
+	def printLatencies(self):
+		for (service_name, latency) in sorted(self.getLatencies().items()):
+			print("[ServiceProxyPool]: " + str(service_name) + ": " + str(latency))
+
+	def close(self):
+		with self.mutex_:
+			service_names = list(self.proxies_)
+		for service_name in service_names:
+			with self.getServiceMutex(service_name):
+				self.dropProxy(service_name)
+
+
+_service_proxy_pool = None
+_service_proxy_pool_creation_lock = Lock()
+
+
+def getServiceProxyPool():
+	global _service_proxy_pool
+	with _service_proxy_pool_creation_lock:
+		if _service_proxy_pool is None:
+			_service_proxy_pool = ServiceProxyPool()
+			rospy.on_shutdown(_service_proxy_pool.close)
+		return _service_proxy_pool
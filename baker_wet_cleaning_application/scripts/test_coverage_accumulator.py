@@ -0,0 +1,109 @@
+#!/usr/bin/env python
+
+import os
+import tempfile
+import unittest
+import numpy as np
+
+from coverage_accumulator import CoverageAccumulator
+from replay_coverage import Point, Pose, readPoses
+
+PKG = 'baker_wet_cleaning_application'
+NAME = 'coverage_accumulator_test'
+
+MAP_RESOLUTION = 0.05
+MAP_ORIGIN = Pose(Point(-1., -1.))
+# Square of 0.2 m around the robot
+FIELD_OF_VIEW = [Point(-0.1, -0.1), Point(0.1, -0.1), Point(0.1, 0.1), Point(-0.1, 0.1)]
+
+
+class TestCoverageAccumulator(unittest.TestCase):
+
+    def setUp(self):
+        # Room of 3 x 3 m from (0, 0) to (3, 3) in a map of 5 x 5 m
+        self.room_map_ = np.zeros((100, 100), np.uint8)
+        self.room_map_[20:80, 20:80] = 255
+
+    def createAccumulator(self, field_of_view=FIELD_OF_VIEW, max_sweep_distance=1.):
+        return CoverageAccumulator(self.room_map_, MAP_RESOLUTION, MAP_ORIGIN, field_of_view, max_sweep_distance=max_sweep_distance)
+
+    # Returns True if the position (x, y) [m] is covered in the coverage map
+    @staticmethod
+    def isCoveredAt(accumulator, x, y):
+        coverage_map = accumulator.getCoverageMap()
+        return coverage_map[int((y - MAP_ORIGIN.position.y) / MAP_RESOLUTION), int((x - MAP_ORIGIN.position.x) / MAP_RESOLUTION)] == 255
+
+    def testCoverageRatio(self):
+        accumulator = self.createAccumulator()
+        self.assertEqual(accumulator.getCoverageRatio(), 0.)
+        accumulator.addPose(1.5, 1.5, 0.)
+        coverage_map = accumulator.getCoverageMap()
+        self.assertEqual(coverage_map.shape, self.room_map_.shape)
+        self.assertGreater(accumulator.getCoverageRatio(), 0.)
+        self.assertAlmostEqual(accumulator.getCoverageRatio(), np.count_nonzero(coverage_map) / 3600.)
+
+        # The same pose again covers nothing new
+        ratio = accumulator.getCoverageRatio()
+        accumulator.addPose(1.5, 1.5, 0.)
+        self.assertAlmostEqual(accumulator.getCoverageRatio(), ratio)
+
+    def testCoverageOutsideOfRoom(self):
+        accumulator = self.createAccumulator()
+        accumulator.addPose(-0.5, -0.5, 0.)
+        self.assertEqual(accumulator.getCoverageRatio(), 0.)
+
+        # Only the pixels inside of the room are counted at the wall
+        accumulator.addPose(0., 1.5, 0.)
+        coverage_map = accumulator.getCoverageMap()
+        self.assertFalse(np.any(coverage_map[self.room_map_ == 0]))
+        self.assertAlmostEqual(accumulator.getCoverageRatio(), np.count_nonzero(coverage_map) / 3600.)
+
+    def testCompleteCoverage(self):
+        accumulator = self.createAccumulator(field_of_view=[Point(-2., -2.), Point(2., -2.), Point(2., 2.), Point(-2., 2.)])
+        accumulator.addPose(1.5, 1.5, 0.3)
+        self.assertEqual(accumulator.getCoverageRatio(), 1.)
+        self.assertTrue(accumulator.isCovered(1.))
+
+    def testSweepBetweenPoses(self):
+        accumulator = self.createAccumulator()
+        accumulator.addPoses([(0.5, 1.5, 0.), (1.3, 1.5, 0.)])
+        self.assertTrue(self.isCoveredAt(accumulator, 0.9, 1.5))
+        self.assertFalse(self.isCoveredAt(accumulator, 0.9, 1.8))
+
+    def testSweepRotation(self):
+        # A field of view to the front of the robot sweeps the area around it while turning on the spot
+        accumulator = self.createAccumulator(field_of_view=[Point(0.2, -0.05), Point(0.4, -0.05), Point(0.4, 0.05), Point(0.2, 0.05)])
+        accumulator.addPoses([(1.5, 1.5, 0.), (1.5, 1.5, 0.5*np.pi)])
+        self.assertTrue(self.isCoveredAt(accumulator, 1.7, 1.7))
+
+    def testMaxSweepDistance(self):
+        accumulator = self.createAccumulator(max_sweep_distance=0.5)
+        accumulator.addPoses([(0.5, 1.5, 0.), (1.3, 1.5, 0.)])
+        self.assertFalse(self.isCoveredAt(accumulator, 0.9, 1.5))
+        self.assertTrue(self.isCoveredAt(accumulator, 0.5, 1.5))
+        self.assertTrue(self.isCoveredAt(accumulator, 1.3, 1.5))
+
+    def testInterruptSweep(self):
+        accumulator = self.createAccumulator()
+        accumulator.addPose(0.5, 1.5, 0.)
+        accumulator.interruptSweep()
+        accumulator.addPose(1.3, 1.5, 0.)
+        self.assertFalse(self.isCoveredAt(accumulator, 0.9, 1.5))
+
+        # The sweep continues from the pose after the interruption
+        accumulator.addPose(2.1, 1.5, 0.)
+        self.assertTrue(self.isCoveredAt(accumulator, 1.7, 1.5))
+
+    def testReadPoses(self):
+        (pose_file_handle, pose_file_name) = tempfile.mkstemp()
+        try:
+            with os.fdopen(pose_file_handle, 'w') as pose_file:
+                pose_file.write('# x y yaw\n0.5 1.5 0\n1.0, 1.5, 0.25, 7\n\n2 2.5 -1\n')
+            self.assertEqual(list(readPoses(pose_file_name)), [(0.5, 1.5, 0.), (1., 1.5, 0.25), None, (2., 2.5, -1.)])
+        finally:
+            os.remove(pose_file_name)
+
+
+if __name__ == '__main__':
+    import rostest
+    rostest.rosrun(PKG, NAME, TestCoverageAccumulator)
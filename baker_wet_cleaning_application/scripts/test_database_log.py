@@ -0,0 +1,94 @@
+#!/usr/bin/env python
+
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from datetime import datetime
+
+import database_classes
+import database_log
+from database import Database
+
+PKG = 'baker_wet_cleaning_application'
+NAME = 'database_log_test'
+
+
+class TestDatabaseLog(unittest.TestCase):
+
+    def setUp(self):
+        self.database_location_ = tempfile.mkdtemp()
+        self.log_path_ = os.path.join(self.database_location_, 'logs')
+        os.makedirs(self.log_path_)
+        self.database_ = Database(extracted_file_path=self.database_location_, auto_load_database=False)
+        self.database_.application_data_ = database_classes.GlobalApplicationData()
+        self.database_.application_data_.progress_ = [1, datetime(2019, 1, 16, 9, 0)]
+        self.database_.application_data_.run_count_ = 2
+
+    def tearDown(self):
+        self.database_.closeLogJournal()
+        shutil.rmtree(self.database_location_)
+
+    @staticmethod
+    def createLogItem(room_id, date_and_time):
+        log_item = database_classes.LogItem()
+        log_item.room_id_ = room_id
+        log_item.date_and_time_ = date_and_time
+        log_item.status_ = 0
+        return log_item
+
+    def getLogFileName(self, log_filename):
+        return os.path.join(self.log_path_, log_filename)
+
+    # Write a journal of a former run whose last entry has been cut by a crash
+    def writeCrashedJournal(self, log_filename, room_ids):
+        journal_file_name = database_log.LogJournal.getJournalFileName(self.getLogFileName(log_filename))
+        with open(journal_file_name, 'w') as journal_file:
+            for room_id in room_ids:
+                journal_file.write(json.dumps({'room_id': room_id, 'date_and_time': '2019-01-15_08:0' + str(room_id)}) + '\n')
+            journal_file.write('{"room_id": 9, "date_and')
+        return journal_file_name
+
+    def testReadEntriesIgnoresIncompleteTail(self):
+        journal_file_name = self.writeCrashedJournal('log_2019_3_1_run1.json', [1, 2])
+        self.assertEqual([entry['room_id'] for entry in database_log.LogJournal.readEntries(journal_file_name)], [1, 2])
+
+    def testAppendAfterIncompleteTail(self):
+        journal_file_name = self.writeCrashedJournal('log_2019_3_1_run1.json', [1, 2])
+        journal = database_log.LogJournal(journal_file_name)
+        journal.append({'room_id': 3, 'date_and_time': '2019-01-15_08:03'})
+        journal.close()
+        self.assertEqual([entry['room_id'] for entry in database_log.LogJournal.readEntries(journal_file_name)], [1, 2, 3])
+        with open(journal_file_name, 'r') as journal_file:
+            self.assertTrue(journal_file.read().endswith('\n'))
+
+    def testReadLogHistoryOfCrashedJournal(self):
+        self.writeCrashedJournal('log_2019_3_1_run1.json', [1, 2])
+        self.database_.addLogEntry(self.createLogItem(5, datetime(2019, 1, 16, 9, 5)))
+        log_items = self.database_.readLogHistory()
+        self.assertEqual([log_item.room_id_ for log_item in log_items], [1, 2, 5])
+
+    def testCompactJournalsOfFormerRuns(self):
+        former_journal_file_name = self.writeCrashedJournal('log_2019_3_1_run1.json', [1, 2])
+        self.database_.addLogEntry(self.createLogItem(5, datetime(2019, 1, 16, 9, 5)))
+        current_log_file_name = self.getLogFileName(self.database_.getCurrentLogfileName())
+        current_journal_file_name = database_log.LogJournal.getJournalFileName(current_log_file_name)
+
+        # the journal of the current log file may still be continued
+        self.database_.compactLogFiles(keep_current_log=True)
+        self.assertFalse(os.path.isfile(former_journal_file_name))
+        with open(self.getLogFileName('log_2019_3_1_run1.json'), 'r') as log_file:
+            self.assertEqual(sorted(entry['room_id'] for entry in json.load(log_file).values()), [1, 2])
+        self.assertTrue(os.path.isfile(current_journal_file_name))
+
+        self.database_.addLogEntry(self.createLogItem(6, datetime(2019, 1, 16, 9, 6)))
+        self.database_.compactLogFiles()
+        self.assertFalse(os.path.isfile(current_journal_file_name))
+        self.assertEqual(sorted(os.listdir(self.log_path_)), ['log_2019_3_1_run1.json', os.path.basename(current_log_file_name)])
+        self.assertEqual([log_item.room_id_ for log_item in self.database_.readLogHistory()], [1, 2, 5, 6])
+
+
+if __name__ == '__main__':
+    import rostest
+    rostest.rosrun(PKG, NAME, TestDatabaseLog)
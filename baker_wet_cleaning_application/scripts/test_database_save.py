@@ -0,0 +1,101 @@
+#!/usr/bin/env python
+
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+import database_classes
+from database import Database
+
+PKG = 'baker_wet_cleaning_application'
+NAME = 'database_save_test'
+
+
+class TestDatabaseSave(unittest.TestCase):
+
+    def setUp(self):
+        self.database_location_ = tempfile.mkdtemp()
+        os.makedirs(os.path.join(self.database_location_, 'json'))
+        self.database_ = Database(extracted_file_path=self.database_location_, auto_load_database=False)
+        self.database_.application_data_ = database_classes.GlobalApplicationData()
+        self.database_.rooms_ = []
+        for room_id in range(3):
+            room = database_classes.RoomItem()
+            room.room_id_ = room_id
+            room.room_name_ = 'room ' + str(room_id)
+            self.database_.rooms_.append(room)
+        self.database_.saveCompleteDatabase()
+        self.rename_ = os.rename
+
+    def tearDown(self):
+        os.rename = self.rename_
+        shutil.rmtree(self.database_location_)
+
+    # Let os.rename fail for the files whose name ends with suffix, after skip_count successful renames of them
+    def failRenames(self, suffix, skip_count=0):
+        remaining_renames = [skip_count]
+        def rename(source, destination):
+            if destination.endswith(suffix):
+                if remaining_renames[0] == 0:
+                    raise OSError(1, 'Operation not permitted', destination)
+                remaining_renames[0] -= 1
+            self.rename_(source, destination)
+        os.rename = rename
+
+    def readTemporalRoomName(self, room_id):
+        with open(self.database_.getTemporalRoomFileName(room_id), 'r') as room_file:
+            return json.load(room_file).get('room_name')
+
+    def testSaveOnlyChangedRooms(self):
+        self.assertFalse(any(room.is_dirty_ for room in self.database_.rooms_))
+        self.database_.rooms_[1].room_name_ = 'changed'
+        self.assertEqual(self.database_.saveRoomDatabase(), [self.database_.rooms_[1]])
+        self.assertEqual(self.readTemporalRoomName(1), 'changed')
+        self.assertFalse(self.database_.rooms_[1].is_dirty_)
+
+    def testFailedCommitKeepsRoomsDirty(self):
+        room = self.database_.rooms_[1]
+        room.room_name_ = 'changed'
+        self.failRenames(os.path.basename(self.database_.getTemporalRoomFileName(1)))
+        self.assertRaises(OSError, self.database_.saveCompleteDatabase)
+        self.assertTrue(room.is_dirty_)
+        self.assertEqual(self.readTemporalRoomName(1), 'room 1')
+
+        # The next save writes the change
+        os.rename = self.rename_
+        self.database_.saveCompleteDatabase()
+        self.assertFalse(room.is_dirty_)
+        self.assertEqual(self.readTemporalRoomName(1), 'changed')
+
+    def testFailedCommitRemovesTemporaryFiles(self):
+        for room in self.database_.rooms_:
+            room.setDirty()
+        self.failRenames(os.path.basename(self.database_.getTemporalRoomFileName(1)))
+        self.assertRaises(OSError, self.database_.saveCompleteDatabase)
+        for (path, _, file_names) in os.walk(self.database_location_):
+            self.assertEqual([file_name for file_name in file_names if file_name.endswith('.part')], [])
+
+    def testKeepFileModes(self):
+        file_name = self.database_.getTemporalRoomFileName(0)
+        self.assertEqual(os.stat(file_name).st_mode & 0o777, 0o644)
+        os.chmod(file_name, 0o640)
+        self.database_.rooms_[0].room_name_ = 'changed'
+        self.database_.saveCompleteDatabase()
+        self.assertEqual(os.stat(file_name).st_mode & 0o777, 0o640)
+
+    def testInterruptedCommitFailsIntegrity(self):
+        self.assertTrue(self.database_.checkIntegrity(True))
+        self.database_.rooms_[2].room_name_ = 'changed'
+        # The application data is saved as unsuccessful and the room file is renamed,
+        # the application data which closes the group is not
+        self.failRenames('tmp_application_data.json', skip_count=1)
+        self.assertRaises(OSError, self.database_.saveCompleteDatabase)
+        self.assertEqual(self.readTemporalRoomName(2), 'changed')
+        self.assertFalse(self.database_.checkIntegrity(True))
+
+
+if __name__ == '__main__':
+    import rostest
+    rostest.rosrun(PKG, NAME, TestDatabaseSave)
@@ -0,0 +1,107 @@
+#!/usr/bin/env python
+
+import unittest
+from datetime import datetime
+
+import database_classes
+import database_schedule
+from database_handler import DatabaseHandler
+
+PKG = 'baker_wet_cleaning_application'
+NAME = 'database_schedule_test'
+
+TRASH_TASK = DatabaseHandler.TRASH_TASK
+DRY_TASK = DatabaseHandler.DRY_TASK
+WET_TASK = DatabaseHandler.WET_TASK
+
+TODAY_INDEX = 3
+ROBOT_NOW = datetime(2019, 1, 16, 12, 0)
+
+
+class TestDatabaseSchedule(unittest.TestCase):
+
+    # scheduled_days maps schedule indices to schedule characters, the datestamps are [Trashcan, Dry, Wet]
+    @staticmethod
+    def createRoom(room_id, cleaning_method, scheduled_days, datestamps=(None, None, None)):
+        room = database_classes.RoomItem()
+        room.room_id_ = room_id
+        room.room_cleaning_method_ = cleaning_method
+        room.room_scheduled_days_ = [scheduled_days.get(index, '') for index in range(database_schedule.SCHEDULE_LENGTH)]
+        room.room_cleaning_datestamps_ = list(datestamps)
+        room.open_cleaning_tasks_ = []
+        return room
+
+    @staticmethod
+    def getRoomTasks(schedule, task_array):
+        return dict((room.room_id_, tasks) for (room, tasks) in schedule.getRoomTasks(task_array))
+
+    def computeDueTasks(self, rooms, planning_offset=0):
+        schedule = database_schedule.ScheduleEngine(rooms)
+        return self.getRoomTasks(schedule, schedule.computeDueTasks(TODAY_INDEX, ROBOT_NOW.date(), planning_offset))
+
+    def computeOverdueTasks(self, rooms, planning_offset=0):
+        schedule = database_schedule.ScheduleEngine(rooms)
+        return self.getRoomTasks(schedule, schedule.computeOverdueTasks(TODAY_INDEX, ROBOT_NOW, planning_offset))
+
+    def testDueTasks(self):
+        rooms = [
+            self.createRoom(1, 2, {TODAY_INDEX: 'x'}),
+            self.createRoom(2, 0, {TODAY_INDEX: 'X'}, [None, datetime(2019, 1, 16, 8, 0), None]),
+            self.createRoom(3, -1, {TODAY_INDEX: 'p'}),
+            self.createRoom(4, 1, {TODAY_INDEX - 1: 'x', TODAY_INDEX + 1: 'p'}),
+            self.createRoom(5, -1, {TODAY_INDEX: 'x'}),
+            self.createRoom(6, 1, {TODAY_INDEX: 'x'}, [datetime(2019, 1, 15, 8, 0), None, datetime(2019, 1, 17, 8, 0)])
+        ]
+        self.assertEqual(self.computeDueTasks(rooms), {
+            1: {TRASH_TASK, DRY_TASK, WET_TASK},
+            2: {TRASH_TASK},
+            3: {TRASH_TASK},
+            6: {TRASH_TASK, WET_TASK}
+        })
+
+    def testDueTasksWithPlanningOffset(self):
+        # 01:00 of the next real day is still today for a robot whose day starts 2 hours later
+        rooms = [self.createRoom(1, 0, {TODAY_INDEX: 'x'}, [None, datetime(2019, 1, 17, 1, 0), None])]
+        self.assertEqual(self.computeDueTasks(rooms, planning_offset=0), {1: {TRASH_TASK, DRY_TASK}})
+        self.assertEqual(self.computeDueTasks(rooms, planning_offset=120), {1: {TRASH_TASK}})
+
+    def testOverdueTasks(self):
+        rooms = [
+            # Cleaning day two days ago, only the trashcan has been emptied since
+            self.createRoom(1, 1, {TODAY_INDEX - 2: 'x'}, [datetime(2019, 1, 15, 8, 0), None, datetime(2019, 1, 13, 8, 0)]),
+            self.createRoom(2, 1, {TODAY_INDEX - 2: 'x'}, [datetime(2019, 1, 15, 8, 0), None, datetime(2019, 1, 15, 8, 0)]),
+            # Trash day three days ago
+            self.createRoom(3, -1, {TODAY_INDEX - 3: 'p'}),
+            self.createRoom(4, -1, {TODAY_INDEX - 3: 'p'}, [datetime(2019, 1, 13, 13, 0), None, None]),
+            # Cleaning days 13 and 2 days ago, only the later one is missed
+            self.createRoom(5, 0, {TODAY_INDEX - 2: 'x', TODAY_INDEX + 1: 'x'}, [datetime(2019, 1, 15, 8, 0), datetime(2019, 1, 10, 8, 0), None]),
+            self.createRoom(6, 0, {TODAY_INDEX + 1: 'x'}, [datetime(2019, 1, 15, 8, 0), datetime(2019, 1, 10, 8, 0), None]),
+            # Today's schedule is not overdue
+            self.createRoom(7, 2, {TODAY_INDEX: 'x'})
+        ]
+        self.assertEqual(self.computeOverdueTasks(rooms), {
+            1: {WET_TASK},
+            3: {TRASH_TASK},
+            5: {DRY_TASK}
+        })
+
+    def testOverdueTasksWithPlanningOffset(self):
+        # Done 2 hours before the deadline in real time, which is 2 hours after it in robot time 4 hours ahead
+        rooms = [self.createRoom(1, 1, {TODAY_INDEX - 2: 'x'}, [datetime(2019, 1, 15, 8, 0), None, datetime(2019, 1, 14, 10, 0)])]
+        self.assertEqual(self.computeOverdueTasks(rooms, planning_offset=0), {1: {WET_TASK}})
+        self.assertEqual(self.computeOverdueTasks(rooms, planning_offset=-240), {})
+
+    def testShortSchedule(self):
+        rooms = [self.createRoom(1, 2, {})]
+        rooms[0].room_scheduled_days_ = ['', '', '', 'x']
+        self.assertEqual(self.computeDueTasks(rooms), {1: {TRASH_TASK, DRY_TASK, WET_TASK}})
+        self.assertEqual(self.computeOverdueTasks(rooms), {})
+
+    def testNoRooms(self):
+        self.assertEqual(self.computeDueTasks([]), {})
+        self.assertEqual(self.computeOverdueTasks([]), {})
+
+
+if __name__ == '__main__':
+    import rostest
+    rostest.rosrun(PKG, NAME, TestDatabaseSchedule)
@@ -16,6 +16,7 @@ import services_params as srv
 from tf.transformations import quaternion_from_euler, euler_from_quaternion
 from geometry_msgs.msg import Pose2D, Pose, Quaternion, Point, PoseStamped, Vector3
 from utils import projectToFrame, getCurrentRobotPosition
+from service_proxy_pool import getServiceProxyPool
 from math import cos, acos, sqrt, sin
 
 
@@ -118,8 +119,6 @@ class TrashcanEmptyingBehavior(behavior_container.BehaviorContainer):
 		return self.executeAction(self.catch_trashcan_service_str_, self.trashcan_pose_)
 
 	def computeAccessiblePosesAround(self, position, radius):
-		accessibility_checker = rospy.ServiceProxy(self.map_accessibility_service_str_, CheckPerimeterAccessibility)
-
 		request = CheckPerimeterAccessibilityRequest()
 
 		center = Pose2D()
@@ -129,7 +128,7 @@ class TrashcanEmptyingBehavior(behavior_container.BehaviorContainer):
 
 		request.radius = 1.  # todo (rmb-ma) use the value from the robotic arm
 		request.rotational_sampling_step = 0.3
-		response = accessibility_checker(request)
+		response = getServiceProxyPool().call(self.map_accessibility_service_str_, CheckPerimeterAccessibility, request, idempotent=True)
 
 		accessible_poses = response.accessible_poses_on_perimeter
 		return accessible_poses
@@ -181,9 +180,7 @@ class TrashcanEmptyingBehavior(behavior_container.BehaviorContainer):
 		request.loading_method = 'primitive' # mesh
 		request.collision_objects.append(collision_object)
 
-		rospy.wait_for_service(service_name)
-		client = rospy.ServiceProxy(service_name, AddCollisionObject)
-		if not client.call(request):
+		if not getServiceProxyPool().call(service_name, AddCollisionObject, request):
 		    rospy.logerr('Error while adding collision object (label: {}, id: {})'.format(label, id))
 		    return
 
@@ -220,10 +217,8 @@ class TrashcanEmptyingBehavior(behavior_container.BehaviorContainer):
 
 	def unloadEnvironment(self):
 		service_name = '/ipa_planning_scene_creator/remove_all_collision_objects'
-		rospy.wait_for_service(service_name)
-		client = rospy.ServiceProxy(service_name, Trigger)
 		request = TriggerRequest()
-		return not client.call(request)
+		return not getServiceProxyPool().call(service_name, Trigger, request, idempotent=True)
 
 	def returnToRobotStandardState(self):
 		pass
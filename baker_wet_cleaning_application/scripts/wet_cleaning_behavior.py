@@ -8,9 +8,7 @@ from geometry_msgs.msg import Quaternion
 import std_srvs.srv
 from threading import Thread
 import services_params as srv
-from cv_bridge import CvBridge, CvBridgeError
 from math import pi
-import cv2
 
 class WetCleaningBehavior(AbstractCleaningBehavior):
 
@@ -73,6 +71,9 @@ class WetCleaningBehavior(AbstractCleaningBehavior):
 		if self.move_base_handler_.failed():
 			self.printMsg('Room center is not accessible. Failed to clean room {}'.format(room_id))
 			return
+		path = self.checkCoveragePathStart(room_id, path)
+		if len(path) == 0:
+			return
 
 		if self.use_cleaning_device_:
 			self.startCleaningDevice()
@@ -80,6 +81,7 @@ class WetCleaningBehavior(AbstractCleaningBehavior):
 		path_follower = MoveBasePathBehavior("MoveBasePathBehavior_PathFollowing", self.interrupt_var_,
 											 self.move_base_path_service_str_)
 
+		self.createCoverageTracker(room_id)
 		self.resetCoverageMonitoring()
 		self.initAndStartCoverageMonitoring()
 
@@ -103,7 +105,6 @@ class WetCleaningBehavior(AbstractCleaningBehavior):
 			return
 
 		coverage_map = self.requestCoverageMapResponse(room_id)
-		coverage_map = CvBridge().imgmsg_to_cv2(coverage_map, desired_encoding="passthrough")
 		self.resetCoverageMonitoring()
 
 		wall_follower = MoveBaseWallFollowBehavior("MoveBaseWallFollowBehavior", self.interrupt_var_, self.move_base_wall_follow_service_str_)
@@ -139,8 +140,6 @@ class WetCleaningBehavior(AbstractCleaningBehavior):
 
 		# Checkout the completed room
 		wall_coverage_map = self.requestCoverageMapResponse(room_id)
-		wall_coverage_map = CvBridge().imgmsg_to_cv2(wall_coverage_map, desired_encoding="passthrough")
-		coverage_map = cv2.add(wall_coverage_map, coverage_map)
-		coverage_ratio = self.checkAndComputeCoverageRatio(room_id, coverage_map=coverage_map)
+		coverage_ratio = self.checkAndComputeCoverageRatio(room_id, coverage_maps=[coverage_map, wall_coverage_map])
 		self.stopCoverageMonitoring()
 		self.checkoutRoom(room_id=room_id, cleaning_method=2, coverage_ratio=coverage_ratio)